@@ -1,6 +1,9 @@
 from django.contrib import admin
-from django.db.models import Count, Q
-from .models import Event, BoothSlot, GeneralVendorBooking, FoodTruckBooking
+from .models import Event, BoothSlot, GeneralVendorBooking, FoodTruckBooking, StripeEventInbox
+from .slots import ensure_slot_pool
+from .stripe_inbox import requeue_events
+from .booking_status import booking_status_changed
+from .snapshots import rebuild_snapshots
 
 
 @admin.register(Event)
@@ -31,16 +34,23 @@ class EventAdmin(admin.ModelAdmin):
             'fields': ('food_spots_total', 'food_spots_available', 'food_price'),
             'description': 'Food trucks and food vendors - 2 spots per event'
         }),
+        ('Waiting Room', {
+            'fields': ('admission_rate_per_minute',),
+            'description': 'For on-sale spikes: vendors queue and are let through to reserve at this rate'
+        }),
     )
     readonly_fields = ['created_at', 'updated_at']
     
     def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(
-            regular_bookings=Count('generalvendorbooking_bookings', distinct=True),
-            food_bookings=Count('foodtruckbooking_bookings', distinct=True)
-        )
-        return queryset
+        # Booking counts come from each event's availability snapshot row
+        return super().get_queryset(request).select_related('availability')
+
+    def _booked(self, obj, vendor_type):
+        """Approved and held bookings of a type, from the snapshot"""
+        snapshot = getattr(obj, 'availability', None)
+        if snapshot is None:
+            return 0, 0
+        return getattr(snapshot, f'{vendor_type}_approved'), getattr(snapshot, f'{vendor_type}_held')
 
     # Regular Vendor Column Methods
     def regular_spots_total_display(self, obj):
@@ -61,7 +71,8 @@ class EventAdmin(admin.ModelAdmin):
     regular_spots_available_display.admin_order_field = 'regular_spots_available'
     
     def regular_bookings_count(self, obj):
-        return obj.regular_bookings
+        approved, held = self._booked(obj, 'regular')
+        return f"{approved} (+{held} held)" if held else approved
     regular_bookings_count.short_description = 'Reg Booked'
     
     # Food Truck Column Methods
@@ -83,55 +94,39 @@ class EventAdmin(admin.ModelAdmin):
     food_spots_available_display.admin_order_field = 'food_spots_available'
     
     def food_bookings_count(self, obj):
-        return obj.food_bookings
+        approved, held = self._booked(obj, 'food')
+        return f"{approved} (+{held} held)" if held else approved
     food_bookings_count.short_description = 'Food Booked'
     
     # Total Summary
     def total_bookings_display(self, obj):
-        total = obj.regular_bookings + obj.food_bookings
-        return f"{total} total ({obj.regular_bookings}R + {obj.food_bookings}F)"
+        regular = sum(self._booked(obj, 'regular'))
+        food = sum(self._booked(obj, 'food'))
+        return f"{regular + food} total ({regular}R + {food}F)"
     total_bookings_display.short_description = 'Total Bookings'
 
 
 @admin.register(BoothSlot)
 class BoothSlotAdmin(admin.ModelAdmin):
-    list_display = ['event', 'slot_type', 'spot_number', 'is_available']
+    list_display = ['event', 'slot_type', 'spot_number', 'is_available', 'held_until']
     list_filter = ['is_available', 'slot_type', 'event']
     search_fields = ['spot_number', 'event__name']
     raw_id_fields = ['event']
     
-    # Add custom action to create default slots for events
+    # Add custom action to create the slot pool for events
     actions = ['create_default_slots']
     
     def create_default_slots(self, request, queryset):
-        """Create default 26 regular + 2 food slots for selected events"""
+        """Top up the events of the selected slots to match their spot totals"""
         created_count = 0
-        for event in queryset:
-            # Create 26 regular slots
-            for i in range(1, 27):
-                slot, created = BoothSlot.objects.get_or_create(
-                    event=event,
-                    spot_number=f"{i:03d}",
-                    defaults={'slot_type': 'regular', 'is_available': True}
-                )
-                if created:
-                    created_count += 1
-            
-            # Create 2 food slots (27 and 28)
-            for i in range(27, 29):
-                slot, created = BoothSlot.objects.get_or_create(
-                    event=event,
-                    spot_number=f"{i:03d}",
-                    defaults={'slot_type': 'food', 'is_available': True}
-                )
-                if created:
-                    created_count += 1
+        for event in Event.objects.filter(pk__in=queryset.values('event_id')):
+            created_count += ensure_slot_pool(event)
         
         self.message_user(
             request, 
-            f"Created {created_count} new booth slots (26 regular + 2 food per event)"
+            f"Created {created_count} new booth slots"
         )
-    create_default_slots.short_description = "Create default 26 regular + 2 food slots"
+    create_default_slots.short_description = "Create booth slots to match spot totals"
 
 
 class BaseBookingAdmin(admin.ModelAdmin):
@@ -139,7 +134,24 @@ class BaseBookingAdmin(admin.ModelAdmin):
     list_filter = ['payment_status', 'is_paid', 'event__date']
     search_fields = ['first_name', 'last_name', 'vendor_email', 'business_name']
     raw_id_fields = ['event', 'booth_slot']
-    readonly_fields = ['timestamp', 'updated_at', 'stripe_payment_id', 'stripe_payment_intent_id']
+    readonly_fields = ['timestamp', 'updated_at', 'stripe_payment_id', 'stripe_payment_intent_id', 'hold_expires_at']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Edits here bypass the reservation paths, so recount the events involved
+        rebuild_snapshots({obj.event_id, form.initial.get('event')} - {None})
+        booking_status_changed({obj.stripe_payment_id, form.initial.get('stripe_payment_id')})
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_snapshots([obj.event_id])
+        booking_status_changed([obj.stripe_payment_id])
+    
+    def delete_queryset(self, request, queryset):
+        rows = list(queryset.values_list('event_id', 'stripe_payment_id'))
+        super().delete_queryset(request, queryset)
+        rebuild_snapshots({event_id for event_id, _ in rows})
+        booking_status_changed(session_id for _, session_id in rows)
     
     def event_date(self, obj):
         return obj.event.date
@@ -185,7 +197,7 @@ class GeneralVendorBookingAdmin(BaseBookingAdmin):
             'fields': ('additional_notes',)
         }),
         ('Payment Information', {
-            'fields': ('payment_status', 'is_paid', 'amount_paid', 
+            'fields': ('payment_status', 'is_paid', 'amount_paid', 'hold_expires_at',
                       'stripe_payment_id', 'stripe_payment_intent_id', 'timestamp', 'updated_at')
         }),
     )
@@ -221,7 +233,27 @@ class FoodTruckBookingAdmin(BaseBookingAdmin):
             'fields': ('additional_notes',)
         }),
         ('Payment Information', {
-            'fields': ('payment_status', 'is_paid', 'amount_paid', 
+            'fields': ('payment_status', 'is_paid', 'amount_paid', 'hold_expires_at',
                       'stripe_payment_id', 'stripe_payment_intent_id', 'timestamp', 'updated_at')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(StripeEventInbox)
+class StripeEventInboxAdmin(admin.ModelAdmin):
+    list_display = ['stripe_event_id', 'event_type', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'event_type']
+    search_fields = ['stripe_event_id']
+    readonly_fields = [
+        'stripe_event_id', 'event_type', 'payload', 'attempts',
+        'last_error', 'received_at', 'processed_at',
+    ]
+    ordering = ['-received_at']
+
+    actions = ['requeue']
+
+    def requeue(self, request, queryset):
+        """Give dead-lettered (or waiting) events a fresh round of attempts"""
+        requeued = requeue_events(queryset)
+        self.message_user(request, f"Requeued {requeued} events")
+    requeue.short_description = "Requeue selected events for processing"
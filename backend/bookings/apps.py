@@ -6,6 +6,37 @@ class BookingsConfig(AppConfig):
     name = 'bookings'
     
     def ready(self):
-        """Import signals when app is ready"""
+        """Import signals and set up the Stripe client when app is ready"""
         import bookings.signals  # noqa
+        from .stripe_client import configure_stripe
 
+        configure_stripe()
+
+
+def start_background_jobs():
+    """
+    Start the in-process workers that are switched on in settings. Called by
+    the ASGI and WSGI entry points, so only web server processes run them,
+    not `migrate` or other management commands.
+    """
+    from django.conf import settings
+    from .scheduler import start_periodic_job
+
+    if settings.STRIPE_INBOX_POLL_SECONDS > 0:
+        from .stripe_inbox import start_inbox_worker, purge_processed_events
+        start_inbox_worker(settings.STRIPE_INBOX_POLL_SECONDS)
+        start_periodic_job('stripe-inbox-purge', 3600, purge_processed_events)
+
+    if settings.BOOKING_HOLD_SWEEP_INTERVAL_SECONDS > 0:
+        from .holds import start_hold_sweeper
+        from .idempotency import purge_expired_requests
+        from .waiting_room import purge_used_admissions
+        start_hold_sweeper(settings.BOOKING_HOLD_SWEEP_INTERVAL_SECONDS)
+        start_periodic_job('idempotency-purge', 3600, purge_expired_requests)
+        start_periodic_job('admission-purge', 3600, purge_used_admissions)
+
+    if settings.INVENTORY_RECONCILE_INTERVAL_SECONDS > 0:
+        from .inventory import reconcile_inventory
+        start_periodic_job(
+            'inventory-reconcile', settings.INVENTORY_RECONCILE_INTERVAL_SECONDS, reconcile_inventory
+        )
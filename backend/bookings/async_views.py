@@ -0,0 +1,334 @@
+"""
+Async endpoints for the ASGI app
+
+The reserve endpoints take the same requests and give the same responses
+as reserve_event_spot and reserve_multi_event_spots in views.py. Reads use
+the async ORM, the reservation transaction runs on Django's sync thread,
+and the Stripe call goes through the non-blocking client, so a slow Stripe
+round-trip no longer occupies a worker thread.
+
+availability_stream keeps a Server-Sent Events connection open per client
+and pushes spot counts as they change (see availability_stream.py), and
+booking_status can hold a request open until the webhook approves the
+session. Both only make sense under ASGI (the Dockerfile serves the app
+with uvicorn); reached through WSGI they decline instead of tying up a
+sync worker per waiting client.
+"""
+import asyncio
+import json
+import math
+import uuid
+from functools import wraps
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from .availability_cache import calendar_payload
+from .availability_stream import get_broadcaster
+from .booking_status import wait_for_booking_status
+from .checkout import (
+    get_frontend_url,
+    get_price_for_vendor_type,
+    multi_checkout_params,
+    single_checkout_params,
+)
+from .holds import hold_expiry
+from .idempotency import idempotent
+from .inventory import SpotsUnavailable
+from .models import Event
+from .waiting_room import AdmissionDenied, check_admission, release_admission, sold_out_events
+from .reservations import (
+    ReservationError,
+    booking_model,
+    create_booking_from_data,
+    create_bookings_in_bulk,
+    match_events,
+    release_bookings,
+    validate_multi_reservations,
+)
+from .serializers import ReserveBoothSlotSerializer, MultiDateReservationSerializer
+from .stripe_client import create_checkout_session_async
+from .throttling import throttle_wait
+
+
+def _json_body(request):
+    """Parsed JSON request body, or None if it is not valid JSON"""
+    try:
+        return json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+
+
+def throttled(view):
+    """Apply the API's default throttles, as DRF does for the sync views"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        wait = await sync_to_async(throttle_wait)(request)
+        if wait is not None:
+            response = JsonResponse(
+                {'detail': f'Request was throttled. Expected available in {math.ceil(wait)} seconds.'},
+                status=429
+            )
+            response['Retry-After'] = str(math.ceil(wait))
+            return response
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _admission_denied_response(error):
+    response = JsonResponse(error.payload, status=error.status_code)
+    if error.retry_after is not None:
+        response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+@csrf_exempt
+@require_POST
+@throttled
+@idempotent
+async def reserve_event_spot_async(request, event_id):
+    """Reserve a spot for a single event"""
+    try:
+        event = await Event.objects.aget(pk=event_id)
+    except Event.DoesNotExist:
+        return JsonResponse({'detail': 'No Event matches the given query.'}, status=404)
+
+    body = _json_body(request)
+    if body is None:
+        return JsonResponse({'detail': 'Malformed JSON request body.'}, status=400)
+
+    serializer = ReserveBoothSlotSerializer(data=body)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    vendor_type = serializer.validated_data.get('vendor_type')
+
+    try:
+        admission = await sync_to_async(check_admission)(request, [event])
+    except AdmissionDenied as e:
+        return _admission_denied_response(e)
+
+    if sold_out_events([event], vendor_type):
+        await sync_to_async(release_admission)(admission)
+        return JsonResponse(
+            {'error': f'No {vendor_type} spots available for this event'},
+            status=400
+        )
+
+    price_amount = get_price_for_vendor_type(vendor_type)
+
+    # Claim the spot and create the booking in one transaction
+    expires_at = hold_expiry()
+    try:
+        booking = await sync_to_async(create_booking_from_data)(
+            event, serializer.validated_data, hold_expires_at=expires_at
+        )
+    except SpotsUnavailable:
+        await sync_to_async(release_admission)(admission)
+        return JsonResponse(
+            {'error': f'No {vendor_type} spots available for this event'},
+            status=400
+        )
+
+    try:
+        checkout_session = await create_checkout_session_async(
+            idempotency_key=request.stripe_idempotency_key,
+            **single_checkout_params(
+                event, booking, vendor_type, price_amount, get_frontend_url(request), expires_at
+            )
+        )
+    except stripe.error.StripeError as e:
+        # Clean up booking and return the spot (and the admission) if Stripe fails
+        await sync_to_async(release_bookings)([booking], vendor_type)
+        await sync_to_async(release_admission)(admission)
+        return JsonResponse({'error': f'Stripe error: {str(e)}'}, status=500)
+
+    await booking_model(vendor_type).objects.filter(pk=booking.pk).aupdate(
+        stripe_payment_id=checkout_session.id,
+        payment_status='authorized',
+        amount_paid=price_amount,
+    )
+
+    return JsonResponse({
+        'checkout_url': checkout_session.url,
+        'session_id': checkout_session.id,
+        'booking_id': booking.id,
+    })
+
+
+@csrf_exempt
+@require_POST
+@throttled
+@idempotent
+async def reserve_multi_event_spots_async(request):
+    """Reserve multiple dates at once"""
+    body = _json_body(request)
+    if body is None:
+        return JsonResponse({'detail': 'Malformed JSON request body.'}, status=400)
+
+    serializer = MultiDateReservationSerializer(data=body)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    reservations = serializer.validated_data.get('reservations', [])
+    if not reservations:
+        return JsonResponse({'error': 'No reservations provided'}, status=400)
+
+    multi_date_group_id = str(uuid.uuid4())
+
+    try:
+        validated, vendor_type, total_price = validate_multi_reservations(reservations)
+        events_by_date = await Event.objects.ain_bulk(
+            [event_date for _, event_date, _ in validated if event_date],
+            field_name='date'
+        )
+        items = match_events(validated, events_by_date)
+    except ReservationError as e:
+        return JsonResponse(e.payload, status=400)
+
+    events = [event for event, _ in items]
+    try:
+        admission = await sync_to_async(check_admission)(request, events)
+    except AdmissionDenied as e:
+        return _admission_denied_response(e)
+
+    sold_out = sold_out_events(events, vendor_type)
+    if sold_out:
+        await sync_to_async(release_admission)(admission)
+        return JsonResponse(
+            {'error': f'No {vendor_type} spots available for {sold_out[0].date}'},
+            status=400
+        )
+
+    expires_at = hold_expiry()
+    try:
+        bookings = await sync_to_async(create_bookings_in_bulk)(
+            items,
+            vendor_type,
+            multi_date_group_id=multi_date_group_id,
+            hold_expires_at=expires_at
+        )
+    except SpotsUnavailable as e:
+        await sync_to_async(release_admission)(admission)
+        sold_out = next(event for event, _ in items if event.id == e.event_id)
+        return JsonResponse(
+            {'error': f'No {vendor_type} spots available for {sold_out.date}'},
+            status=400
+        )
+    except Exception as e:
+        await sync_to_async(release_admission)(admission)
+        return JsonResponse({'error': f'Failed to create bookings: {str(e)}'}, status=500)
+
+    try:
+        checkout_session = await create_checkout_session_async(
+            idempotency_key=request.stripe_idempotency_key,
+            **multi_checkout_params(
+                bookings, multi_date_group_id, vendor_type, total_price,
+                get_frontend_url(request), expires_at
+            )
+        )
+    except stripe.error.StripeError as e:
+        # Clean up bookings and return the spots (and the admission) if Stripe fails
+        await sync_to_async(release_bookings)(bookings, vendor_type)
+        await sync_to_async(release_admission)(admission)
+        return JsonResponse({'error': f'Stripe error: {str(e)}'}, status=500)
+
+    await booking_model(vendor_type).objects.filter(
+        multi_date_group_id=multi_date_group_id
+    ).aupdate(
+        stripe_payment_id=checkout_session.id,
+        payment_status='authorized',
+        amount_paid=get_price_for_vendor_type(vendor_type),
+    )
+
+    return JsonResponse({
+        'checkout_url': checkout_session.url,
+        'session_id': checkout_session.id,
+        'total_price': total_price,
+        'num_dates': len(bookings),
+        'booking_ids': [b.id for b in bookings],
+    })
+
+
+@require_GET
+@throttled
+async def booking_status(request, session_id):
+    """
+    Get booking status by Stripe session ID. With ?wait=<seconds> an unpaid
+    session is held open until its bookings are approved (or expire), up
+    to BOOKING_STATUS_MAX_WAIT_SECONDS.
+    """
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        wait = math.nan
+    if not math.isfinite(wait):
+        return JsonResponse({'error': 'wait must be a number of seconds'}, status=400)
+    wait = min(max(wait, 0), settings.BOOKING_STATUS_MAX_WAIT_SECONDS)
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI a waiting request would hold a sync worker
+        wait = 0
+
+    payload = await wait_for_booking_status(session_id, wait)
+    if payload is None:
+        return JsonResponse({'error': 'No bookings found for this session'}, status=404)
+    return HttpResponse(payload, content_type='application/json')
+
+
+def _sse(event, data, event_id=None):
+    """One Server-Sent Events message"""
+    lines = [f'id: {event_id}'] if event_id else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {data}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def _availability_events(last_event_id):
+    broadcaster = get_broadcaster()
+    seq = broadcaster.resume_from(last_event_id)
+    yield f'retry: {settings.AVAILABILITY_STREAM_RETRY_MS}\n\n'
+
+    while True:
+        changed = broadcaster.changed()
+        updates = broadcaster.since(seq) if seq is not None else None
+        if updates is None:
+            # New stream, or too far behind to replay: start from the
+            # calendar (cached, so usually no query). Updates published
+            # meanwhile are sent again, which is harmless.
+            seq = broadcaster.position()
+            payload = await sync_to_async(calendar_payload)()
+            yield _sse('snapshot', payload.decode(), broadcaster.event_id(seq))
+            continue
+        for seq, message in updates:
+            yield _sse('availability', json.dumps(message), broadcaster.event_id(seq))
+
+        try:
+            await asyncio.wait_for(changed.wait(), settings.AVAILABILITY_STREAM_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            # Keeps proxies from closing an idle connection
+            yield ': keep-alive\n\n'
+
+
+@require_GET
+@throttled
+async def availability_stream(request):
+    """
+    Live spot counts. Sends a `snapshot` (the calendar payload) first, then
+    an `availability` message with {events: [{id, date,
+    regular_spots_available, food_spots_available}]} whenever they change.
+    """
+    if not isinstance(request, ASGIRequest):
+        # WSGI would drain this endless stream on a sync worker. 204 tells
+        # EventSource to stop reconnecting; the calendar still loads normally.
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(
+        _availability_events(request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
@@ -0,0 +1,150 @@
+"""
+Cached availability payloads, keyed by an inventory version
+
+Every change to spot counts bumps a version number in the cache once its
+transaction commits. Payloads are stored as ready-to-send JSON bytes under
+the version they were built from, so a read that finds the current version
+cached costs two cache lookups and no database queries, and the first read
+after a write rebuilds it.
+
+Reads also carry ETags. The calendar's is a hash of its cached payload, so
+If-None-Match is answered from the cache alone; single events use their
+updated_at, which every inventory change bumps along with the counts.
+
+With REDIS_URL set the version is shared by every worker. With the
+per-process memory cache, other workers only notice a write once their copy
+expires, so payloads there are kept for a short CALENDAR_CACHE_SECONDS.
+"""
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from rest_framework.renderers import JSONRenderer
+from .availability_stream import availability_changed
+from .models import Event
+from .serializers import CalendarEventSerializer, date_window
+
+INVENTORY_VERSION_KEY = 'bookings:inventory-version'
+
+
+def inventory_version():
+    """Current inventory version"""
+    version = cache.get(INVENTORY_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a flushed cache never reuses an old version
+        cache.add(INVENTORY_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(INVENTORY_VERSION_KEY)
+    return version
+
+
+def bump_inventory_version():
+    """Invalidate every payload built from the previous inventory"""
+    try:
+        return cache.incr(INVENTORY_VERSION_KEY)
+    except ValueError:
+        cache.set(INVENTORY_VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def inventory_changed(event_ids=()):
+    """
+    Bump the version once the current transaction commits (now if there is
+    none), and push the new counts of `event_ids` to live streams
+    """
+    transaction.on_commit(bump_inventory_version)
+    availability_changed(event_ids)
+
+
+def _cached_payload(name, build):
+    """(JSON bytes, ETag) for `name` at the current inventory version"""
+    key = f'bookings:{name}:{inventory_version()}'
+    cached = cache.get(key)
+    if cached is None:
+        # Built after reading the version, so a write landing meanwhile at
+        # worst stores newer data under the older key
+        payload = build()
+        cached = (payload, hashlib.sha256(payload).hexdigest()[:32])
+        cache.set(key, cached, timeout=settings.CALENDAR_CACHE_SECONDS)
+    return cached
+
+
+def in_window(queryset, window):
+    """Events of `queryset` dated inside a (from, to) window"""
+    start, end = window
+    queryset = queryset.filter(date__gte=start)
+    if end is not None:
+        queryset = queryset.filter(date__lte=end)
+    return queryset
+
+
+def _calendar(window):
+    def build():
+        events = in_window(Event.objects.order_by('date'), window).values(
+            'id', 'name', 'date',
+            'regular_spots_available', 'food_spots_available',
+            'regular_spots_total', 'food_spots_total',
+        )
+        data = CalendarEventSerializer(
+            [{**event, 'status': 'available'} for event in events], many=True
+        ).data
+        return JSONRenderer().render(data)
+
+    start, end = window
+    return _cached_payload(f'calendar:{start}:{end or ""}', build)
+
+
+def calendar_payload(window=None):
+    """Calendar of the events in a (from, to) window, upcoming by default, as JSON bytes"""
+    return _calendar(window or (timezone.localdate(), None))[0]
+
+
+def calendar_etag(request, *args, **kwargs):
+    """ETag of the calendar payload currently being served"""
+    return _calendar(date_window(request))[1]
+
+
+def event_etag(request, pk=None, date=None, **kwargs):
+    """ETag for reads of one event (by pk or date); None if there is no such event"""
+    lookup = {'pk': pk} if pk is not None else {'date': date}
+    try:
+        updated_at = Event.objects.filter(**lookup).values_list('updated_at', flat=True).first()
+    except (ValueError, TypeError, ValidationError):
+        return None  # malformed pk or date; let the view answer
+    if updated_at is None:
+        return None
+    etag = f'{pk if pk is not None else date}-{updated_at.timestamp():.6f}'
+    # The compact event detail is a different representation of the same data
+    if request.GET.get('slots') == 'compact':
+        etag += '-compact'
+    return etag
+
+
+def conditional_read(etag_func):
+    """
+    Answer If-None-Match with 304 before the view runs, and let shared
+    caches (the CDN) keep successful responses for a few seconds. Browsers
+    revalidate every time, which costs them a 304 when nothing changed.
+    Apply below @api_view, or through method_decorator on viewset methods.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                patch_cache_control(
+                    response,
+                    public=True,
+                    max_age=0,
+                    s_maxage=settings.AVAILABILITY_CDN_MAX_AGE,
+                    stale_while_revalidate=settings.AVAILABILITY_STALE_WHILE_REVALIDATE,
+                )
+            return response
+        return wrapper
+    return decorator
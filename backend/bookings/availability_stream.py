@@ -0,0 +1,185 @@
+"""
+Live availability updates for Server-Sent Events streams
+
+Inventory writes publish the new spot counts of the events they touched
+once their transaction commits. Each process has one Broadcaster that
+keeps the most recent updates in a ring buffer and wakes every waiting
+stream through a single asyncio.Event, so an idle stream is one suspended
+coroutine and nobody polls the database.
+
+Updates reach the broadcasters through a backend. With REDIS_URL set they
+go over Redis pub/sub, one listener thread per process, so a reservation
+made in any worker reaches streams served by every other. Otherwise
+LocalBackend hands them straight to this process's broadcaster, which is
+enough when a single ASGI process serves both writes and streams.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from django.conf import settings
+from django.db import transaction
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+CHANNEL = 'bookings:availability'
+
+# Updates kept for streams that reconnect with Last-Event-ID; a stream that
+# falls further behind than this gets a fresh snapshot instead
+HISTORY_SIZE = 256
+
+
+class LocalBackend:
+    """In-process stand-in: messages only reach this process"""
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, message):
+        self._deliver(message)
+
+
+class RedisBackend:
+    """Messages shared by every process through Redis pub/sub"""
+
+    def __init__(self, url, channel=CHANNEL):
+        self._client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def start(self, deliver):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda item: deliver(json.loads(item['data']))})
+        pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True, exception_handler=self._listener_failed
+        )
+
+    def publish(self, message):
+        self._client.publish(self.channel, json.dumps(message))
+
+    def _listener_failed(self, error, pubsub, thread):
+        # Keep listening; redis-py resubscribes once the connection is back
+        logger.error(f"Listener on {self.channel} lost Redis: {error}")
+        time.sleep(1.0)
+
+
+class Broadcaster:
+    """Fans published updates out to every stream in this process"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        # Stream event ids carry this, so a Last-Event-ID from another
+        # process (or from before a restart) is recognised and not trusted
+        self.instance = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._seq = 0
+        self._loop = None
+        self._changed = None
+        backend.start(self.deliver)
+
+    def publish(self, message):
+        """Send an update to every process; failures are logged, never raised"""
+        try:
+            self.backend.publish(message)
+        except Exception as e:
+            logger.error(f"Could not publish availability update: {e}")
+
+    def deliver(self, message):
+        """Record an update from the backend and wake the streams (any thread)"""
+        with self._lock:
+            self._seq += 1
+            self._history.append((self._seq, message))
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def changed(self):
+        """
+        Event set by the next update. Take it before reading updates, so one
+        landing in between still wakes the caller.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            with self._lock:
+                self._loop = loop
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def position(self):
+        """Sequence number of the latest update"""
+        with self._lock:
+            return self._seq
+
+    def since(self, seq):
+        """[(seq, message)] published after `seq`, or None if some are no longer kept"""
+        with self._lock:
+            oldest = self._history[0][0] if self._history else self._seq + 1
+            if seq > self._seq or seq < oldest - 1:
+                return None
+            return [(n, message) for n, message in self._history if n > seq]
+
+    def event_id(self, seq):
+        return f'{self.instance}-{seq}'
+
+    def resume_from(self, last_event_id):
+        """Sequence number to resume a reconnecting stream from, or None"""
+        instance, _, seq = (last_event_id or '').partition('-')
+        if instance != self.instance or not seq.isdigit():
+            return None
+        seq = int(seq)
+        return seq if self.since(seq) is not None else None
+
+
+def pubsub_backend(channel):
+    """Redis pub/sub on `channel` when REDIS_URL is set, else the in-process stand-in"""
+    if settings.REDIS_URL and REDIS_AVAILABLE:
+        return RedisBackend(settings.REDIS_URL, channel)
+    if settings.REDIS_URL:
+        logger.warning(f"redis not installed. Messages on {channel} stay in this process.")
+    return LocalBackend()
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster():
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = Broadcaster(pubsub_backend(CHANNEL))
+        return _broadcaster
+
+
+def publish_availability(event_ids):
+    """Publish the current spot counts of `event_ids` (one query)"""
+    event_ids = set(event_ids)
+    rows = Event.objects.filter(pk__in=event_ids).values(
+        'id', 'date', 'regular_spots_available', 'food_spots_available'
+    )
+    events = [{**row, 'date': row['date'].isoformat()} for row in rows]
+    # Whatever did not come back has been deleted
+    events += [{'id': pk, 'deleted': True} for pk in event_ids - {row['id'] for row in events}]
+    if events:
+        get_broadcaster().publish({'events': events})
+
+
+def availability_changed(event_ids):
+    """Publish `event_ids`' counts once the current transaction commits"""
+    event_ids = list(event_ids)
+    if event_ids:
+        transaction.on_commit(lambda: publish_availability(event_ids))
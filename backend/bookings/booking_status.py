@@ -0,0 +1,213 @@
+"""
+Booking status by Stripe Checkout Session, for the checkout success page
+
+The response is built from one indexed query over both booking tables
+that selects only the columns it needs, with the event date joined in
+SQL, and is cached as JSON bytes per session. Every path that changes a
+session's bookings (webhook approval, hold expiry, admin edits) drops the
+cached copy once its transaction commits, so polling an unchanged session
+costs one cache lookup.
+
+The same paths announce the change on a pub/sub channel (see
+availability_stream.pubsub_backend), which wakes requests long-polling
+for that session in any process instead of having them poll.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, Value
+from rest_framework.renderers import JSONRenderer
+from .availability_stream import pubsub_backend
+from .snapshots import BOOKING_MODELS, HOLD_STATUSES
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'bookings:booking-status'
+
+# Booking columns the response is built from
+STATUS_FIELDS = (
+    'id', 'event_id', 'event__date', 'booth_slot_id',
+    'first_name', 'last_name', 'business_name', 'additional_notes',
+    'payment_status', 'is_paid', 'amount_paid',
+    'is_multi_date', 'multi_date_group_id', 'timestamp',
+)
+
+
+def _cache_key(session_id):
+    return f'bookings:status:{session_id}'
+
+
+def _bookings(session_id):
+    """Both tables' bookings for a session, regular first, newest first"""
+    general, food = (
+        model.objects.filter(stripe_payment_id=session_id)
+        .order_by()
+        .values(*STATUS_FIELDS)
+        .annotate(vendor_type=Value(vendor_type, output_field=CharField()))
+        for model, vendor_type in BOOKING_MODELS
+    )
+    rows = list(general.union(food, all=True))
+    rows.sort(key=lambda row: row['timestamp'], reverse=True)
+    rows.sort(key=lambda row: row['vendor_type'] == 'food')
+    return rows
+
+
+def _build(session_id):
+    bookings = _bookings(session_id)
+    if not bookings:
+        return None
+
+    first_booking = bookings[0]
+
+    # Parse additional_notes to get selected dates if stored
+    selected_dates = []
+    try:
+        if first_booking['additional_notes']:
+            notes_data = json.loads(first_booking['additional_notes'])
+            selected_dates = notes_data.get('selectedDates', [])
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        pass
+
+    return JSONRenderer().render({
+        'status': 'success',
+        'payment_status': first_booking['payment_status'],
+        'is_paid': first_booking['is_paid'],
+        'num_dates': len(bookings),
+        'total_price': sum(float(b['amount_paid']) for b in bookings),
+        'first_name': first_booking['first_name'],
+        'last_name': first_booking['last_name'],
+        'business_name': first_booking['business_name'],
+        'selected_dates': selected_dates or [b['event__date'].strftime('%Y-%m-%d') for b in bookings],
+        'bookings': [
+            {
+                'id': b['id'],
+                'vendor_type': b['vendor_type'],
+                'event': b['event_id'],
+                'event_date': b['event__date'],
+                'booth_slot': b['booth_slot_id'],
+                'payment_status': b['payment_status'],
+                'is_paid': b['is_paid'],
+                'amount_paid': str(b['amount_paid']),
+                'is_multi_date': b['is_multi_date'],
+                'multi_date_group_id': b['multi_date_group_id'],
+                'timestamp': b['timestamp'],
+            }
+            for b in bookings
+        ],
+    })
+
+
+def booking_status_payload(session_id):
+    """Status of a session's bookings as JSON bytes, or None if it has none"""
+    payload = cache.get(_cache_key(session_id))
+    if payload is None:
+        payload = _build(session_id)
+        # Unknown sessions are not cached: their bookings may be moments away
+        if payload is not None:
+            cache.set(_cache_key(session_id), payload, timeout=settings.BOOKING_STATUS_CACHE_SECONDS)
+    return payload
+
+
+class SessionWaiters:
+    """Requests in this process waiting for a session's bookings to change"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._waiting = defaultdict(set)
+        backend.start(lambda message: self.wake(message['sessions']))
+
+    def watch(self, session_id):
+        """asyncio.Event set when `session_id` next changes"""
+        changed = asyncio.Event()
+        with self._lock:
+            self._waiting[session_id].add((asyncio.get_running_loop(), changed))
+        return changed
+
+    def unwatch(self, session_id, changed):
+        with self._lock:
+            waiters = self._waiting.get(session_id, set())
+            waiters.difference_update({w for w in waiters if w[1] is changed})
+            if not waiters:
+                self._waiting.pop(session_id, None)
+
+    def wake(self, session_ids):
+        """Set the events of every request waiting on `session_ids` (any thread)"""
+        with self._lock:
+            waiters = [w for session_id in session_ids for w in self._waiting.get(session_id, ())]
+        for loop, changed in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(changed.set)
+
+    def publish(self, session_ids):
+        """Tell every process; failures are logged, never raised"""
+        try:
+            self.backend.publish({'sessions': session_ids})
+        except Exception as e:
+            logger.error(f"Could not publish booking status change: {e}")
+
+
+_waiters = None
+_waiters_lock = threading.Lock()
+
+
+def get_waiters():
+    global _waiters
+    with _waiters_lock:
+        if _waiters is None:
+            _waiters = SessionWaiters(pubsub_backend(CHANNEL))
+        return _waiters
+
+
+def booking_status_changed(session_ids):
+    """
+    Once the current transaction commits, drop the cached status of
+    `session_ids` and wake requests waiting on them
+    """
+    session_ids = sorted({session_id for session_id in session_ids if session_id})
+    if not session_ids:
+        return
+
+    def changed():
+        cache.delete_many([_cache_key(session_id) for session_id in session_ids])
+        get_waiters().publish(session_ids)
+
+    transaction.on_commit(changed)
+
+
+def _settled(payload):
+    """False while the session's bookings are still holding unpaid spots"""
+    return json.loads(payload)['payment_status'] not in HOLD_STATUSES
+
+
+async def wait_for_booking_status(session_id, timeout):
+    """
+    Status of a session's bookings as JSON bytes (None if it has none),
+    waiting up to `timeout` seconds for an unpaid booking to be approved,
+    expire or be cancelled. The request is parked, not polling, until the
+    session changes.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    waiters = get_waiters()
+    # Watch before reading, so a change landing in between still wakes us
+    changed = waiters.watch(session_id)
+    try:
+        while True:
+            changed.clear()
+            payload = await sync_to_async(booking_status_payload)(session_id)
+            remaining = deadline - loop.time()
+            if payload is None or remaining <= 0 or _settled(payload):
+                return payload
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        waiters.unwatch(session_id, changed)
@@ -0,0 +1,114 @@
+"""
+Stripe Checkout Session parameters for vendor reservations
+
+Shared by the sync and async reserve views so both send Stripe exactly the
+same session, whichever HTTP client makes the call.
+"""
+from django.conf import settings
+
+
+def get_price_for_vendor_type(vendor_type, event=None):
+    """Get price based on vendor type"""
+    if vendor_type == 'food':
+        return 75.00  # Food truck price
+    return 35.00  # Regular vendor price
+
+
+def get_frontend_url(request):
+    """Frontend base URL to send the vendor back to after checkout"""
+    origin = request.headers.get('Origin')
+    if origin and ('vercel.app' in origin or 'localhost' in origin or '127.0.0.1' in origin):
+        return origin.rstrip('/')
+    return settings.FRONTEND_BASE_URL.rstrip('/')
+
+
+def single_checkout_params(event, booking, vendor_type, price_amount, frontend_url, expires_at):
+    """Checkout Session parameters for a single-date booking"""
+    vendor_type_label = 'Food Truck' if vendor_type == 'food' else 'Vendor'
+
+    return dict(
+        payment_method_types=['card'],
+        line_items=[{
+            'price_data': {
+                'currency': 'usd',
+                'product_data': {
+                    'name': f'{event.name} - {vendor_type_label} Spot',
+                    'description': (
+                        f'Event: {event.name}\n'
+                        f'Date: {event.date}\n'
+                        f'Vendor Type: {vendor_type_label}\n'
+                        f'Booking ID: {booking.id}'
+                    ),
+                },
+                'unit_amount': int(price_amount * 100),  # Convert to cents
+            },
+            'quantity': 1,
+        }],
+        mode='payment',
+        payment_intent_data={
+            'capture_method': 'manual',  # Requires manual approval
+            'metadata': {
+                'booking_id': str(booking.id),
+                'vendor_type': vendor_type,
+            }
+        },
+        allow_promotion_codes=True,
+        success_url=f"{frontend_url}/checkout/success?session_id={{CHECKOUT_SESSION_ID}}",
+        cancel_url=f"{frontend_url}/checkout/cancel",
+        expires_at=int(expires_at.timestamp()),
+        metadata={
+            'booking_id': str(booking.id),
+            'vendor_type': vendor_type,
+            'event_date': str(event.date),
+            'is_multi_date': 'false',
+        },
+    )
+
+
+def multi_checkout_params(bookings, multi_date_group_id, vendor_type, total_price, frontend_url, expires_at):
+    """Checkout Session parameters for a multi-date package"""
+    vendor_type_label = 'Food Truck' if vendor_type == 'food' else 'Vendor'
+    dates = [b.event.date.strftime('%Y-%m-%d') for b in bookings]
+    dates_str = ', '.join(dates)
+
+    line_items = [{
+        'price_data': {
+            'currency': 'usd',
+            'product_data': {
+                'name': f'Multi-Day Market Package - {len(bookings)} Days',
+                'description': (
+                    f'{vendor_type_label} Package\n'
+                    f'Dates: {dates_str}\n'
+                    f'Booking IDs: {",".join([str(b.id) for b in bookings])}'
+                ),
+            },
+            'unit_amount': int(total_price * 100),
+        },
+        'quantity': 1,
+    }]
+
+    return dict(
+        payment_method_types=['card'],
+        line_items=line_items,
+        mode='payment',
+        payment_intent_data={
+            'capture_method': 'manual',
+            'metadata': {
+                'multi_date_group_id': multi_date_group_id,
+                'num_bookings': str(len(bookings)),
+                'vendor_type': vendor_type,
+            }
+        },
+        allow_promotion_codes=True,
+        success_url=f"{frontend_url}/checkout/success?session_id={{CHECKOUT_SESSION_ID}}",
+        cancel_url=f"{frontend_url}/checkout/cancel",
+        expires_at=int(expires_at.timestamp()),
+        metadata={
+            'booking_ids': ','.join([str(b.id) for b in bookings]),
+            'multi_date_group_id': multi_date_group_id,
+            'num_dates': str(len(bookings)),
+            'vendor_type': vendor_type,
+            'total_price': str(total_price),
+            'is_multi_date': 'true',
+        },
+    )
@@ -0,0 +1,131 @@
+"""
+Local stand-in for the Stripe API, for benchmarks and offline checks
+
+Answers just enough of the API for this app (Checkout Session creation
+and listing events) with canned objects after an injected delay, so client
+behaviour under realistic Stripe latency can be measured without network
+access or keys.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Request-Id', f'req_{uuid.uuid4().hex[:14]}')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        params = dict(parse_qsl(self.rfile.read(length).decode()))
+        self.server.record(self.path)
+        time.sleep(self.server.latency)
+
+        if self.path == '/v1/checkout/sessions':
+            session_id = f'cs_test_{uuid.uuid4().hex}'
+            self._send_json(200, {
+                'id': session_id,
+                'object': 'checkout.session',
+                'url': f'https://checkout.stripe.test/pay/{session_id}',
+                'mode': params.get('mode', 'payment'),
+                'status': 'open',
+                'payment_status': 'unpaid',
+                'expires_at': int(params.get('expires_at') or time.time() + 1800),
+                'metadata': {
+                    key[len('metadata['):-1]: value
+                    for key, value in params.items() if key.startswith('metadata[')
+                },
+            })
+            return
+
+        self._send_json(404, {'error': {
+            'type': 'invalid_request_error',
+            'message': f'Unrecognized request URL (POST: {self.path})',
+        }})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qsl(url.query)
+        self.server.record(url.path)
+        time.sleep(self.server.latency)
+
+        if url.path == '/v1/events':
+            self._send_json(200, self.server.list_events(params))
+            return
+
+        self._send_json(404, {'error': {
+            'type': 'invalid_request_error',
+            'message': f'Unrecognized request URL (GET: {url.path})',
+        }})
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    """Threaded fake Stripe API; use as a context manager"""
+    daemon_threads = True
+    request_queue_size = 1024  # absorb a burst of concurrent connects
+
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0, events=()):
+        super().__init__((host, port), FakeStripeHandler)
+        self.latency = latency
+        # Served by GET /v1/events, newest first like the real API
+        self.events = sorted(events, key=lambda event: event['created'], reverse=True)
+        self.requests = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record(self, path):
+        with self._lock:
+            self.requests.append(path)
+
+    def list_events(self, params):
+        """One page of events, honouring limit, starting_after, created[gte] and types[]"""
+        query = dict(params)
+        types = {value for key, value in params if key.startswith('types[')}
+        since = int(query.get('created[gte]', 0))
+        events = [
+            event for event in self.events
+            if event['created'] >= since and (not types or event['type'] in types)
+        ]
+        if query.get('starting_after'):
+            ids = [event['id'] for event in events]
+            events = events[ids.index(query['starting_after']) + 1:] if query['starting_after'] in ids else []
+        limit = int(query.get('limit', 10))
+        return {
+            'object': 'list',
+            'url': '/v1/events',
+            'data': events[:limit],
+            'has_more': len(events) > limit,
+        }
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response are expected when a run is cut short
+        pass
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,130 @@
+"""
+Time-boxed holds on event spots
+
+A reservation claims a spot straight away (see inventory.py) and keeps it
+for a limited time while the vendor is in Stripe Checkout. Holds that are
+never paid for are expired in bulk and their spots go back on sale.
+"""
+import logging
+from collections import Counter
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .booking_status import booking_status_changed
+from .inventory import release_spots_bulk
+from .models import BoothSlot
+from .scheduler import start_periodic_job
+from .snapshots import BOOKING_MODELS, HOLD_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Stripe only accepts Checkout Session expiry times between 30 minutes and
+# 24 hours out, and the hold must not lapse before the session does
+STRIPE_MIN_SESSION_SECONDS = 30 * 60
+STRIPE_MAX_SESSION_SECONDS = 24 * 60 * 60
+
+# The expiry is worked out before the booking insert and the Stripe call,
+# so it must still be over 30 minutes away when Stripe sees it
+STRIPE_SESSION_MARGIN_SECONDS = 2 * 60
+
+def hold_ttl():
+    """How long an unpaid reservation keeps its spot"""
+    shortest = STRIPE_MIN_SESSION_SECONDS + STRIPE_SESSION_MARGIN_SECONDS
+    seconds = getattr(settings, 'BOOKING_HOLD_TTL_SECONDS', shortest)
+    seconds = min(max(seconds, shortest), STRIPE_MAX_SESSION_SECONDS)
+    return timedelta(seconds=seconds)
+
+
+def hold_expiry(now=None):
+    """Expiry time for a hold taken now"""
+    return (now or timezone.now()) + hold_ttl()
+
+
+def _expire(condition, now):
+    """Expire every unpaid booking matching `condition` and free its spot"""
+    released = Counter()
+    slot_ids = []
+    session_ids = set()
+    expired = 0
+
+    with transaction.atomic():
+        for model, vendor_type in BOOKING_MODELS:
+            rows = list(
+                model.objects
+                .filter(condition, payment_status__in=HOLD_STATUSES)
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'event_id', 'booth_slot_id', 'stripe_payment_id')
+            )
+            if not rows:
+                continue
+
+            model.objects.filter(id__in=[row[0] for row in rows]).update(
+                payment_status='expired',
+                hold_expires_at=None,
+                updated_at=now,
+            )
+            for _, event_id, slot_id, session_id in rows:
+                released[(event_id, vendor_type)] += 1
+                if slot_id:
+                    slot_ids.append(slot_id)
+                session_ids.add(session_id)
+            expired += len(rows)
+
+        if slot_ids:
+            BoothSlot.objects.filter(id__in=slot_ids).update(is_available=True, held_until=None)
+        release_spots_bulk(released)
+        booking_status_changed(session_ids)
+
+    if expired:
+        logger.info(f"Expired {expired} holds across {len(released)} event/type pairs")
+    return expired
+
+
+def expire_stale_holds(now=None):
+    """Expire every hold whose lease has run out; returns the number expired"""
+    now = now or timezone.now()
+    return _expire(Q(hold_expires_at__lte=now), now)
+
+
+def expire_session_holds(session_id):
+    """Expire the holds behind a Stripe Checkout Session that has expired"""
+    return _expire(Q(stripe_payment_id=session_id), timezone.now())
+
+
+def confirm_session_holds(session_id, payment_intent_id='', booking_ids=None, vendor_type=None):
+    """
+    Stop the clock on holds whose checkout has completed, and remember the
+    PaymentIntent that will pay for them.
+
+    Payments are captured manually, so a completed checkout can sit in
+    'authorized' for days waiting for approval and must not be swept.
+    `booking_ids` and `vendor_type` (from the session metadata) narrow the
+    lookup to primary keys in one table; the session id still has to match.
+    """
+    changes = {'hold_expires_at': None}
+    if payment_intent_id:
+        changes['stripe_payment_intent_id'] = payment_intent_id
+    condition = Q(stripe_payment_id=session_id)
+    if booking_ids:
+        condition &= Q(pk__in=booking_ids)
+
+    slot_ids = []
+    with transaction.atomic():
+        for model, model_vendor_type in BOOKING_MODELS:
+            if booking_ids and vendor_type and model_vendor_type != vendor_type:
+                continue
+            bookings = model.objects.filter(condition, payment_status__in=HOLD_STATUSES)
+            slot_ids += [
+                slot_id for slot_id in bookings.values_list('booth_slot_id', flat=True) if slot_id
+            ]
+            bookings.update(**changes, updated_at=timezone.now())
+        if slot_ids:
+            BoothSlot.objects.filter(id__in=slot_ids).update(held_until=None)
+
+
+def start_hold_sweeper(interval=None):
+    """Run expire_stale_holds() periodically on a background thread"""
+    interval = interval or getattr(settings, 'BOOKING_HOLD_SWEEP_INTERVAL_SECONDS', 0) or 60
+    return start_periodic_job('hold-sweeper', interval, expire_stale_holds)
@@ -0,0 +1,190 @@
+"""
+Idempotency-Key support for the reserve endpoints
+
+A client that sends an Idempotency-Key header gets exactly one reservation
+per key: the first request runs, concurrent repeats get 409 while it is in
+flight, and later repeats get the stored response back without touching
+inventory or Stripe. Keys live in the database, so they hold across every
+worker process, and expire after IDEMPOTENCY_KEY_TTL_SECONDS.
+
+Responses below 500 are stored. A 5xx drops the key so the client can retry
+with it; the view has already released anything it reserved by then. So do
+waiting-room rejections (403/429), which happen before anything is reserved.
+"""
+import hashlib
+import inspect
+import json
+from datetime import timedelta
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.response import Response
+from .models import IdempotentRequest
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# Turned away before doing any work: the same request may be retried later
+RETRYABLE_STATUSES = (403, 429)
+IN_FLIGHT = (409, {'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'}, False)
+
+
+def _request_key(request):
+    """(key, error) from the request headers; key is None when not sent"""
+    key = request.headers.get(IDEMPOTENCY_HEADER, '').strip()
+    if not key:
+        return None, None
+    if len(key) > MAX_KEY_LENGTH:
+        return None, (400, {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'}, False)
+    return key, None
+
+
+def stripe_idempotency_key(record):
+    """
+    Key sent to Stripe for the Checkout Session of this attempt. It is
+    derived from the stored record rather than reused verbatim, because a
+    retry after a 5xx creates new bookings, so the session parameters change.
+    """
+    digest = hashlib.sha256(f'{record.scope}|{record.key}|{record.pk}'.encode()).hexdigest()
+    return f'reserve-{digest}'
+
+
+def begin_request(scope, key, request_hash):
+    """
+    Claim `key` for a new request. Returns (record, None) when the caller
+    should go ahead, or (None, (status, body, replayed)) to answer
+    immediately, where `replayed` marks a stored response.
+    """
+    now = timezone.now()
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotentRequest.objects.create(
+                    scope=scope,
+                    key=key,
+                    request_hash=request_hash,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+                )
+            return record, None
+        except IntegrityError:
+            pass
+
+        existing = IdempotentRequest.objects.filter(scope=scope, key=key).first()
+        if existing is None:
+            continue  # deleted under us; claim it again
+
+        abandoned = (
+            existing.response_status is None
+            and existing.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        )
+        if existing.expires_at <= now or abandoned:
+            # Stale: drop it (unless someone else just did) and claim it again
+            IdempotentRequest.objects.filter(
+                pk=existing.pk, response_status=existing.response_status
+            ).delete()
+            continue
+
+        if existing.request_hash != request_hash:
+            return None, (422, {
+                'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'
+            }, False)
+        if existing.response_status is None:
+            return None, IN_FLIGHT
+        return None, (existing.response_status, existing.response_body, True)
+
+    return None, IN_FLIGHT
+
+
+def finish_request(record, status_code, body):
+    """Store the response for replay, or release the key if it may be retried"""
+    if status_code >= 500 or status_code in RETRYABLE_STATUSES:
+        IdempotentRequest.objects.filter(pk=record.pk).delete()
+        return
+    IdempotentRequest.objects.filter(pk=record.pk).update(
+        response_status=status_code, response_body=body
+    )
+
+
+def abandon_request(record):
+    """Release the key when the view raised instead of responding"""
+    IdempotentRequest.objects.filter(pk=record.pk).delete()
+
+
+def purge_expired_requests(now=None):
+    """Delete stored keys past their TTL; returns how many were removed"""
+    deleted, _ = IdempotentRequest.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
+
+
+def _response_body(response):
+    """JSON body of a DRF Response or JsonResponse"""
+    if hasattr(response, 'data'):
+        return response.data
+    return json.loads(response.content or b'null')
+
+
+def _start(request):
+    """Claim the request's key, if any: (record, outcome) as from begin_request"""
+    request.stripe_idempotency_key = None
+    key, error = _request_key(request)
+    if key is None:
+        return None, error
+    request_hash = hashlib.sha256(request.body).hexdigest()
+    record, outcome = begin_request(request.path, key, request_hash)
+    if record is not None:
+        request.stripe_idempotency_key = stripe_idempotency_key(record)
+    return record, outcome
+
+
+def _finish(record, response):
+    if record is not None:
+        finish_request(record, response.status_code, _response_body(response))
+
+
+def idempotent(view):
+    """
+    Honour the Idempotency-Key header on a reserve view. Works on DRF
+    function views (apply it below @api_view) and on async Django views.
+    The view should pass request.stripe_idempotency_key on to Stripe.
+    """
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            record, outcome = await sync_to_async(_start)(request)
+            if outcome is not None:
+                status_code, body, replayed = outcome
+                response = JsonResponse(body, status=status_code, safe=False)
+                if replayed:
+                    response[REPLAYED_HEADER] = 'true'
+                return response
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                if record is not None:
+                    await sync_to_async(abandon_request)(record)
+                raise
+            await sync_to_async(_finish)(record, response)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        record, outcome = _start(request)
+        if outcome is not None:
+            status_code, body, replayed = outcome
+            response = Response(body, status=status_code)
+            if replayed:
+                response[REPLAYED_HEADER] = 'true'
+            return response
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            if record is not None:
+                abandon_request(record)
+            raise
+        _finish(record, response)
+        return response
+    return wrapper
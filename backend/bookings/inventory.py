@@ -0,0 +1,230 @@
+"""
+Inventory reservation engine for event spots
+
+Spots are claimed when a vendor starts checkout instead of when Stripe
+confirms payment. Each claim is a single conditional UPDATE on the event
+row, so concurrent buyers only queue behind each other on the event they
+are fighting over, and a counter can never be driven below zero.
+"""
+import logging
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import Least
+from django.utils import timezone
+from .availability_cache import inventory_changed
+from .models import Event
+from .snapshots import BOOKING_MODELS, HOLD_STATUSES, adjust_snapshots, rebuild_snapshots
+
+logger = logging.getLogger(__name__)
+
+AVAILABLE_FIELDS = {
+    'regular': 'regular_spots_available',
+    'food': 'food_spots_available',
+}
+
+TOTAL_FIELDS = {
+    'regular': 'regular_spots_total',
+    'food': 'food_spots_total',
+}
+
+
+class SpotsUnavailable(Exception):
+    """Raised when an event has no spots left for the requested vendor type"""
+
+    def __init__(self, event_id, vendor_type):
+        self.event_id = event_id
+        self.vendor_type = vendor_type
+        super().__init__(f'No {vendor_type} spots available for event {event_id}')
+
+
+def available_field(vendor_type):
+    """Name of the availability counter for a vendor type"""
+    if vendor_type == 'food':
+        return AVAILABLE_FIELDS['food']
+    return AVAILABLE_FIELDS['regular']
+
+
+def total_field(vendor_type):
+    """Name of the capacity column for a vendor type"""
+    if vendor_type == 'food':
+        return TOTAL_FIELDS['food']
+    return TOTAL_FIELDS['regular']
+
+
+def claim_spots(event_id, vendor_type, quantity=1):
+    """
+    Atomically take `quantity` spots from an event.
+
+    The availability check and the decrement happen in the same UPDATE, so
+    two requests racing for the last spot cannot both succeed.
+    """
+    field = available_field(vendor_type)
+    with transaction.atomic():
+        updated = Event.objects.filter(
+            pk=event_id,
+            **{f'{field}__gte': quantity}
+        ).update(**{field: F(field) - quantity, 'updated_at': timezone.now()})
+
+        if not updated:
+            raise SpotsUnavailable(event_id, vendor_type)
+        adjust_snapshots({(event_id, vendor_type): {'held': quantity, 'free': -quantity}})
+    inventory_changed([event_id])
+
+
+def claim_spots_for_events(event_ids, vendor_type):
+    """
+    Claim one spot per entry in `event_ids`, all or nothing.
+
+    However many events are involved this costs two statements: the event
+    rows are locked in primary key order (so overlapping multi-date
+    reservations cannot deadlock) and then decremented by one conditional
+    UPDATE. If any event is short, nothing is claimed.
+    """
+    counts = Counter(event_ids)
+    if not counts:
+        return
+
+    field = available_field(vendor_type)
+    has_enough = Q()
+    for event_id, quantity in counts.items():
+        has_enough |= Q(pk=event_id, **{f'{field}__gte': quantity})
+
+    with transaction.atomic():
+        list(
+            Event.objects.filter(pk__in=counts)
+            .order_by('pk')
+            .select_for_update()
+            .values_list('pk', flat=True)
+        )
+        updated = Event.objects.filter(has_enough).update(**{
+            field: F(field) - _per_event(counts),
+            'updated_at': timezone.now(),
+        })
+        if updated != len(counts):
+            sold_out = (
+                Event.objects.filter(pk__in=counts)
+                .exclude(has_enough)
+                .order_by('date')
+                .values_list('pk', flat=True)
+                .first()
+            )
+            # Raising rolls back the events that were decremented
+            raise SpotsUnavailable(sold_out, vendor_type)
+        adjust_snapshots({
+            (event_id, vendor_type): {'held': quantity, 'free': -quantity}
+            for event_id, quantity in counts.items()
+        })
+        inventory_changed(counts)
+
+
+def _per_event(quantities):
+    """CASE expression mapping each event id to its quantity"""
+    return Case(
+        *[When(pk=event_id, then=Value(quantity)) for event_id, quantity in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def release_spots(event_id, vendor_type, quantity=1):
+    """Give spots back to an event, never exceeding its total"""
+    release_spots_bulk({(event_id, vendor_type): quantity})
+
+
+def release_spots_bulk(released):
+    """
+    Give the spots of lapsed or abandoned holds back to many events at once.
+
+    `released` maps (event_id, vendor_type) to a quantity. Every event of a
+    vendor type is updated by one UPDATE with a CASE per event, so expiring
+    a batch of holds costs at most three statements with the snapshots.
+    """
+    per_type = defaultdict(lambda: defaultdict(int))
+    for (event_id, vendor_type), quantity in released.items():
+        if quantity:
+            per_type['food' if vendor_type == 'food' else 'regular'][event_id] += quantity
+
+    now = timezone.now()
+    with transaction.atomic():
+        for vendor_type, per_event in per_type.items():
+            field = available_field(vendor_type)
+            Event.objects.filter(pk__in=per_event).update(**{
+                field: Least(F(field) + _per_event(per_event), F(total_field(vendor_type))),
+                'updated_at': now,
+            })
+        adjust_snapshots({
+            (event_id, vendor_type): {'held': -quantity, 'free': quantity}
+            for vendor_type, per_event in per_type.items()
+            for event_id, quantity in per_event.items()
+        })
+    if per_type:
+        inventory_changed({pk for per_event in per_type.values() for pk in per_event})
+
+
+def spots_taken(event_ids=None):
+    """
+    {(event_id, vendor_type): spots held or approved}, counted by one
+    grouped query over both booking tables
+    """
+    counts = []
+    for model, vendor_type in BOOKING_MODELS:
+        bookings = model.objects.filter(payment_status__in=HOLD_STATUSES + ['approved'])
+        if event_ids is not None:
+            bookings = bookings.filter(event_id__in=event_ids)
+        counts.append(
+            bookings.values('event_id')
+            .annotate(vendor_type=Value(vendor_type, output_field=CharField()), taken=Count('id'))
+            .order_by()
+        )
+    general, food = counts
+    return {
+        (row['event_id'], row['vendor_type']): row['taken']
+        for row in general.union(food, all=True)
+    }
+
+
+def reconcile_inventory(event_ids=None, dry_run=False):
+    """
+    Reset spot counters that have drifted from the bookings.
+
+    An event's true free count per vendor type is its total less the
+    bookings holding or paying for a spot. The event rows are locked while
+    the bookings are counted, so a reservation cannot slip in between, and
+    every drifted counter is fixed by a single bulk UPDATE. Returns the
+    drift as [{'event_id', 'date', 'vendor_type', 'was', 'now'}].
+    """
+    drift = []
+    with transaction.atomic():
+        events = Event.objects.order_by('pk').select_for_update()
+        if event_ids is not None:
+            events = events.filter(pk__in=event_ids)
+        events = list(events.only(
+            'id', 'date', *AVAILABLE_FIELDS.values(), *TOTAL_FIELDS.values()
+        ))
+        taken = spots_taken(event_ids)
+
+        changed = []
+        for event in events:
+            for vendor_type, field in AVAILABLE_FIELDS.items():
+                total = getattr(event, total_field(vendor_type))
+                free = min(max(total - taken.get((event.pk, vendor_type), 0), 0), total)
+                was = getattr(event, field)
+                if was != free:
+                    drift.append({
+                        'event_id': event.pk, 'date': event.date,
+                        'vendor_type': vendor_type, 'was': was, 'now': free,
+                    })
+                    setattr(event, field, free)
+                    if not changed or changed[-1] is not event:
+                        changed.append(event)
+
+        if changed and not dry_run:
+            Event.objects.bulk_update(changed, list(AVAILABLE_FIELDS.values()))
+            drifted = [event.pk for event in changed]
+            rebuild_snapshots(drifted)
+            inventory_changed(drifted)
+
+    if drift:
+        logger.warning(f"{'Found' if dry_run else 'Fixed'} {len(drift)} drifted spot counters across {len(changed)} events")
+    return drift
@@ -0,0 +1,106 @@
+"""
+Management command to benchmark Checkout Session creation
+Usage: python manage.py bench_checkout [--requests 200] [--latency-ms 300]
+
+Runs the same workload against a local fake Stripe server twice: once with
+the blocking stripe client on a fixed pool of threads (one per sync
+worker), and once with the async client on a single event loop.
+"""
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from types import SimpleNamespace
+import stripe
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.checkout import single_checkout_params
+from bookings.fake_stripe import FakeStripeServer
+from bookings.stripe_client import create_checkout_session_async, stats
+
+
+def sample_params(n):
+    """Checkout parameters shaped like a real single-date reservation"""
+    event = SimpleNamespace(name='Spring Market', date=date.today() + timedelta(days=30))
+    booking = SimpleNamespace(id=n)
+    return single_checkout_params(
+        event, booking, 'regular', 35.00, 'http://localhost:3000',
+        timezone.now() + timedelta(minutes=30)
+    )
+
+
+class Command(BaseCommand):
+    help = 'Compare sync and async Stripe Checkout Session creation against a fake Stripe API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Sessions to create per run')
+        parser.add_argument('--latency-ms', type=int, default=300, help='Injected Stripe latency')
+        parser.add_argument(
+            '--sync-workers',
+            type=int,
+            default=2,
+            help='Threads for the sync run, i.e. WSGI workers (default: 2, as in the Dockerfile)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=100,
+            help='Maximum in-flight requests for the async run'
+        )
+
+    def handle(self, *args, **options):
+        total = options['requests']
+        original_base, original_key = stripe.api_base, stripe.api_key
+
+        stats.reset()
+        with FakeStripeServer(latency=options['latency_ms'] / 1000) as fake:
+            # The fake server accepts any key; never send the real one to it
+            stripe.api_base, stripe.api_key = fake.url, 'sk_test_bench'
+            try:
+                sync_result = self.run_sync(total, options['sync_workers'])
+                async_result = asyncio.run(self.run_async(total, options['concurrency']))
+            finally:
+                stripe.api_base, stripe.api_key = original_base, original_key
+
+        self.stdout.write(
+            f"{total} sessions, {options['latency_ms']} ms injected Stripe latency\n"
+        )
+        self.report(f"sync ({options['sync_workers']} workers)", total, *sync_result)
+        self.report(f"async (1 loop, {options['concurrency']} in flight)", total, *async_result)
+
+        self.stdout.write('\nStripe client metrics (both runs):')
+        for endpoint, metrics in stats.snapshot().items():
+            self.stdout.write(f'  {endpoint}: {metrics}')
+
+    def run_sync(self, total, workers):
+        def create(n):
+            started = time.perf_counter()
+            stripe.checkout.Session.create(**sample_params(n))
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            latencies = list(pool.map(create, range(total)))
+        return time.perf_counter() - started, latencies
+
+    async def run_async(self, total, concurrency):
+        gate = asyncio.Semaphore(concurrency)
+
+        async def create(n):
+            async with gate:
+                started = time.perf_counter()
+                await create_checkout_session_async(**sample_params(n))
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(create(n) for n in range(total)))
+        return time.perf_counter() - started, latencies
+
+    def report(self, label, total, elapsed, latencies):
+        ordered = sorted(latencies)
+        p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"{label:<32} {elapsed:7.2f} s  {total / elapsed:8.1f} sessions/s  "
+            f"p50 {statistics.median(ordered) * 1000:6.0f} ms  p95 {p95 * 1000:6.0f} ms"
+        )
@@ -0,0 +1,94 @@
+"""
+Management command to benchmark event listing pagination
+Usage: python manage.py bench_event_listing [--events 10000] [--page-size 100]
+
+Inserts the given number of events (inside a transaction that is rolled
+back afterwards), then times walking the whole listing through the view
+with the date cursor against the same view paginated by LIMIT/OFFSET, and
+the calendar for an upcoming window against every event.
+"""
+import statistics
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.test import APIRequestFactory
+from bookings.availability_cache import bump_inventory_version
+from bookings.models import Event
+from bookings.views import EventViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare cursor and offset pagination of the event listing on a large table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000, help='Events to insert')
+        parser.add_argument('--page-size', type=int, default=100, help='Events per page')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['events'], options['page_size'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # The calendar cache may hold payloads built from the fake events
+            bump_inventory_version()
+
+    def run(self, total, page_size):
+        # Half the events in the past, so the default window has work to skip
+        first = date.today() - timedelta(days=total // 2)
+        Event.objects.bulk_create([
+            Event(name=f'Bench Market {n}', date=first + timedelta(days=n), location='Bench')
+            for n in range(total)
+        ], batch_size=1000)
+        bump_inventory_version()
+        everything = {'from': first.isoformat()}
+
+        factory = APIRequestFactory()
+        # Unthrottled, so small pages do not run into the read limit
+        listing = EventViewSet.as_view({'get': 'list'}, throttle_classes=[])
+        offset_listing = EventViewSet.as_view(
+            {'get': 'list'}, throttle_classes=[], pagination_class=LimitOffsetPagination
+        )
+        calendar = EventViewSet.as_view({'get': 'calendar'}, throttle_classes=[])
+
+        self.stdout.write(f'{total} events, {page_size} per page\n')
+        self.walk('cursor pages', listing, factory, {**everything, 'page_size': page_size})
+        self.walk('offset pages', offset_listing, factory, {**everything, 'limit': page_size})
+
+        for label, query in (('calendar, upcoming', {}), ('calendar, every event', everything)):
+            bump_inventory_version()
+            started = time.perf_counter()
+            response = calendar(factory.get('/api/events/calendar/', query, HTTP_HOST='localhost'))
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label:<28} {elapsed * 1000:8.1f} ms cold  {len(response.content) / 1024:8.1f} KiB'
+            )
+
+    def walk(self, label, view, factory, params):
+        """Follow `next` links through the whole listing, timing each page"""
+        times = []
+        url = '/api/events/'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                started = time.perf_counter()
+                response = view(factory.get(url, params, HTTP_HOST='localhost'))
+                times.append(time.perf_counter() - started)
+                url, params = response.data['next'], None
+        self.report(label, times)
+        self.stdout.write(f'  ran {len(queries)} queries for {len(times)} pages')
+
+    def report(self, label, times):
+        ordered = sorted(times)
+        self.stdout.write(
+            f'{label:<28} first {times[0] * 1000:6.1f} ms  '
+            f'last {times[-1] * 1000:6.1f} ms  p50 {statistics.median(ordered) * 1000:6.1f} ms'
+        )
@@ -0,0 +1,43 @@
+"""
+Management command to expire unpaid spot holds (and stale idempotency keys and spent admissions)
+Usage: python manage.py expire_holds [--loop] [--interval 60]
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from bookings.holds import expire_stale_holds
+from bookings.idempotency import purge_expired_requests
+from bookings.waiting_room import purge_used_admissions
+
+
+class Command(BaseCommand):
+    help = 'Expire reservations whose hold has lapsed and return their spots'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, sweeping every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Seconds between sweeps when running with --loop (default: 60)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_stale_holds()
+            self.stdout.write(f'Expired {expired} holds')
+            purged = purge_expired_requests()
+            if purged:
+                self.stdout.write(f'Purged {purged} expired idempotency keys')
+            purged = purge_used_admissions()
+            if purged:
+                self.stdout.write(f'Purged {purged} spent admission tokens')
+
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
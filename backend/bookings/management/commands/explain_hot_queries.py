@@ -0,0 +1,166 @@
+"""
+Management command to check the query plans of the hot booking queries
+Usage: python manage.py explain_hot_queries [--events 2000] [--bookings-per-event 20]
+
+Seeds a large dataset (inside a transaction that is rolled back
+afterwards), refreshes the planner statistics, then runs EXPLAIN ANALYZE
+on each query the reservation, webhook, status, sweeper and listing paths
+lean on, and prints its plan and timing. Needs PostgreSQL.
+"""
+import uuid
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from bookings.availability_cache import bump_inventory_version
+from bookings.models import (
+    Event, BoothSlot, GeneralVendorBooking, FoodTruckBooking, IdempotentRequest
+)
+from bookings.snapshots import HOLD_STATUSES
+from bookings.slots import CLAIM_SLOT_SQL
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Seed a large dataset and EXPLAIN ANALYZE the hot booking queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000, help='Events to insert')
+        parser.add_argument(
+            '--bookings-per-event', type=int, default=20, help='General vendor bookings per event'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN ANALYZE plans are only meaningful on PostgreSQL')
+        try:
+            with transaction.atomic():
+                self.run(options['events'], options['bookings_per_event'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            # The calendar cache may hold payloads built from the fake events
+            bump_inventory_version()
+
+    def seed(self, total, per_event):
+        """Insert events, slots and bookings; returns sample keys to look up"""
+        now = timezone.now()
+        first = date.today() - timedelta(days=total // 2)
+        events = Event.objects.bulk_create([
+            Event(
+                name=f'Explain Market {n}', date=first + timedelta(days=n), location='Bench',
+                regular_spots_total=per_event + 4, regular_spots_available=4,
+                food_spots_total=2, food_spots_available=1,
+            )
+            for n in range(total)
+        ], batch_size=1000)
+
+        slots = BoothSlot.objects.bulk_create([
+            BoothSlot(
+                event=event, spot_number=f'{number:03d}',
+                slot_type='regular' if number <= per_event + 4 else 'food',
+                is_available=number > per_event and number != per_event + 5,
+            )
+            for event in events
+            for number in range(1, per_event + 7)
+        ], batch_size=5000)
+        slots_by_event = {}
+        for slot in slots:
+            slots_by_event.setdefault(slot.event_id, []).append(slot)
+
+        # Mostly settled bookings, with a few live holds and multi-date groups,
+        # as on a busy season's table
+        general, food = [], []
+        for event in events:
+            event_slots = slots_by_event[event.pk]
+            for n in range(per_event):
+                held = n % 10 == 0
+                group = f'group-{event.pk}-{n // 5}' if n % 3 == 0 else None
+                general.append(GeneralVendorBooking(
+                    event=event, booth_slot=event_slots[n],
+                    first_name='Bench', last_name=str(n), vendor_email='bench@example.com',
+                    phone='5550000', products_selling='Prints',
+                    is_multi_date=group is not None, multi_date_group_id=group,
+                    stripe_payment_id=f'cs_{uuid.uuid4().hex}',
+                    stripe_payment_intent_id='' if held else f'pi_{uuid.uuid4().hex}',
+                    payment_status='authorized' if held else 'approved', is_paid=not held,
+                    hold_expires_at=now + timedelta(minutes=n) if held else None,
+                ))
+            food.append(FoodTruckBooking(
+                event=event, booth_slot=event_slots[per_event + 4],
+                first_name='Bench', last_name='Truck', vendor_email='bench@example.com',
+                phone='5550000', cuisine_type='Tacos', food_items='Tacos',
+                stripe_payment_id=f'cs_{uuid.uuid4().hex}',
+                stripe_payment_intent_id=f'pi_{uuid.uuid4().hex}',
+                payment_status='approved', is_paid=True,
+            ))
+        GeneralVendorBooking.objects.bulk_create(general, batch_size=5000)
+        FoodTruckBooking.objects.bulk_create(food, batch_size=5000)
+
+        IdempotentRequest.objects.bulk_create([
+            IdempotentRequest(
+                key=uuid.uuid4().hex, scope='/api/reserve/', request_hash='0' * 64,
+                expires_at=now + timedelta(hours=24) - timedelta(minutes=n),
+            )
+            for n in range(total * 5)
+        ], batch_size=5000)
+
+        held = next(booking for booking in general if booking.payment_status == 'authorized')
+        return {
+            'now': now,
+            'event': events[len(events) // 2],
+            'group': next(booking.multi_date_group_id for booking in general if booking.multi_date_group_id),
+            'intent': next(booking.stripe_payment_intent_id for booking in general if booking.stripe_payment_intent_id),
+            'session': held.stripe_payment_id,
+        }
+
+    def queries(self, sample):
+        """(label, queryset or (sql, params)) for each hot query"""
+        now, event = sample['now'], sample['event']
+        claim = CLAIM_SLOT_SQL.format(table=BoothSlot._meta.db_table)
+        return [
+            ('claim a free slot (slots.claim_slot)', (claim, [now, event.pk, 'regular'])),
+            ('multi-date approval (webhook)', GeneralVendorBooking.objects.filter(
+                multi_date_group_id=sample['group'], payment_status='authorized',
+            ).order_by()),
+            ('single-date approval (webhook)', GeneralVendorBooking.objects.filter(
+                stripe_payment_intent_id=sample['intent'], payment_status='approved',
+            ).order_by()),
+            ('booking status by session', GeneralVendorBooking.objects.filter(
+                stripe_payment_id=sample['session'],
+            ).order_by()),
+            ('expired holds (sweeper)', GeneralVendorBooking.objects.filter(
+                hold_expires_at__lte=now + timedelta(minutes=5), payment_status__in=HOLD_STATUSES,
+            ).order_by().values_list('id', 'event_id', 'booth_slot_id', 'stripe_payment_id')),
+            ('event by date (reserve)', Event.objects.filter(date=event.date)),
+            ('upcoming listing page', Event.objects.filter(date__gte=date.today()).order_by('date')[:100]),
+            ('event slots (detail)', BoothSlot.objects.filter(event=event)),
+            ('expired idempotency keys', IdempotentRequest.objects.filter(
+                expires_at__lte=now + timedelta(hours=1),
+            )),
+        ]
+
+    def run(self, total, per_event):
+        sample = self.seed(total, per_event)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f'{total} events, {total * per_event} general vendor bookings\n')
+
+        for label, query in self.queries(sample):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            if isinstance(query, tuple):
+                # Raw statements (the slot claim writes, but is rolled back
+                # with everything else)
+                sql, params = query
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN ANALYZE {sql}', params)
+                    plan = '\n'.join(row[0] for row in cursor.fetchall())
+            else:
+                plan = query.explain(analyze=True)
+            for line in plan.splitlines():
+                self.stdout.write(f'  {line}')
+            self.stdout.write('')
@@ -0,0 +1,52 @@
+"""
+Management command to process Stripe webhook events from the inbox
+Usage: python manage.py process_stripe_events [--loop] [--interval 1] [--batch-size 50]
+
+Any number of these can run next to each other (and next to the web
+processes' own inbox threads); each claims different events.
+"""
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from bookings.stripe_inbox import drain_inbox, purge_processed_events
+
+
+class Command(BaseCommand):
+    help = 'Process pending Stripe webhook events, retrying failures and dead-lettering hopeless ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, checking for events every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds between checks when running with --loop (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Events claimed per transaction (default: STRIPE_INBOX_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        last_purge = 0
+        while True:
+            processed, failed = drain_inbox(options['batch_size'])
+            if processed or failed or not options['loop']:
+                self.stdout.write(f'Processed {processed} events, {failed} failed')
+
+            if time.monotonic() - last_purge > 3600:
+                purged = purge_processed_events()
+                if purged:
+                    self.stdout.write(f'Purged {purged} old processed events')
+                last_purge = time.monotonic()
+
+            if not options['loop']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
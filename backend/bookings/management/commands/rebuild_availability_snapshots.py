@@ -0,0 +1,25 @@
+"""
+Management command to recompute availability snapshots from scratch
+Usage: python manage.py rebuild_availability_snapshots [--event ID ...]
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from bookings.snapshots import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Recompute every event availability snapshot from its bookings and spot counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--event',
+            type=int,
+            action='append',
+            dest='event_ids',
+            help='Only rebuild this event (repeat for several)'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = rebuild_snapshots(options['event_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rebuilt} availability snapshots'))
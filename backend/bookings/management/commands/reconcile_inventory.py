@@ -0,0 +1,39 @@
+"""
+Management command to reset spot counters that drifted from the bookings
+Usage: python manage.py reconcile_inventory [--dry-run] [--event ID ...]
+"""
+import time
+from django.core.management.base import BaseCommand
+from bookings.inventory import reconcile_inventory
+
+
+class Command(BaseCommand):
+    help = 'Recompute every event\'s free spots from its held and approved bookings and fix drifted counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without fixing it'
+        )
+        parser.add_argument(
+            '--event',
+            type=int,
+            action='append',
+            dest='event_ids',
+            help='Only check this event (repeat for several)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        drift = reconcile_inventory(options['event_ids'], dry_run=options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        for row in drift:
+            self.stdout.write(
+                f"  {row['date']} (event {row['event_id']}) {row['vendor_type']:<7} "
+                f"{row['was']:>4} -> {row['now']:<4} ({row['now'] - row['was']:+d})"
+            )
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        style = self.style.WARNING if drift else self.style.SUCCESS
+        self.stdout.write(style(f'{verb} {len(drift)} drifted counters in {elapsed:.2f}s'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:54
+
+from django.db import migrations, models
+
+
+def clamp_available_spots(apps, schema_editor):
+    # Event.save() used to clamp these in Python; fix any rows that drifted
+    # before the database starts enforcing the range
+    Event = apps.get_model('bookings', 'Event')
+    for vendor_type in ('regular', 'food'):
+        available = f'{vendor_type}_spots_available'
+        total = f'{vendor_type}_spots_total'
+        Event.objects.filter(**{f'{available}__gt': models.F(total)}).update(
+            **{available: models.F(total)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_alter_boothslot_options_remove_event_number_of_spots_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_available_spots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.CheckConstraint(condition=models.Q(('regular_spots_available__gte', 0), ('regular_spots_available__lte', models.F('regular_spots_total'))), name='event_regular_spots_available_in_range'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.CheckConstraint(condition=models.Q(('food_spots_available__gte', 0), ('food_spots_available__lte', models.F('food_spots_total'))), name='event_food_spots_available_in_range'),
+        ),
+    ]
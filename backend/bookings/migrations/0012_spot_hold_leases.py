@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:55
+
+from collections import Counter
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+# A card authorization for a manually captured payment lapses after seven
+# days; a hold can safely end then whether or not its checkout completed
+AUTHORIZATION_DAYS = 7
+
+
+def lease_open_holds(apps, schema_editor):
+    # Bookings in checkout before this release never took a spot: the
+    # counters only dropped when the webhook approved them. Now spots are
+    # taken at reservation and given back on expiry, so take their spots
+    # and give them a lease the sweeper will eventually end.
+    # Pending bookings never got a Checkout Session and expire right away;
+    # authorized ones are freed by checkout.session.expired if checkout was
+    # abandoned, and at the latest when the card authorization lapses.
+    Event = apps.get_model('bookings', 'Event')
+    BoothSlot = apps.get_model('bookings', 'BoothSlot')
+    now = timezone.now()
+    held = Counter()
+    for model_name, vendor_type in (('GeneralVendorBooking', 'regular'), ('FoodTruckBooking', 'food')):
+        model = apps.get_model('bookings', model_name)
+        for booking in model.objects.filter(payment_status__in=['pending', 'authorized']).iterator():
+            if booking.payment_status == 'pending':
+                expires_at = now
+            else:
+                # Last touched when its Checkout Session was recorded
+                expires_at = booking.updated_at + timedelta(days=AUTHORIZATION_DAYS)
+            model.objects.filter(pk=booking.pk).update(hold_expires_at=expires_at)
+            if booking.booth_slot_id:
+                BoothSlot.objects.filter(pk=booking.booth_slot_id).update(
+                    is_available=False, held_until=expires_at
+                )
+            held[(booking.event_id, vendor_type)] += 1
+
+    for (event_id, vendor_type), count in held.items():
+        available = f'{vendor_type}_spots_available'
+        Event.objects.filter(pk=event_id).update(
+            **{available: models.Case(
+                models.When(**{f'{available}__gte': count}, then=models.F(available) - count),
+                default=0,
+            )}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_event_spot_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boothslot',
+            name='held_until',
+            field=models.DateTimeField(blank=True, help_text='When the unpaid hold on this slot lapses (empty once paid or free)', null=True),
+        ),
+        migrations.AddField(
+            model_name='foodtruckbooking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, help_text='When the unpaid hold on this spot lapses (empty once checkout completes)', null=True),
+        ),
+        migrations.AddField(
+            model_name='generalvendorbooking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, help_text='When the unpaid hold on this spot lapses (empty once checkout completes)', null=True),
+        ),
+        migrations.RunPython(lease_open_holds, migrations.RunPython.noop),
+    ]
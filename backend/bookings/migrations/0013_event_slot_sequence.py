@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 15:57
+
+from django.db import migrations, models
+
+
+def seed_slot_sequence(apps, schema_editor):
+    # Start each event's sequence after the highest numeric spot it already
+    # has so newly issued spot numbers never collide with existing slots
+    Event = apps.get_model('bookings', 'Event')
+    BoothSlot = apps.get_model('bookings', 'BoothSlot')
+    highest = {}
+    for event_id, spot_number in BoothSlot.objects.values_list('event_id', 'spot_number').iterator():
+        try:
+            number = int(spot_number)
+        except ValueError:
+            continue
+        highest[event_id] = max(highest.get(event_id, 0), number)
+    for event_id, number in highest.items():
+        Event.objects.filter(pk=event_id).update(slot_sequence=number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_spot_hold_leases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='slot_sequence',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Highest booth spot number issued for this event'),
+        ),
+        migrations.RunPython(seed_slot_sequence, migrations.RunPython.noop),
+    ]
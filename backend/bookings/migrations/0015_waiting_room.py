@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:09
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_idempotent_requests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='admission_rate_per_minute',
+            field=models.PositiveIntegerField(blank=True, help_text='Reservations let through the waiting room per minute; leave empty for no waiting room', null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.CreateModel(
+            name='WaitingRoom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('next_admission_at', models.DateTimeField(blank=True, help_text='Earliest time the next person to join can be admitted', null=True)),
+                ('tickets_issued', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='waiting_room', to='bookings.event')),
+            ],
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:40
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_snapshots(apps, schema_editor):
+    # Same counts as bookings.snapshots.rebuild_snapshots, from the
+    # historical models
+    Event = apps.get_model('bookings', 'Event')
+    Snapshot = apps.get_model('bookings', 'EventAvailabilitySnapshot')
+    counts = defaultdict(int)
+    for model_name, vendor_type in (('GeneralVendorBooking', 'regular'), ('FoodTruckBooking', 'food')):
+        rows = (
+            apps.get_model('bookings', model_name).objects
+            .filter(payment_status__in=['pending', 'authorized', 'approved'])
+            .values('event_id', 'payment_status')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            count = 'approved' if row['payment_status'] == 'approved' else 'held'
+            counts[(row['event_id'], f'{vendor_type}_{count}')] += row['n']
+
+    Snapshot.objects.bulk_create([
+        Snapshot(
+            event_id=event_id,
+            regular_free=regular_free,
+            food_free=food_free,
+            regular_held=counts[(event_id, 'regular_held')],
+            regular_approved=counts[(event_id, 'regular_approved')],
+            food_held=counts[(event_id, 'food_held')],
+            food_approved=counts[(event_id, 'food_approved')],
+        )
+        for event_id, regular_free, food_free in Event.objects.values_list(
+            'id', 'regular_spots_available', 'food_spots_available'
+        )
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0015_waiting_room'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventAvailabilitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('regular_held', models.PositiveIntegerField(default=0)),
+                ('regular_approved', models.PositiveIntegerField(default=0)),
+                ('regular_free', models.PositiveIntegerField(default=0)),
+                ('food_held', models.PositiveIntegerField(default=0)),
+                ('food_approved', models.PositiveIntegerField(default=0)),
+                ('food_free', models.PositiveIntegerField(default=0)),
+                ('version', models.PositiveBigIntegerField(default=0, help_text='Goes up with every change')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='bookings.event')),
+            ],
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
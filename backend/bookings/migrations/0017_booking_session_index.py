@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-17 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_event_availability_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='foodtruckbooking',
+            name='stripe_payment_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Stripe Checkout Session ID', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='generalvendorbooking',
+            name='stripe_payment_id',
+            field=models.CharField(blank=True, db_index=True, help_text='Stripe Checkout Session ID', max_length=200),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0017_booking_session_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='boothslot',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['event', 'slot_type', 'id'], name='boothslot_free_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruckbooking',
+            index=models.Index(condition=models.Q(('multi_date_group_id__isnull', False)), fields=['multi_date_group_id', 'payment_status'], name='ftb_group_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruckbooking',
+            index=models.Index(condition=models.Q(('stripe_payment_intent_id', ''), _negated=True), fields=['stripe_payment_intent_id'], name='ftb_intent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='foodtruckbooking',
+            index=models.Index(condition=models.Q(('payment_status__in', ['pending', 'authorized'])), fields=['hold_expires_at'], name='ftb_hold_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generalvendorbooking',
+            index=models.Index(condition=models.Q(('multi_date_group_id__isnull', False)), fields=['multi_date_group_id', 'payment_status'], name='gvb_group_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generalvendorbooking',
+            index=models.Index(condition=models.Q(('stripe_payment_intent_id', ''), _negated=True), fields=['stripe_payment_intent_id'], name='gvb_intent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generalvendorbooking',
+            index=models.Index(condition=models.Q(('payment_status__in', ['pending', 'authorized'])), fields=['hold_expires_at'], name='gvb_hold_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='idempotentrequest',
+            index=models.Index(fields=['expires_at'], name='idempotent_request_expiry_idx'),
+        ),
+    ]
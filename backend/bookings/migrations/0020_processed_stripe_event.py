@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0019_stripe_event_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedStripeEvent',
+            fields=[
+                ('stripe_event_id', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=100)),
+                ('processed_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='stripeeventinbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('duplicate', 'Duplicate'), ('dead', 'Dead letter')], default='pending', max_length=10),
+        ),
+    ]
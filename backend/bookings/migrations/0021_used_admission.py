@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0020_processed_stripe_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsedAdmission',
+            fields=[
+                ('token_id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('used_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 17:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0021_used_admission'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='eventavailabilitysnapshot',
+            name='version',
+        ),
+    ]
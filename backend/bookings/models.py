@@ -46,21 +46,53 @@ class Event(models.Model):
         help_text="Price per food truck spot"
     )
     
+    # Waiting room for on-sale spikes (bookings/waiting_room.py)
+    admission_rate_per_minute = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        help_text="Reservations let through the waiting room per minute; leave empty for no waiting room"
+    )
+    
+    # Highest booth spot number handed out so far; slot numbers are issued
+    # from this counter so they never collide or need to be searched for
+    slot_sequence = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Highest booth spot number issued for this event"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['date']
+        constraints = [
+            # Enforced by the database so concurrent reservations can never
+            # oversell or push a counter past its total
+            models.CheckConstraint(
+                condition=models.Q(regular_spots_available__gte=0)
+                & models.Q(regular_spots_available__lte=models.F('regular_spots_total')),
+                name='event_regular_spots_available_in_range',
+            ),
+            models.CheckConstraint(
+                condition=models.Q(food_spots_available__gte=0)
+                & models.Q(food_spots_available__lte=models.F('food_spots_total')),
+                name='event_food_spots_available_in_range',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.date}"
 
     def save(self, *args, **kwargs):
-        # Ensure available counts don't exceed totals
-        if self.regular_spots_available > self.regular_spots_total:
-            self.regular_spots_available = self.regular_spots_total
-        if self.food_spots_available > self.food_spots_total:
-            self.food_spots_available = self.food_spots_total
+        # slot_sequence only ever moves through F() updates in slots.py; a
+        # full save from an instance loaded earlier must not wind it back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'slot_sequence'
+            ]
         super().save(*args, **kwargs)
 
     @property
@@ -76,6 +108,52 @@ class Event(models.Model):
         return self.regular_spots_available + self.food_spots_available
 
 
+class EventAvailabilitySnapshot(models.Model):
+    """
+    Read model of an event's spots per vendor type: held by unpaid
+    reservations, approved, and free, for the admin. Kept current by
+    bookings/snapshots.py.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='availability')
+    regular_held = models.PositiveIntegerField(default=0)
+    regular_approved = models.PositiveIntegerField(default=0)
+    regular_free = models.PositiveIntegerField(default=0)
+    food_held = models.PositiveIntegerField(default=0)
+    food_approved = models.PositiveIntegerField(default=0)
+    food_free = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Availability of {self.event.name}"
+
+
+class WaitingRoom(models.Model):
+    """Admission schedule for an event's waiting room"""
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, related_name='waiting_room')
+    next_admission_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Earliest time the next person to join can be admitted"
+    )
+    tickets_issued = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Waiting room for {self.event.name}"
+
+
+class UsedAdmission(models.Model):
+    """
+    An admission token that has been spent on a reservation. The primary
+    key turns a second use of the same token into a rejected insert.
+    """
+    token_id = models.CharField(max_length=32, primary_key=True)
+    used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Admission {self.token_id}"
+
+
 class BoothSlot(models.Model):
     SLOT_TYPES = [
         ('regular', 'Regular Vendor'),
@@ -86,16 +164,53 @@ class BoothSlot(models.Model):
     spot_number = models.CharField(max_length=50)
     slot_type = models.CharField(max_length=10, choices=SLOT_TYPES, default='regular')
     is_available = models.BooleanField(default=True)
+    held_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the unpaid hold on this slot lapses (empty once paid or free)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['slot_type', 'spot_number']
         unique_together = ['event', 'spot_number']
+        indexes = [
+            # Free slots in claim order (slots.CLAIM_SLOT_SQL)
+            models.Index(
+                fields=['event', 'slot_type', 'id'],
+                condition=models.Q(is_available=True),
+                name='boothslot_free_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.event.name} - {self.get_slot_type_display()} Spot {self.spot_number}"
 
 
+def booking_indexes(prefix):
+    """Indexes for the hot booking lookups, shared by both booking tables"""
+    return [
+        # Multi-date reservations and their webhook approval
+        models.Index(
+            fields=['multi_date_group_id', 'payment_status'],
+            condition=models.Q(multi_date_group_id__isnull=False),
+            name=f'{prefix}_group_status_idx',
+        ),
+        # Single-date webhook approval by payment intent
+        models.Index(
+            fields=['stripe_payment_intent_id'],
+            condition=~models.Q(stripe_payment_intent_id=''),
+            name=f'{prefix}_intent_idx',
+        ),
+        # The hold sweeper only looks at unpaid bookings
+        models.Index(
+            fields=['hold_expires_at'],
+            condition=models.Q(payment_status__in=['pending', 'authorized']),
+            name=f'{prefix}_hold_expiry_idx',
+        ),
+    ]
+
+
 class BaseVendorBooking(models.Model):
     """Abstract base model for common vendor booking fields"""
     PAYMENT_STATUS = [
@@ -171,6 +286,7 @@ class BaseVendorBooking(models.Model):
     stripe_payment_id = models.CharField(
         max_length=200, 
         blank=True, 
+        db_index=True,
         help_text="Stripe Checkout Session ID"
     )
     stripe_payment_intent_id = models.CharField(
@@ -184,6 +300,11 @@ class BaseVendorBooking(models.Model):
         default='pending'
     )
     is_paid = models.BooleanField(default=False)
+    hold_expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the unpaid hold on this spot lapses (empty once checkout completes)"
+    )
     amount_paid = models.DecimalField(
         max_digits=10, 
         decimal_places=2, 
@@ -215,6 +336,7 @@ class GeneralVendorBooking(BaseVendorBooking):
         ordering = ['-timestamp']
         verbose_name = 'General Vendor Booking'
         verbose_name_plural = 'General Vendor Bookings'
+        indexes = booking_indexes('gvb')
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
@@ -246,6 +368,7 @@ class FoodTruckBooking(BaseVendorBooking):
         ordering = ['-timestamp']
         verbose_name = 'Food Truck Booking'
         verbose_name_plural = 'Food Truck Bookings'
+        indexes = booking_indexes('ftb')
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
@@ -254,4 +377,88 @@ class FoodTruckBooking(BaseVendorBooking):
         # If this is a new booking and payment is completed, decrease available spots
         if is_new and self.payment_status == 'approved':
             self.event.food_spots_available = models.F('food_spots_available') - 1
-            self.event.save(update_fields=['food_spots_available'])
\ No newline at end of file
+            self.event.save(update_fields=['food_spots_available'])
+
+class IdempotentRequest(models.Model):
+    """
+    A reservation request made with an Idempotency-Key header. Holds the
+    response once the request finishes so repeats can be answered from it.
+    """
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=255, help_text="Request path the key was used on")
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the request body")
+    response_status = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Empty while the original request is still in flight"
+    )
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotent_request_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotent_request_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} [{self.key}]"
+
+
+class StripeEventInbox(models.Model):
+    """
+    A Stripe webhook event as received, waiting for bookings/stripe_inbox.py
+    to process it. The webhook only stores the event, so Stripe gets its
+    200 however slow processing is.
+    """
+    STATUS = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('duplicate', 'Duplicate'),
+        ('dead', 'Dead letter'),
+    ]
+
+    stripe_event_id = models.CharField(max_length=255, db_index=True)
+    event_type = models.CharField(max_length=100)
+    payload = models.JSONField(help_text="The event exactly as Stripe sent it")
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="Not processed before this; pushed back after each failure"
+    )
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Stripe Event'
+        verbose_name_plural = 'Stripe Event Inbox'
+        indexes = [
+            # Workers claim due pending events oldest first
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='stripe_inbox_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} [{self.stripe_event_id}]"
+
+
+class ProcessedStripeEvent(models.Model):
+    """
+    A Stripe event whose effects have been applied. Stripe delivers
+    webhooks at least once; the primary key turns every repeat into a
+    rejected insert, in whichever process or replica it lands.
+    """
+    stripe_event_id = models.CharField(max_length=255, primary_key=True)
+    event_type = models.CharField(max_length=100)
+    processed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.event_type} [{self.stripe_event_id}]"
@@ -0,0 +1,16 @@
+"""
+Pagination for event listings
+
+Events are paged by a cursor on their (unique, indexed) date rather than
+by page number, so every page is an index range scan that costs the same
+however far into the listing it is, and pages do not shift when events
+are added.
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class EventCursorPagination(CursorPagination):
+    ordering = 'date'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,173 @@
+"""
+Reservation pipeline shared by the reserve endpoints
+
+Turning validated booking data into held spots: claim inventory, claim
+booth slots and insert the bookings, with a matching undo for when the
+Stripe Checkout Session cannot be created.
+"""
+from collections import Counter
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from .checkout import get_price_for_vendor_type
+from .inventory import claim_spots, claim_spots_for_events, release_spots_bulk
+from .models import BoothSlot, GeneralVendorBooking, FoodTruckBooking
+from .serializers import ReserveBoothSlotSerializer
+from .slots import allocate_slot, allocate_slots
+
+
+class ReservationError(Exception):
+    """A reservation request that cannot be fulfilled; `payload` is the error body"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        super().__init__(str(payload))
+
+
+def validate_multi_reservations(reservations):
+    """
+    Validate every entry of a multi-date request without touching the
+    database. Returns (validated, vendor_type, total_price) where each
+    validated entry is (date_str, date, data).
+    """
+    total_price = 0
+    vendor_type = None
+    validated = []
+
+    for reservation in reservations:
+        date_str = reservation.get('eventDate')
+        if not date_str:
+            raise ReservationError({'error': 'Missing eventDate in reservation'})
+
+        # Validate reservation data
+        data = reservation.get('reservationData', {})
+        data_serializer = ReserveBoothSlotSerializer(data=data)
+        if not data_serializer.is_valid():
+            raise ReservationError({'errors': {date_str: data_serializer.errors}})
+
+        # Set vendor type from first reservation; one checkout covers one type
+        if vendor_type is None:
+            vendor_type = data_serializer.validated_data.get('vendor_type')
+        elif data_serializer.validated_data.get('vendor_type') != vendor_type:
+            raise ReservationError({'error': 'All reservations must be for the same vendor type'})
+
+        try:
+            event_date = parse_date(date_str)
+        except ValueError:
+            event_date = None
+
+        # Calculate price
+        total_price += get_price_for_vendor_type(vendor_type)
+        validated.append((date_str, event_date, data_serializer.validated_data))
+
+    return validated, vendor_type, total_price
+
+
+def match_events(validated, events_by_date):
+    """Pair validated entries with their events, as (event, data) items"""
+    items = []
+    for date_str, event_date, data in validated:
+        event = events_by_date.get(event_date)
+        if event is None:
+            raise ReservationError({'error': f'No event found for date {date_str}'})
+        items.append((event, data))
+    return items
+
+
+def booking_model(vendor_type):
+    """Booking model used for a vendor type"""
+    if vendor_type == 'food':
+        return FoodTruckBooking
+    return GeneralVendorBooking
+
+
+def build_booking_from_data(event, data, multi_date_group_id=None, hold_expires_at=None):
+    """Build (but do not save) the appropriate booking model"""
+    vendor_type = data.get('vendor_type', 'regular')
+
+    common_fields = {
+        'event': event,
+        'first_name': data['first_name'],
+        'last_name': data['last_name'],
+        'vendor_email': data['vendor_email'],
+        'business_name': data.get('business_name', ''),
+        'phone': data['phone'],
+        'preferred_name': data.get('preferred_name', ''),
+        'pronouns': data.get('pronouns', ''),
+        'instagram': data.get('instagram', ''),
+        'social_media_consent': data.get('social_media_consent', ''),
+        'photo_consent': data.get('photo_consent', ''),
+        'noise_sensitive': data.get('noise_sensitive', ''),
+        'sharing_booth': data.get('sharing_booth', ''),
+        'booth_partner_instagram': data.get('booth_partner_instagram', ''),
+        'price_range': data.get('price_range', ''),
+        'additional_notes': data.get('additional_notes', ''),
+        'payment_status': 'pending',
+        'is_paid': False,
+        'amount_paid': 0,
+        'is_multi_date': multi_date_group_id is not None,
+        'multi_date_group_id': multi_date_group_id,
+        'hold_expires_at': hold_expires_at,
+    }
+
+    if vendor_type == 'food':
+        return FoodTruckBooking(
+            **common_fields,
+            cuisine_type=data.get('cuisine_type', ''),
+            food_items=data.get('food_items', ''),
+            setup_size=data.get('setup_size', ''),
+            generator=data.get('generator', ''),
+            health_permit=data.get('health_permit', ''),
+        )
+    return GeneralVendorBooking(
+        **common_fields,
+        products_selling=data.get('products_selling', ''),
+        electricity_cord=data.get('electricity_cord', ''),
+    )
+
+
+def create_booking_from_data(event, data, multi_date_group_id=None, hold_expires_at=None):
+    """Claim a spot and booth slot on one event and create the booking"""
+    vendor_type = data.get('vendor_type', 'regular')
+    booking = build_booking_from_data(event, data, multi_date_group_id, hold_expires_at)
+
+    with transaction.atomic():
+        claim_spots(event.pk, vendor_type)
+        # Claim a booth slot from the event's pool, held for as long as the
+        # booking holds its spot
+        booking.booth_slot_id = allocate_slot(event, vendor_type, held_until=hold_expires_at)
+        booking.save()
+    return booking
+
+
+def create_bookings_in_bulk(items, vendor_type, multi_date_group_id=None, hold_expires_at=None):
+    """
+    Reserve a spot on every event in `items`, a list of (event, data) pairs.
+
+    The query count does not grow with the number of dates: inventory is
+    claimed by one conditional UPDATE, booth slots by one UPDATE ...
+    RETURNING and the bookings are inserted with a single bulk_create.
+    Raises SpotsUnavailable, claiming nothing, if any date is sold out.
+    """
+    events = [event for event, _ in items]
+
+    with transaction.atomic():
+        claim_spots_for_events([event.pk for event in events], vendor_type)
+        slots = allocate_slots(events, vendor_type, held_until=hold_expires_at)
+
+        bookings = []
+        for event, data in items:
+            booking = build_booking_from_data(event, data, multi_date_group_id, hold_expires_at)
+            booking.booth_slot_id = slots[event.pk].pop() if slots[event.pk] else None
+            bookings.append(booking)
+
+        return booking_model(vendor_type).objects.bulk_create(bookings)
+
+
+def release_bookings(bookings, vendor_type):
+    """Delete reservations that never reached checkout and free their spots"""
+    with transaction.atomic():
+        BoothSlot.objects.filter(
+            pk__in=[b.booth_slot_id for b in bookings if b.booth_slot_id]
+        ).update(is_available=True, held_until=None)
+        booking_model(vendor_type).objects.filter(pk__in=[b.pk for b in bookings]).delete()
+        release_spots_bulk(Counter((b.event_id, vendor_type) for b in bookings))
@@ -0,0 +1,72 @@
+"""
+Minimal in-process scheduler for periodic maintenance jobs
+
+Useful on single-container deployments where running a separate cron or
+worker process is not worth it. Each job runs on its own daemon thread;
+with several web processes every process runs its own copy, so jobs must
+be safe to run concurrently.
+"""
+import logging
+import threading
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class PeriodicJob(threading.Thread):
+    """Call `func` every `interval` seconds until stopped"""
+
+    def __init__(self, name, interval, func):
+        super().__init__(name=f'periodic-{name}', daemon=True)
+        self.interval = interval
+        self.func = func
+        self._stopped = threading.Event()
+        self._woken = threading.Event()
+
+    def run(self):
+        while True:
+            self._woken.wait(self.interval)
+            self._woken.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.func()
+            except Exception:
+                logger.exception(f"Periodic job {self.name} failed")
+            finally:
+                # Threads outside the request cycle must tidy up their own
+                # database connections
+                close_old_connections()
+
+    def wake(self):
+        """Run now instead of at the end of the current interval"""
+        self._woken.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._woken.set()
+
+
+def start_periodic_job(name, interval, func):
+    """Start a named job once per process; returns the running job"""
+    with _jobs_lock:
+        job = _jobs.get(name)
+        if job is None or not job.is_alive():
+            job = PeriodicJob(name, interval, func)
+            job.start()
+            _jobs[name] = job
+            logger.info(f"Started periodic job {name} every {interval}s")
+        return job
+
+
+def wake_periodic_job(name):
+    """Run a job now if this process runs it; returns False if it does not"""
+    with _jobs_lock:
+        job = _jobs.get(name)
+    if job is None or not job.is_alive():
+        return False
+    job.wake()
+    return True
@@ -1,4 +1,6 @@
+from itertools import groupby
 from rest_framework import serializers
+from django.utils import timezone
 from .models import Event, BoothSlot, GeneralVendorBooking, FoodTruckBooking
 
 
@@ -8,8 +10,21 @@ class BoothSlotSerializer(serializers.ModelSerializer):
         fields = ['id', 'event', 'spot_number', 'slot_type', 'is_available']
 
 
+class EventBoothSlotSerializer(BoothSlotSerializer):
+    """Slot nested under its event, so without the event id"""
+    class Meta(BoothSlotSerializer.Meta):
+        fields = ['id', 'spot_number', 'slot_type', 'is_available']
+
+
+def run_length(flags):
+    """Availability flags as runs, e.g. '5o2x3o' (o = open, x = taken)"""
+    return ''.join(
+        f"{sum(1 for _ in run)}{'o' if flag else 'x'}" for flag, run in groupby(flags)
+    )
+
+
 class EventSerializer(serializers.ModelSerializer):
-    booth_slots = BoothSlotSerializer(many=True, read_only=True)
+    booth_slots = EventBoothSlotSerializer(many=True, read_only=True)
     
     class Meta:
         model = Event
@@ -23,6 +38,26 @@ class EventSerializer(serializers.ModelSerializer):
         ]
 
 
+class CompactEventSerializer(EventSerializer):
+    """
+    Event with its slots folded into one run-length string per slot type,
+    in spot number order, so the payload stays small however many slots
+    the event has
+    """
+    booth_slots = None
+    slot_map = serializers.SerializerMethodField()
+
+    class Meta(EventSerializer.Meta):
+        fields = [field for field in EventSerializer.Meta.fields if field != 'booth_slots'] + ['slot_map']
+
+    def get_slot_map(self, event):
+        slots = event.booth_slots.all()  # prefetched, ordered by type then number
+        return {
+            slot_type: run_length(slot.is_available for slot in slots if slot.slot_type == slot_type)
+            for slot_type, _ in BoothSlot.SLOT_TYPES
+        }
+
+
 class EventListSerializer(serializers.ModelSerializer):
     """Simplified serializer for list views"""
     class Meta:
@@ -151,6 +186,62 @@ class MultiDateReservationSerializer(serializers.Serializer):
     total_dates = serializers.IntegerField(read_only=True)
 
 
+class WaitingRoomJoinSerializer(serializers.Serializer):
+    """Serializer for joining the waiting room of one or more events"""
+    vendor_type = serializers.ChoiceField(
+        choices=[('regular', 'Regular Vendor'), ('food', 'Food Truck')],
+        default='regular'
+    )
+    event_ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=50)
+    dates = serializers.ListField(child=serializers.DateField(), required=False, max_length=50)
+
+    def validate(self, data):
+        if not data.get('event_ids') and not data.get('dates'):
+            raise serializers.ValidationError('Provide event_ids or dates')
+        return data
+
+
+class AvailabilityRangeSerializer(serializers.Serializer):
+    """Query parameters for availability over a date window or a list of dates"""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    dates = serializers.ListField(child=serializers.DateField(), required=False, max_length=366)
+
+    def validate(self, data):
+        if data.get('dates'):
+            return data
+        if not data.get('start') or not data.get('end'):
+            raise serializers.ValidationError('Provide start and end, or dates')
+        if data['start'] > data['end']:
+            raise serializers.ValidationError('start must not be after end')
+        return data
+
+
+class DateWindowSerializer(serializers.Serializer):
+    """?from=&to= window of event dates (inclusive); starts today unless given"""
+    to = serializers.DateField(required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['from'] = serializers.DateField(required=False)  # a keyword, so not declarable
+        return fields
+
+    def validate(self, data):
+        data.setdefault('from', timezone.localdate())
+        if data.get('to') and data['to'] < data['from']:
+            raise serializers.ValidationError('to must not be before from')
+        return data
+
+
+def date_window(request):
+    """(from, to) for a request's ?from=&to=; to is None when open-ended"""
+    serializer = DateWindowSerializer(data={
+        key: request.GET[key] for key in ('from', 'to') if key in request.GET
+    })
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data['from'], serializer.validated_data.get('to')
+
+
 class PaymentStatusSerializer(serializers.Serializer):
     """Serializer for payment status response"""
     status = serializers.ChoiceField(choices=['pending', 'completed', 'failed'])
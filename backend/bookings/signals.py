@@ -4,15 +4,15 @@ Django signals for vendor bookings
 import logging
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import GeneralVendorBooking, FoodTruckBooking
+from django.utils import timezone
+from .availability_cache import inventory_changed
+from .models import Event, BoothSlot, GeneralVendorBooking, FoodTruckBooking
 from .google_apps_script import get_apps_script_sync
+from .slots import ensure_slot_pool
+from .snapshots import rebuild_snapshots
 
 logger = logging.getLogger(__name__)
 
-# Track which bookings we've already synced to avoid duplicates
-_synced_bookings = set()
-
-
 @receiver(post_save, sender=GeneralVendorBooking)
 @receiver(post_save, sender=FoodTruckBooking)
 def sync_booking_to_google_sheets(sender, instance, created, **kwargs):
@@ -27,3 +27,46 @@ def sync_booking_to_google_sheets(sender, instance, created, **kwargs):
     # Disabled - syncing now happens in stripe_webhook when checkout.session.completed is received
     # This ensures we sync when payment is made, not when it's captured
     pass
+
+
+@receiver(post_save, sender=Event)
+def preallocate_booth_slots(sender, instance, raw=False, **kwargs):
+    """
+    Keep each event's booth slot pool sized to its spot totals, so
+    reservations never have to create slots on the hot path.
+    """
+    if raw:
+        return
+    ensure_slot_pool(instance)
+
+
+@receiver(post_save, sender=Event)
+def refresh_availability_snapshot(sender, instance, raw=False, **kwargs):
+    """New events need a snapshot, and admin edits can set the counters to anything"""
+    if raw:
+        return
+    rebuild_snapshots([instance.pk])
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def invalidate_availability(sender, instance, **kwargs):
+    """Admin edits, new events and deletions change what the calendar shows"""
+    inventory_changed([instance.pk])
+
+
+@receiver(post_save, sender=BoothSlot)
+@receiver(post_delete, sender=BoothSlot)
+def touch_slot_event(sender, instance, raw=False, **kwargs):
+    """
+    Slot edits saved one at a time (the admin, a shell) change the event
+    detail page, so move its updated_at on and with it the ETag.
+
+    The bulk paths use QuerySet.update(), which sends no signal. Claims and
+    releases (including hold expiry) move updated_at themselves when they
+    change the spot counters. Webhook approval changes nothing the page
+    shows, because the slot was already taken when the hold was claimed.
+    """
+    if raw:
+        return
+    Event.objects.filter(pk=instance.event_id).update(updated_at=timezone.now())
@@ -0,0 +1,186 @@
+"""
+Booth slot allocation
+
+Every event owns a fixed pool of booth slots per vendor type, sized to its
+spot totals. Spot numbers come from an integer sequence on the event, and a
+reservation claims a free slot with a single statement, so allocation cost
+does not depend on how many slots an event has.
+"""
+import logging
+from collections import Counter, defaultdict
+from django.db import connection, transaction
+from django.db.models import Count
+from .models import Event, BoothSlot
+
+logger = logging.getLogger(__name__)
+
+SLOT_TYPES = ('regular', 'food')
+
+# Claim the lowest free slot of a type. SKIP LOCKED lets concurrent
+# reservations each grab a different slot instead of queueing on one row.
+CLAIM_SLOT_SQL = """
+    UPDATE {table} SET is_available = false, held_until = %s
+    WHERE id = (
+        SELECT id FROM {table}
+        WHERE event_id = %s AND slot_type = %s AND is_available
+        ORDER BY id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id
+"""
+
+# Claim slots for many events in one statement. Each event asks for
+# `quantity` free slots via a LATERAL subquery; SKIP LOCKED keeps
+# concurrent reservations from queueing on each other's picks.
+CLAIM_SLOTS_BULK_SQL = """
+    UPDATE {table} AS slot SET is_available = false, held_until = %s
+    FROM (
+        SELECT picked.id
+        FROM unnest(%s::bigint[], %s::integer[]) AS wanted(event_id, quantity)
+        CROSS JOIN LATERAL (
+            SELECT id FROM {table}
+            WHERE event_id = wanted.event_id AND slot_type = %s AND is_available
+            ORDER BY id
+            LIMIT wanted.quantity
+            FOR UPDATE SKIP LOCKED
+        ) AS picked
+    ) AS claimed
+    WHERE slot.id = claimed.id
+    RETURNING slot.id, slot.event_id
+"""
+
+
+def ensure_slot_pool(event):
+    """
+    Top up an event's slot pool to match its spot totals.
+
+    Returns the number of slots created. The event row is locked while the
+    pool is counted and topped up, so concurrent top-ups (the post_save
+    signal racing the admin action, say) run one after the other and the
+    second finds nothing missing.
+    """
+    with transaction.atomic():
+        locked = (
+            Event.objects.select_for_update()
+            .only('regular_spots_total', 'food_spots_total', 'slot_sequence')
+            .get(pk=event.pk)
+        )
+        existing = dict(
+            BoothSlot.objects.filter(event_id=event.pk)
+            .values('slot_type')
+            .annotate(count=Count('id'))
+            .values_list('slot_type', 'count')
+        )
+        missing = {
+            'regular': max(locked.regular_spots_total - existing.get('regular', 0), 0),
+            'food': max(locked.food_spots_total - existing.get('food', 0), 0),
+        }
+        needed = sum(missing.values())
+        if not needed:
+            return 0
+
+        # Spot numbers are reserved as one block from the event's sequence
+        first_number = locked.slot_sequence + 1
+        Event.objects.filter(pk=event.pk).update(slot_sequence=locked.slot_sequence + needed)
+        numbers = iter(range(first_number, first_number + needed))
+        BoothSlot.objects.bulk_create([
+            BoothSlot(event_id=event.pk, spot_number=f"{next(numbers):03d}", slot_type=slot_type)
+            for slot_type in SLOT_TYPES
+            for _ in range(missing[slot_type])
+        ])
+
+    logger.info(f"Created {needed} booth slots for event {event.pk}")
+    return needed
+
+
+def _claim_slot(event_id, vendor_type, held_until):
+    """Claim one free slot, returning its id or None when the pool is empty"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                CLAIM_SLOT_SQL.format(table=connection.ops.quote_name(BoothSlot._meta.db_table)),
+                [held_until, event_id, vendor_type],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    # Portable fallback for development databases
+    with transaction.atomic():
+        slot_id = (
+            BoothSlot.objects
+            .filter(event_id=event_id, slot_type=vendor_type, is_available=True)
+            .order_by('id')
+            .select_for_update(skip_locked=connection.features.has_select_for_update_skip_locked)
+            .values_list('id', flat=True)
+            .first()
+        )
+        if slot_id is not None:
+            BoothSlot.objects.filter(pk=slot_id).update(is_available=False, held_until=held_until)
+        return slot_id
+
+
+def allocate_slot(event, vendor_type, held_until=None):
+    """
+    Claim a booth slot for a new booking and return its id.
+
+    The pool is only topped up when it runs dry (new events, or an admin
+    raising a spot total), so the common case is a single round-trip.
+    """
+    slot_type = 'food' if vendor_type == 'food' else 'regular'
+    slot_id = _claim_slot(event.pk, slot_type, held_until)
+    if slot_id is None and ensure_slot_pool(event):
+        slot_id = _claim_slot(event.pk, slot_type, held_until)
+    if slot_id is None:
+        logger.warning(f"No free {slot_type} booth slot for event {event.pk}")
+    return slot_id
+
+
+def _claim_slots_bulk(quantities, slot_type, held_until):
+    """Claim slots for several events, returning {event_id: [slot_id, ...]}"""
+    claimed = defaultdict(list)
+    if connection.vendor == 'postgresql':
+        event_ids = list(quantities)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                CLAIM_SLOTS_BULK_SQL.format(table=connection.ops.quote_name(BoothSlot._meta.db_table)),
+                [held_until, event_ids, [quantities[e] for e in event_ids], slot_type],
+            )
+            for slot_id, event_id in cursor.fetchall():
+                claimed[event_id].append(slot_id)
+        return claimed
+
+    for event_id, quantity in quantities.items():
+        for _ in range(quantity):
+            slot_id = _claim_slot(event_id, slot_type, held_until)
+            if slot_id is None:
+                break
+            claimed[event_id].append(slot_id)
+    return claimed
+
+
+def allocate_slots(events, vendor_type, held_until=None):
+    """
+    Claim one booth slot per entry in `events` (a list of Event instances,
+    repeats allowed) and return {event_id: [slot_id, ...]}.
+
+    The whole batch is one statement on PostgreSQL; pools are only topped
+    up, and the shortfall retried, for events whose pool ran dry.
+    """
+    slot_type = 'food' if vendor_type == 'food' else 'regular'
+    quantities = Counter(event.pk for event in events)
+    claimed = _claim_slots_bulk(quantities, slot_type, held_until)
+
+    short = {
+        event.pk: quantities[event.pk] - len(claimed[event.pk])
+        for event in {event.pk: event for event in events}.values()
+        if len(claimed[event.pk]) < quantities[event.pk] and ensure_slot_pool(event)
+    }
+    if short:
+        for event_id, slot_ids in _claim_slots_bulk(short, slot_type, held_until).items():
+            claimed[event_id].extend(slot_ids)
+
+    for event_id, quantity in quantities.items():
+        if len(claimed[event_id]) < quantity:
+            logger.warning(f"No free {slot_type} booth slot for event {event_id}")
+    return claimed
@@ -0,0 +1,113 @@
+"""
+Availability snapshots: one narrow row per event
+
+EventAvailabilitySnapshot holds, per vendor type, how many spots are held
+by unpaid reservations, approved, and free, so the admin's event list
+shows booking counts without counting bookings. The reservation, expiry
+and webhook paths adjust it by deltas inside the transaction that makes
+the change, which costs one extra UPDATE per write. Rarer writes (admin
+edits, new events) recompute the rows they touch, and `manage.py
+rebuild_availability_snapshots` recomputes all of them.
+"""
+from collections import defaultdict
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from .models import Event, EventAvailabilitySnapshot, GeneralVendorBooking, FoodTruckBooking
+
+# Bookings in these states are holding a spot without having paid
+HOLD_STATUSES = ['pending', 'authorized']
+
+BOOKING_MODELS = (
+    (GeneralVendorBooking, 'regular'),
+    (FoodTruckBooking, 'food'),
+)
+
+COUNT_FIELDS = [
+    f'{vendor_type}_{count}'
+    for vendor_type in ('regular', 'food')
+    for count in ('held', 'approved', 'free')
+]
+
+
+def _per_event(values):
+    """CASE expression mapping each event id to its value"""
+    return Case(
+        *[When(event_id=event_id, then=Value(value)) for event_id, value in values.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def adjust_snapshots(deltas):
+    """
+    Apply count changes to many snapshots with one UPDATE.
+
+    `deltas` maps (event_id, vendor_type) to {'held': n, 'approved': n,
+    'free': n}, where each n may be negative and any may be left out.
+    Counts never go below zero; if they drift, a rebuild corrects them.
+    """
+    per_field = defaultdict(lambda: defaultdict(int))
+    for (event_id, vendor_type), changes in deltas.items():
+        prefix = 'food' if vendor_type == 'food' else 'regular'
+        for count, delta in changes.items():
+            if delta:
+                per_field[f'{prefix}_{count}'][event_id] += delta
+    if not per_field:
+        return
+
+    EventAvailabilitySnapshot.objects.filter(
+        event_id__in={event_id for values in per_field.values() for event_id in values}
+    ).update(
+        **{
+            field: Greatest(F(field) + _per_event(values), Value(0))
+            for field, values in per_field.items()
+        },
+        updated_at=timezone.now(),
+    )
+
+
+def rebuild_snapshots(event_ids=None):
+    """
+    Recompute snapshots from the bookings and spot counters, creating any
+    that are missing. `event_ids` limits it to some events; returns the
+    number of snapshots written.
+    """
+    events = Event.objects.all()
+    if event_ids is not None:
+        events = events.filter(pk__in=event_ids)
+
+    counts = defaultdict(int)
+    for model, vendor_type in BOOKING_MODELS:
+        bookings = model.objects.filter(payment_status__in=HOLD_STATUSES + ['approved'])
+        if event_ids is not None:
+            bookings = bookings.filter(event_id__in=event_ids)
+        rows = bookings.values('event_id', 'payment_status').annotate(n=Count('id')).order_by()
+        for row in rows:
+            count = 'approved' if row['payment_status'] == 'approved' else 'held'
+            counts[(row['event_id'], f'{vendor_type}_{count}')] += row['n']
+
+    snapshots = [
+        EventAvailabilitySnapshot(
+            event_id=event_id,
+            regular_free=regular_free,
+            food_free=food_free,
+            **{
+                field: counts[(event_id, field)]
+                for field in COUNT_FIELDS if not field.endswith('_free')
+            },
+        )
+        for event_id, regular_free, food_free in events.values_list(
+            'id', 'regular_spots_available', 'food_spots_available'
+        )
+    ]
+    if not snapshots:
+        return 0
+
+    EventAvailabilitySnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['event'],
+        update_fields=COUNT_FIELDS + ['updated_at'],
+    )
+    return len(snapshots)
@@ -0,0 +1,252 @@
+"""
+Outbound Stripe API access
+
+Every Stripe call made by this app goes through one per-process client:
+a pooled keep-alive requests.Session for the stripe library's blocking
+calls, and an httpx.AsyncClient for the async reserve views (the stripe
+library only ships a blocking HTTP client). Both use the same timeouts and
+retry policy and record per-call latency in `stats`.
+
+configure_stripe() runs from BookingsConfig.ready(), so views, management
+commands and background jobs all share the same setup.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import uuid
+import weakref
+from collections import defaultdict, deque
+from urllib.parse import urlencode, urlsplit
+import requests
+import stripe
+import httpx
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from stripe import RequestsClient
+
+logger = logging.getLogger(__name__)
+
+# httpx clients are bound to the event loop they were first used on
+_async_clients = weakref.WeakKeyDictionary()
+
+# Same backoff bounds as the stripe library's own retries
+INITIAL_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 2.0
+RETRY_STATUSES = (409, 429, 500, 502, 503, 504)
+
+
+class CallStats:
+    """Thread-safe rolling latency samples per Stripe endpoint"""
+
+    def __init__(self, window=500):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(lambda: {'calls': 0, 'errors': 0})
+
+    def record(self, method, url, status_code, elapsed):
+        endpoint = f'{method.upper()} {urlsplit(url).path}'
+        with self._lock:
+            self._samples[endpoint].append(elapsed)
+            self._counts[endpoint]['calls'] += 1
+            if status_code is None or status_code >= 400:
+                self._counts[endpoint]['errors'] += 1
+
+        logger.info(
+            'stripe %s -> %s in %.0f ms', endpoint, status_code or 'no response', elapsed * 1000
+        )
+        if elapsed * 1000 >= settings.STRIPE_SLOW_CALL_MS:
+            logger.warning('Slow Stripe call: %s took %.0f ms', endpoint, elapsed * 1000)
+
+    def snapshot(self):
+        """{endpoint: {calls, errors, p50_ms, p95_ms, max_ms}} over the recent window"""
+        with self._lock:
+            samples = {endpoint: sorted(values) for endpoint, values in self._samples.items()}
+            counts = {endpoint: dict(values) for endpoint, values in self._counts.items()}
+
+        report = {}
+        for endpoint, ordered in samples.items():
+            report[endpoint] = {
+                **counts[endpoint],
+                'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1),
+                'p95_ms': round(ordered[max(int(len(ordered) * 0.95) - 1, 0)] * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+            }
+        return report
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+stats = CallStats()
+
+
+class PooledRequestsClient(RequestsClient):
+    """
+    stripe's requests-based client, sharing one pooled Session across all
+    threads and timing every attempt. Retries stay with the stripe library,
+    which calls request() once per attempt.
+    """
+    name = 'requests-pooled'
+
+    def __init__(self, pool_size, timeout):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        super().__init__(timeout=timeout, session=session)
+
+    def request(self, method, url, headers, post_data=None):
+        started = time.perf_counter()
+        status_code = None
+        try:
+            content, status_code, response_headers = super().request(
+                method, url, headers, post_data
+            )
+            return content, status_code, response_headers
+        finally:
+            stats.record(method, url, status_code, time.perf_counter() - started)
+
+
+def configure_stripe():
+    """Point the stripe library at the shared, pooled HTTP client"""
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    stripe.api_base = settings.STRIPE_API_BASE
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = PooledRequestsClient(
+        pool_size=settings.STRIPE_POOL_SIZE,
+        timeout=(settings.STRIPE_CONNECT_TIMEOUT_SECONDS, settings.STRIPE_READ_TIMEOUT_SECONDS),
+    )
+
+
+def encode_params(params, prefix=None):
+    """Flatten nested parameters into Stripe's form encoding (a[b][0]=c)"""
+    pairs = []
+    items = params.items() if isinstance(params, dict) else enumerate(params)
+    for key, value in items:
+        name = f'{prefix}[{key}]' if prefix is not None else str(key)
+        if value is None:
+            continue
+        if isinstance(value, (dict, list, tuple)):
+            pairs.extend(encode_params(value, name))
+        elif isinstance(value, bool):
+            pairs.append((name, 'true' if value else 'false'))
+        else:
+            pairs.append((name, str(value)))
+    return pairs
+
+
+def _error_from_response(response):
+    """Translate a Stripe error response into the stripe library's exceptions"""
+    try:
+        body = response.json()
+        error = body.get('error', {})
+    except ValueError:
+        body, error = None, {}
+
+    message = error.get('message') or f'Stripe returned HTTP {response.status_code}'
+    kwargs = dict(http_body=response.text, http_status=response.status_code, json_body=body)
+
+    if response.status_code in (400, 404):
+        return stripe.error.InvalidRequestError(message, error.get('param'), **kwargs)
+    if response.status_code == 401:
+        return stripe.error.AuthenticationError(message, **kwargs)
+    if response.status_code == 402:
+        return stripe.error.CardError(message, error.get('param'), error.get('code'), **kwargs)
+    if response.status_code == 429:
+        return stripe.error.RateLimitError(message, **kwargs)
+    return stripe.error.APIError(message, **kwargs)
+
+
+def _should_retry(response, attempt):
+    """Mirror the stripe library: honour Stripe-Should-Retry, else retry transient statuses"""
+    if attempt >= settings.STRIPE_MAX_NETWORK_RETRIES:
+        return False
+    if response is None:
+        return True
+    hint = response.headers.get('Stripe-Should-Retry')
+    if hint is not None:
+        return hint == 'true'
+    return response.status_code in RETRY_STATUSES
+
+
+def retry_delay(attempt):
+    """Exponential backoff with jitter, in seconds, before retry number `attempt`"""
+    delay = min(INITIAL_RETRY_DELAY * (2 ** (attempt - 1)), MAX_RETRY_DELAY)
+    return max(INITIAL_RETRY_DELAY, delay * (0.5 + random.random() / 2))
+
+
+def get_async_client():
+    """Shared httpx client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=stripe.api_base,
+            timeout=httpx.Timeout(
+                settings.STRIPE_READ_TIMEOUT_SECONDS,
+                connect=settings.STRIPE_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.STRIPE_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.STRIPE_POOL_SIZE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def stripe_request_async(method, path, params=None, idempotency_key=None):
+    """Make a Stripe API call without blocking the event loop"""
+    headers = {
+        'Authorization': f'Bearer {stripe.api_key}',
+        'Stripe-Version': stripe.api_version,
+    }
+    if method == 'POST' and (idempotency_key or settings.STRIPE_MAX_NETWORK_RETRIES):
+        # A retried POST must not create a second object
+        headers['Idempotency-Key'] = idempotency_key or str(uuid.uuid4())
+
+    pairs = encode_params(params or {})
+    if method == 'POST':
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request_kwargs = {'content': urlencode(pairs)}
+    else:
+        request_kwargs = {'params': pairs}
+
+    attempt = 0
+    while True:
+        response, error = None, None
+        started = time.perf_counter()
+        try:
+            response = await get_async_client().request(
+                method, path, headers=headers, **request_kwargs
+            )
+        except httpx.HTTPError as e:
+            error = e
+        stats.record(
+            method, path, response.status_code if response is not None else None,
+            time.perf_counter() - started
+        )
+
+        if (error is not None or response.status_code >= 400) and _should_retry(response, attempt):
+            attempt += 1
+            await asyncio.sleep(retry_delay(attempt))
+            continue
+
+        if error is not None:
+            raise stripe.error.APIConnectionError(f'Could not reach Stripe: {error}')
+        if response.status_code >= 400:
+            raise _error_from_response(response)
+        return response.json()
+
+
+async def create_checkout_session_async(**params):
+    """Async equivalent of stripe.checkout.Session.create"""
+    idempotency_key = params.pop('idempotency_key', None)
+    data = await stripe_request_async(
+        'POST', '/v1/checkout/sessions', params, idempotency_key=idempotency_key
+    )
+    return stripe.checkout.Session.construct_from(data, stripe.api_key)
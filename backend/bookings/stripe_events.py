@@ -0,0 +1,200 @@
+"""
+What each Stripe webhook event does to the bookings
+
+The webhook view stores events in the inbox (see stripe_inbox.py) and
+workers feed them through process_stripe_event(), one database transaction
+per event. That transaction also records the event id in
+ProcessedStripeEvent, so a redelivered event is dropped after one indexed
+insert, and an event whose handler fails is not recorded and can be tried
+again.
+"""
+import logging
+from collections import Counter
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import BoothSlot, ProcessedStripeEvent
+from .holds import confirm_session_holds, expire_session_holds
+from .snapshots import BOOKING_MODELS, adjust_snapshots
+from .booking_status import booking_status_changed
+
+logger = logging.getLogger(__name__)
+
+# Events handle_stripe_event() acts on
+HANDLED_EVENT_TYPES = (
+    'payment_intent.succeeded',
+    'payment_intent.payment_failed',
+    'checkout.session.completed',
+    'checkout.session.async_payment_succeeded',
+    'checkout.session.expired',
+)
+
+
+class UnmatchedPaymentIntent(Exception):
+    """A captured PaymentIntent with no booking to approve"""
+
+
+# Waits for a concurrent insert of the same id to commit or roll back, so
+# two workers handed the same event can never both go on to apply it
+MARK_PROCESSED_SQL = """
+    INSERT INTO {table} (stripe_event_id, event_type, processed_at)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (stripe_event_id) DO NOTHING
+"""
+
+
+def approve_bookings(condition, payment_intent_id, booking_models=BOOKING_MODELS):
+    """
+    Approve every authorized booking matching `condition`, in a fixed number
+    of queries however many dates it covers: per booking table one locking
+    SELECT and one UPDATE, then one UPDATE for all their slots and one for
+    the per-event snapshot counts. Returns the number approved.
+    """
+    now = timezone.now()
+    approvals = Counter()
+    slot_ids = []
+    session_ids = set()
+    approved = 0
+
+    with transaction.atomic():
+        for model, vendor_type in booking_models:
+            rows = list(
+                model.objects
+                .filter(condition, payment_status='authorized')
+                .select_for_update()
+                .values_list('id', 'event_id', 'booth_slot_id', 'stripe_payment_id')
+            )
+            if not rows:
+                continue
+
+            model.objects.filter(id__in=[row[0] for row in rows]).update(
+                payment_status='approved',
+                is_paid=True,
+                stripe_payment_intent_id=payment_intent_id,
+                hold_expires_at=None,
+                updated_at=now,
+            )
+            for _, event_id, slot_id, session_id in rows:
+                approvals[(event_id, vendor_type)] += 1
+                if slot_id:
+                    slot_ids.append(slot_id)
+                session_ids.add(session_id)
+            approved += len(rows)
+
+        # The spots were already claimed when the bookings were reserved;
+        # the slots are now taken for good
+        if slot_ids:
+            BoothSlot.objects.filter(id__in=slot_ids).update(is_available=False, held_until=None)
+
+        # The approved spots stop counting as held
+        adjust_snapshots({
+            key: {'held': -count, 'approved': count} for key, count in approvals.items()
+        })
+        booking_status_changed(session_ids)
+
+    if approved:
+        logger.info(f"Approved {approved} bookings across {len(approvals)} event/type pairs")
+    return approved
+
+
+def booking_models_for(vendor_type):
+    """The booking table metadata's vendor_type points at, or both if unknown"""
+    return [(model, t) for model, t in BOOKING_MODELS if t == vendor_type] or list(BOOKING_MODELS)
+
+
+def metadata_booking_ids(metadata):
+    """Booking primary keys from reserve_*'s metadata (booking_id or booking_ids)"""
+    ids = metadata.get('booking_ids') or metadata.get('booking_id') or ''
+    return [int(pk) for pk in str(ids).split(',') if pk.strip().isdigit()]
+
+
+def approve_payment_intent(payment_intent):
+    """
+    Approve the authorized bookings paid for by a captured PaymentIntent.
+    Raises UnmatchedPaymentIntent if it paid for nothing we hold, so the
+    event is retried (an older session's checkout may not have been
+    recorded yet) and ends up dead-lettered rather than silently dropped.
+    """
+    payment_intent_id = payment_intent['id']
+    metadata = payment_intent.get('metadata') or {}
+    booking_models = booking_models_for(metadata.get('vendor_type'))
+    booking_ids = metadata_booking_ids(metadata)
+
+    if metadata.get('multi_date_group_id'):
+        # Multi-date package: the group id is indexed
+        condition = Q(multi_date_group_id=metadata['multi_date_group_id'])
+    elif booking_ids:
+        # Single booking: its primary key came along in the metadata
+        condition = Q(pk__in=booking_ids)
+    else:
+        # Older sessions without metadata; the intent id is recorded when
+        # their checkout completes
+        condition = Q(stripe_payment_intent_id=payment_intent_id)
+        booking_models = BOOKING_MODELS
+
+    approved = approve_bookings(condition, payment_intent_id, booking_models)
+    if not approved and not any(
+        model.objects.filter(condition, payment_status='approved').exists()
+        for model, _ in booking_models
+    ):
+        raise UnmatchedPaymentIntent(f"No authorized bookings for PaymentIntent {payment_intent_id}")
+    return approved
+
+
+def confirm_checkout_session(session):
+    """
+    A vendor finished checkout: stop their holds' clock and record the
+    PaymentIntent, looking the bookings up by the primary keys in the
+    session metadata (and the indexed session id)
+    """
+    metadata = session.get('metadata') or {}
+    confirm_session_holds(
+        session['id'],
+        payment_intent_id=session.get('payment_intent') or '',
+        booking_ids=metadata_booking_ids(metadata),
+        vendor_type=metadata.get('vendor_type'),
+    )
+
+
+def handle_stripe_event(event):
+    """Apply a verified Stripe event (a dict) to the bookings"""
+    event_type = event['type']
+    obj = event['data']['object']
+    logger.info(f"Handling {event_type} - id={obj['id']}")
+
+    if event_type == 'payment_intent.succeeded':
+        approve_payment_intent(obj)
+
+    # Checkout finished: the card is authorized, so the hold must no longer lapse
+    elif event_type in ('checkout.session.completed', 'checkout.session.async_payment_succeeded'):
+        confirm_checkout_session(obj)
+
+    # Checkout abandoned: put the spots straight back on sale
+    elif event_type == 'checkout.session.expired':
+        expired = expire_session_holds(obj['id'])
+        logger.info(f"Checkout session {obj['id']} expired, released {expired} holds")
+
+    # Could mark bookings as failed, but we'll let them expire
+    elif event_type == 'payment_intent.payment_failed':
+        pass
+
+
+def mark_processed(event):
+    """Record `event` as processed; False if it already was"""
+    sql = MARK_PROCESSED_SQL.format(table=ProcessedStripeEvent._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [event['id'], event['type'], timezone.now()])
+        return cursor.rowcount == 1
+
+
+def process_stripe_event(event):
+    """
+    Apply a verified Stripe event unless it has been applied before.
+    Returns False for a duplicate.
+    """
+    with transaction.atomic():
+        if not mark_processed(event):
+            logger.info(f"Skipping duplicate {event['type']} - event={event['id']}")
+            return False
+        handle_stripe_event(event)
+    return True
@@ -0,0 +1,171 @@
+"""
+Durable inbox for Stripe webhook events
+
+The webhook verifies the signature, stores the event with receive_event()
+and returns 200 straight away, so a slow database moment never turns into
+Stripe timeouts and a storm of retries. Workers then claim due events in
+batches with SELECT ... FOR UPDATE SKIP LOCKED and lease them for a few
+minutes, so any number of them (the in-process thread below, `manage.py
+process_stripe_events`, or both) can run at once without handling an
+event twice. Each event is then applied and marked in its own
+transaction, so its row locks and notifications never wait on the rest
+of the batch. Redeliveries of an event that was already applied are
+caught by the processed-events record (see
+stripe_events.process_stripe_event) and marked as duplicates.
+
+An event whose handler raises is retried with exponential backoff. After
+STRIPE_INBOX_MAX_ATTEMPTS failures it is moved to the dead-letter state,
+where it stays for a person to look at and requeue from the admin.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ProcessedStripeEvent, StripeEventInbox
+from .scheduler import start_periodic_job, wake_periodic_job
+from .stripe_events import process_stripe_event
+
+logger = logging.getLogger(__name__)
+
+# Backoff after the nth failure is 2**n seconds, capped here
+MAX_BACKOFF_SECONDS = 60 * 60
+
+# Claimed events are not handed to another worker for this long; if the
+# worker dies mid-batch, the rest come due again afterwards
+CLAIM_LEASE_SECONDS = 5 * 60
+
+
+def receive_event(event):
+    """Store a verified webhook event (a dict) and wake the local worker"""
+    entry = StripeEventInbox.objects.create(
+        stripe_event_id=event['id'],
+        event_type=event['type'],
+        payload=event,
+    )
+    transaction.on_commit(wake_inbox_worker)
+    return entry
+
+
+def _failed(entry, error, now):
+    """Record a failed attempt; dead-letter the event once it runs out"""
+    entry.attempts += 1
+    entry.last_error = ''.join(traceback.format_exception(error))[-4000:]
+    if entry.attempts >= settings.STRIPE_INBOX_MAX_ATTEMPTS:
+        entry.status = 'dead'
+        logger.error(f"Stripe event {entry.stripe_event_id} dead-lettered after {entry.attempts} attempts: {error}")
+    else:
+        entry.next_attempt_at = now + timedelta(seconds=min(2 ** entry.attempts, MAX_BACKOFF_SECONDS))
+        logger.warning(f"Stripe event {entry.stripe_event_id} failed (attempt {entry.attempts}): {error}")
+    entry.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def claim_events(batch_size, now):
+    """Lease one batch of due events to this worker; returns their ids, oldest first"""
+    with transaction.atomic():
+        ids = list(
+            StripeEventInbox.objects
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        StripeEventInbox.objects.filter(pk__in=ids).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        )
+    return ids
+
+
+def process_entry(pk, now):
+    """
+    Apply one claimed event and mark it, in one transaction. Returns
+    'processed', 'duplicate', 'failed', or None if it was no longer pending.
+    """
+    entry = None
+    try:
+        with transaction.atomic():
+            entry = StripeEventInbox.objects.select_for_update().filter(pk=pk, status='pending').first()
+            if entry is None:
+                return None
+            applied = process_stripe_event(entry.payload)
+            entry.status = 'processed' if applied else 'duplicate'
+            entry.processed_at = timezone.now()
+            entry.save(update_fields=['status', 'processed_at'])
+            return entry.status
+    except Exception as e:
+        if entry is None:
+            raise
+        # The event's transaction is gone; record the attempt in a new one
+        entry.status = 'pending'
+        _failed(entry, e, now)
+        return 'failed'
+
+
+def process_inbox(batch_size=None):
+    """
+    Claim one batch of due events and handle them, oldest first.
+
+    Each event commits on its own, so a failing event is retried later
+    without undoing the rest of the batch. Returns (processed, failed);
+    duplicates count as processed.
+    """
+    batch_size = batch_size or settings.STRIPE_INBOX_BATCH_SIZE
+    now = timezone.now()
+    processed = failed = 0
+
+    for pk in claim_events(batch_size, now):
+        outcome = process_entry(pk, now)
+        if outcome == 'failed':
+            failed += 1
+        elif outcome is not None:
+            processed += 1
+
+    return processed, failed
+
+
+def drain_inbox(batch_size=None):
+    """Process batches until no due events are left; returns (processed, failed)"""
+    batch_size = batch_size or settings.STRIPE_INBOX_BATCH_SIZE
+    total_processed = total_failed = 0
+    while True:
+        processed, failed = process_inbox(batch_size)
+        total_processed += processed
+        total_failed += failed
+        if processed + failed < batch_size:
+            return total_processed, total_failed
+
+
+def start_inbox_worker(interval=None):
+    """Drain the inbox on a background thread every `interval` seconds"""
+    interval = interval or settings.STRIPE_INBOX_POLL_SECONDS or 10
+    return start_periodic_job('stripe-inbox', interval, drain_inbox)
+
+
+def wake_inbox_worker():
+    """Have this process's worker thread drain the inbox now, if it runs one"""
+    wake_periodic_job('stripe-inbox')
+
+
+def requeue_events(queryset):
+    """Put events (e.g. dead letters) back in line for another round of attempts"""
+    requeued = queryset.filter(status__in=['pending', 'dead']).update(
+        status='pending', attempts=0, next_attempt_at=timezone.now()
+    )
+    if requeued:
+        transaction.on_commit(wake_inbox_worker)
+    return requeued
+
+
+def purge_processed_events(now=None):
+    """
+    Delete inbox entries and de-duplication records older than
+    STRIPE_INBOX_RETENTION_DAYS. Stripe stops redelivering after three
+    days, so the records are long dead by then.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=settings.STRIPE_INBOX_RETENTION_DAYS)
+    deleted, _ = StripeEventInbox.objects.filter(
+        status__in=['processed', 'duplicate'], processed_at__lte=cutoff
+    ).delete()
+    ProcessedStripeEvent.objects.filter(processed_at__lte=cutoff).delete()
+    return deleted
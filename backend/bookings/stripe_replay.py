@@ -0,0 +1,131 @@
+"""
+Catching up on Stripe events the webhook missed
+
+Events come from Stripe's event list (kept for 30 days) or from a JSONL
+dump, oldest first, and go through the same process_stripe_event() as the
+inbox workers. Events that were already applied are dropped by the
+processed-events record, so replaying an overlapping window is safe.
+
+Events that touch the same bookings (a checkout session and its
+PaymentIntent, or every event of a multi-date group) are kept together in
+`created` order on one thread; unrelated groups are packed into batches
+for a bounded pool of threads. Each thread has its own database
+connection.
+"""
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import stripe
+from django.db import connection
+from .stripe_events import HANDLED_EVENT_TYPES, process_stripe_event
+
+logger = logging.getLogger(__name__)
+
+# The most events Stripe returns per page
+MAX_PAGE_SIZE = 100
+
+
+def list_stripe_events(since, types=HANDLED_EVENT_TYPES, page_size=MAX_PAGE_SIZE):
+    """Events created at or after `since` (a datetime) as dicts, oldest first"""
+    events = []
+    params = {'created': {'gte': int(since.timestamp())}, 'limit': page_size, 'types': list(types)}
+    while True:
+        page = stripe.Event.list(**params)
+        # StripeObject's str() is its JSON
+        events += [json.loads(str(event)) for event in page.data]
+        if not page.has_more:
+            break
+        params['starting_after'] = page.data[-1].id
+    # Stripe lists newest first
+    return sorted(events, key=lambda event: event['created'])
+
+
+def read_event_dump(path, since=None, types=HANDLED_EVENT_TYPES):
+    """Events from a JSONL file (one event per line), oldest first"""
+    cutoff = int(since.timestamp()) if since else 0
+    events = []
+    with open(path) as dump:
+        for line in dump:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event['created'] >= cutoff and event['type'] in types:
+                events.append(event)
+    return sorted(events, key=lambda event: event['created'])
+
+
+def booking_key(event):
+    """
+    What an event's bookings are found by: the multi-date group, booking
+    ids or, for older sessions without metadata, the PaymentIntent
+    """
+    obj = event['data']['object']
+    metadata = obj.get('metadata') or {}
+    if metadata.get('multi_date_group_id'):
+        return 'group', metadata['multi_date_group_id']
+    booking_ids = metadata.get('booking_ids') or metadata.get('booking_id')
+    if booking_ids:
+        return 'bookings', str(booking_ids).split(',')[0].strip()
+    if obj.get('object') == 'checkout.session':
+        return 'intent', obj.get('payment_intent') or obj['id']
+    return 'intent', obj['id']
+
+
+def related_batches(events, batch_size):
+    """
+    Batches of about `batch_size` events (oldest first) in which every
+    event of a group sits in the same batch, in order
+    """
+    groups = {}
+    for event in events:
+        groups.setdefault(booking_key(event), []).append(event)
+
+    batches, batch = [], []
+    for group in groups.values():
+        batch += group
+        if len(batch) >= batch_size:
+            batches.append(batch)
+            batch = []
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _replay_batch(events, apply=process_stripe_event):
+    """Apply a batch on this thread; returns (applied, duplicates, failed)"""
+    applied = duplicates = failed = 0
+    try:
+        for event in events:
+            try:
+                if apply(event):
+                    applied += 1
+                else:
+                    duplicates += 1
+            except Exception as e:
+                logger.error(f"Replaying {event['type']} {event['id']} failed: {e}")
+                failed += 1
+    finally:
+        # Pool threads live outside the request cycle
+        connection.close()
+    return applied, duplicates, failed
+
+
+def replay_events(events, batch_size=100, concurrency=4, apply=process_stripe_event):
+    """
+    Apply `events` (oldest first) with at most `concurrency` batches in
+    flight, each through `apply` (True if applied, False for a duplicate).
+    Returns {'events', 'applied', 'duplicates', 'failed', 'seconds'}.
+    """
+    batches = related_batches(events, batch_size)
+    totals = {'events': len(events), 'applied': 0, 'duplicates': 0, 'failed': 0}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1), thread_name_prefix='stripe-replay') as pool:
+        for applied, duplicates, failed in pool.map(partial(_replay_batch, apply=apply), batches):
+            totals['applied'] += applied
+            totals['duplicates'] += duplicates
+            totals['failed'] += failed
+    totals['seconds'] = time.perf_counter() - started
+    return totals
@@ -0,0 +1,70 @@
+"""
+Shared setup for the booking tests
+"""
+from datetime import date, timedelta
+from itertools import count
+from types import SimpleNamespace
+from unittest import mock
+from django.test import TestCase
+from bookings import throttling
+from bookings.models import Event
+
+_dates = count()
+_sessions = count(1)
+
+
+def checkout_session(**kwargs):
+    """Stand-in for a created stripe.checkout.Session"""
+    number = next(_sessions)
+    return SimpleNamespace(id=f'cs_test_{number}', url=f'https://checkout.stripe.test/{number}')
+
+
+def make_event(regular=2, food=1, **fields):
+    """An upcoming event with `regular` and `food` spots, its slot pool included"""
+    return Event.objects.create(
+        name='Test Market',
+        date=date.today() + timedelta(days=30 + next(_dates)),
+        location='Test Hall',
+        regular_spots_total=regular,
+        regular_spots_available=regular,
+        food_spots_total=food,
+        food_spots_available=food,
+        **fields,
+    )
+
+
+def reservation_data(vendor_type='regular', **fields):
+    """A valid reservation body for `vendor_type`"""
+    data = {
+        'vendor_type': vendor_type,
+        'first_name': 'Test',
+        'last_name': 'Vendor',
+        'vendor_email': 'vendor@example.com',
+        'phone': '5550100',
+    }
+    if vendor_type == 'food':
+        data.update(cuisine_type='Tacos', food_items='Tacos')
+    else:
+        data.update(products_selling='Prints')
+    data.update(fields)
+    return data
+
+
+class BookingTestCase(TestCase):
+    """Stripe's Checkout Session API is patched out and throttle buckets start full"""
+
+    def setUp(self):
+        super().setUp()
+        # Buckets live for the process; give every test its own
+        store = mock.patch.object(throttling, '_store', throttling.LocalBucketStore())
+        store.start()
+        self.addCleanup(store.stop)
+
+        create = mock.patch('stripe.checkout.Session.create', side_effect=checkout_session)
+        self.create_session = create.start()
+        self.addCleanup(create.stop)
+
+    def reserve(self, event, **fields):
+        return self.client.post(
+            f'/api/events/{event.pk}/reserve/', reservation_data(**fields), content_type='application/json'
+        )
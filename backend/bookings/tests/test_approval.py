@@ -0,0 +1,67 @@
+"""
+A captured payment approves every booking it paid for in one go
+"""
+from bookings.models import EventAvailabilitySnapshot, GeneralVendorBooking
+from bookings.stripe_events import UnmatchedPaymentIntent, approve_payment_intent
+from .base import BookingTestCase, make_event, reservation_data
+
+
+class ApprovePaymentIntentTests(BookingTestCase):
+
+    def reserve_package(self, events):
+        body = {'reservations': [
+            {'eventDate': str(event.date), 'reservationData': reservation_data()}
+            for event in events
+        ]}
+        response = self.client.post('/api/events/multi/reserve/', body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return list(GeneralVendorBooking.objects.filter(pk__in=response.json()['booking_ids']))
+
+    def test_multi_date_package_is_approved_together(self):
+        events = [make_event(regular=2) for _ in range(3)]
+        bookings = self.reserve_package(events)
+        group_id = bookings[0].multi_date_group_id
+
+        approved = approve_payment_intent({
+            'id': 'pi_test_1',
+            'metadata': {'multi_date_group_id': group_id, 'vendor_type': 'regular'},
+        })
+
+        self.assertEqual(approved, 3)
+        for booking in GeneralVendorBooking.objects.filter(multi_date_group_id=group_id):
+            self.assertEqual(booking.payment_status, 'approved')
+            self.assertTrue(booking.is_paid)
+            self.assertEqual(booking.stripe_payment_intent_id, 'pi_test_1')
+            self.assertIsNone(booking.hold_expires_at)
+            self.assertFalse(booking.booth_slot.is_available)
+            self.assertIsNone(booking.booth_slot.held_until)
+        for event in events:
+            # The spot was taken at reservation; approval does not take another
+            event.refresh_from_db()
+            self.assertEqual(event.regular_spots_available, 1)
+            snapshot = EventAvailabilitySnapshot.objects.get(event=event)
+            self.assertEqual((snapshot.regular_held, snapshot.regular_approved), (0, 1))
+
+    def test_single_booking_is_found_by_its_primary_key(self):
+        event = make_event(regular=2)
+        response = self.reserve(event)
+        booking_id = response.json()['booking_id']
+
+        approved = approve_payment_intent({
+            'id': 'pi_test_2', 'metadata': {'booking_id': str(booking_id), 'vendor_type': 'regular'},
+        })
+
+        self.assertEqual(approved, 1)
+        self.assertEqual(GeneralVendorBooking.objects.get(pk=booking_id).payment_status, 'approved')
+
+    def test_payment_for_no_booking_raises(self):
+        with self.assertRaises(UnmatchedPaymentIntent):
+            approve_payment_intent({'id': 'pi_unknown', 'metadata': {}})
+
+    def test_repeat_approval_is_not_an_error(self):
+        event = make_event(regular=2)
+        booking_id = self.reserve(event).json()['booking_id']
+        payment_intent = {'id': 'pi_test_3', 'metadata': {'booking_id': str(booking_id)}}
+        approve_payment_intent(payment_intent)
+
+        self.assertEqual(approve_payment_intent(payment_intent), 0)
@@ -0,0 +1,68 @@
+"""
+Unpaid holds lapse and give their spots back
+"""
+from datetime import timedelta
+from django.utils import timezone
+from bookings.holds import confirm_session_holds, expire_session_holds, expire_stale_holds
+from bookings.models import GeneralVendorBooking
+from .base import BookingTestCase, make_event
+
+
+class HoldExpiryTests(BookingTestCase):
+
+    def hold(self, event):
+        response = self.reserve(event)
+        self.assertEqual(response.status_code, 200)
+        return GeneralVendorBooking.objects.get(pk=response.json()['booking_id'])
+
+    def assert_spot_returned(self, event, booking):
+        booking.refresh_from_db()
+        self.assertEqual(booking.payment_status, 'expired')
+        self.assertIsNone(booking.hold_expires_at)
+        self.assertTrue(booking.booth_slot.is_available)
+        self.assertIsNone(booking.booth_slot.held_until)
+        event.refresh_from_db()
+        self.assertEqual(event.regular_spots_available, 1)
+
+    def test_expired_hold_returns_its_spot(self):
+        event = make_event(regular=1)
+        booking = self.hold(event)
+        GeneralVendorBooking.objects.filter(pk=booking.pk).update(
+            hold_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertEqual(expire_stale_holds(), 1)
+
+        self.assert_spot_returned(event, booking)
+        # And it can be sold again
+        self.assertEqual(self.reserve(event, vendor_email='next@example.com').status_code, 200)
+
+    def test_live_hold_is_kept(self):
+        event = make_event(regular=1)
+        booking = self.hold(event)
+
+        self.assertEqual(expire_stale_holds(), 0)
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.payment_status, 'authorized')
+        event.refresh_from_db()
+        self.assertEqual(event.regular_spots_available, 0)
+
+    def test_completed_checkout_is_never_swept(self):
+        event = make_event(regular=1)
+        booking = self.hold(event)
+        confirm_session_holds(booking.stripe_payment_id, payment_intent_id='pi_test')
+
+        self.assertEqual(expire_stale_holds(now=timezone.now() + timedelta(days=30)), 0)
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.payment_status, 'authorized')
+        self.assertEqual(booking.stripe_payment_intent_id, 'pi_test')
+
+    def test_expired_checkout_session_returns_its_spot(self):
+        event = make_event(regular=1)
+        booking = self.hold(event)
+
+        self.assertEqual(expire_session_holds(booking.stripe_payment_id), 1)
+
+        self.assert_spot_returned(event, booking)
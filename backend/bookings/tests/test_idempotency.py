@@ -0,0 +1,52 @@
+"""
+Idempotency-Key on the reserve endpoints
+"""
+import stripe
+from bookings.idempotency import IDEMPOTENCY_HEADER, REPLAYED_HEADER
+from bookings.models import GeneralVendorBooking
+from .base import BookingTestCase, checkout_session, make_event, reservation_data
+
+
+class IdempotencyKeyTests(BookingTestCase):
+
+    def reserve_with_key(self, event, key, **fields):
+        return self.client.post(
+            f'/api/events/{event.pk}/reserve/', reservation_data(**fields),
+            content_type='application/json', headers={IDEMPOTENCY_HEADER: key},
+        )
+
+    def test_repeat_gets_the_stored_response(self):
+        event = make_event(regular=2)
+        first = self.reserve_with_key(event, 'key-1')
+
+        repeat = self.reserve_with_key(event, 'key-1')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(repeat.status_code, 200)
+        self.assertEqual(repeat.json(), first.json())
+        self.assertEqual(repeat[REPLAYED_HEADER], 'true')
+        self.assertEqual(self.create_session.call_count, 1)
+        self.assertEqual(GeneralVendorBooking.objects.filter(event=event).count(), 1)
+        event.refresh_from_db()
+        self.assertEqual(event.regular_spots_available, 1)
+
+    def test_key_reused_for_another_body_is_rejected(self):
+        event = make_event(regular=2)
+        self.reserve_with_key(event, 'key-1')
+
+        response = self.reserve_with_key(event, 'key-1', vendor_email='other@example.com')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(GeneralVendorBooking.objects.filter(event=event).count(), 1)
+
+    def test_server_error_can_be_retried_with_the_same_key(self):
+        event = make_event(regular=1)
+        self.create_session.side_effect = stripe.error.APIConnectionError('Stripe is down')
+        self.assertEqual(self.reserve_with_key(event, 'key-1').status_code, 500)
+
+        self.create_session.side_effect = checkout_session
+        retry = self.reserve_with_key(event, 'key-1')
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertNotIn(REPLAYED_HEADER, retry)
+        self.assertEqual(GeneralVendorBooking.objects.filter(event=event).count(), 1)
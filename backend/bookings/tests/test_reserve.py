@@ -0,0 +1,52 @@
+"""
+Single-date reservations claim a spot up front and give it back if
+checkout cannot start
+"""
+import stripe
+from bookings.models import BoothSlot, FoodTruckBooking, GeneralVendorBooking
+from .base import BookingTestCase, make_event
+
+
+class ReserveEventSpotTests(BookingTestCase):
+
+    def test_reservation_holds_a_spot(self):
+        event = make_event(regular=2)
+
+        response = self.reserve(event)
+
+        self.assertEqual(response.status_code, 200)
+        booking = GeneralVendorBooking.objects.get(pk=response.json()['booking_id'])
+        self.assertEqual(booking.payment_status, 'authorized')
+        self.assertEqual(booking.stripe_payment_id, response.json()['session_id'])
+        self.assertIsNotNone(booking.hold_expires_at)
+        self.assertFalse(booking.booth_slot.is_available)
+        event.refresh_from_db()
+        self.assertEqual(event.regular_spots_available, 1)
+
+    def test_sold_out_event_is_rejected(self):
+        event = make_event(regular=1, food=1)
+        self.assertEqual(self.reserve(event).status_code, 200)
+
+        response = self.reserve(event, vendor_email='late@example.com')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('No regular spots available', response.json()['error'])
+        self.assertEqual(GeneralVendorBooking.objects.filter(event=event).count(), 1)
+        self.assertEqual(self.create_session.call_count, 1)
+        event.refresh_from_db()
+        self.assertEqual(event.regular_spots_available, 0)
+        # The other vendor type has its own spots
+        self.assertEqual(self.reserve(event, vendor_type='food').status_code, 200)
+
+    def test_stripe_failure_releases_the_spot(self):
+        event = make_event(regular=1)
+        self.create_session.side_effect = stripe.error.APIConnectionError('Stripe is down')
+
+        response = self.reserve(event)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(GeneralVendorBooking.objects.filter(event=event).exists())
+        self.assertFalse(FoodTruckBooking.objects.filter(event=event).exists())
+        self.assertTrue(BoothSlot.objects.get(event=event, slot_type='regular').is_available)
+        event.refresh_from_db()
+        self.assertEqual(event.regular_spots_available, 1)
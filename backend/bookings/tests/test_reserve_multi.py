@@ -0,0 +1,56 @@
+"""
+Multi-date packages claim a spot on every date, or none at all
+"""
+import stripe
+from bookings.models import BoothSlot, GeneralVendorBooking
+from .base import BookingTestCase, make_event, reservation_data
+
+
+class ReserveMultiEventSpotsTests(BookingTestCase):
+
+    def reserve_dates(self, events, **fields):
+        body = {'reservations': [
+            {'eventDate': str(event.date), 'reservationData': reservation_data(**fields)}
+            for event in events
+        ]}
+        return self.client.post('/api/events/multi/reserve/', body, content_type='application/json')
+
+    def assert_available(self, events, *counts):
+        for event, expected in zip(events, counts):
+            event.refresh_from_db()
+            self.assertEqual(event.regular_spots_available, expected)
+
+    def test_package_holds_a_spot_on_every_date(self):
+        events = [make_event(regular=2) for _ in range(3)]
+
+        response = self.reserve_dates(events)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['num_dates'], 3)
+        bookings = GeneralVendorBooking.objects.filter(pk__in=response.json()['booking_ids'])
+        self.assertEqual({booking.event_id for booking in bookings}, {event.pk for event in events})
+        self.assertEqual(len({booking.multi_date_group_id for booking in bookings}), 1)
+        self.assertTrue(all(booking.payment_status == 'authorized' for booking in bookings))
+        self.assert_available(events, 1, 1, 1)
+
+    def test_one_sold_out_date_rejects_the_package(self):
+        events = [make_event(regular=1) for _ in range(3)]
+        self.assertEqual(self.reserve(events[1]).status_code, 200)
+
+        response = self.reserve_dates(events, vendor_email='package@example.com')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(events[1].date), response.json()['error'])
+        self.assertFalse(GeneralVendorBooking.objects.filter(vendor_email='package@example.com').exists())
+        self.assert_available(events, 1, 0, 1)
+
+    def test_stripe_failure_releases_every_date(self):
+        events = [make_event(regular=1) for _ in range(2)]
+        self.create_session.side_effect = stripe.error.APIConnectionError('Stripe is down')
+
+        response = self.reserve_dates(events)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(GeneralVendorBooking.objects.filter(event__in=events).exists())
+        self.assertFalse(BoothSlot.objects.filter(event__in=events, is_available=False).exists())
+        self.assert_available(events, 1, 1)
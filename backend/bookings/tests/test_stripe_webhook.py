@@ -0,0 +1,85 @@
+"""
+Stripe webhook events are applied once, however often they are delivered
+"""
+import hashlib
+import hmac
+import json
+import time
+from django.test import override_settings
+from bookings.models import GeneralVendorBooking, ProcessedStripeEvent, StripeEventInbox
+from bookings.stripe_events import process_stripe_event
+from bookings.stripe_inbox import drain_inbox
+from .base import BookingTestCase, make_event
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+def payment_succeeded(booking, event_id='evt_test_1'):
+    """payment_intent.succeeded for a single-date booking"""
+    return {
+        'id': event_id,
+        'object': 'event',
+        'type': 'payment_intent.succeeded',
+        'created': int(time.time()),
+        'data': {'object': {
+            'id': 'pi_test_1',
+            'object': 'payment_intent',
+            'metadata': {'booking_id': str(booking.pk), 'vendor_type': 'regular'},
+        }},
+    }
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class DuplicateWebhookTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(regular=2)
+        response = self.reserve(self.event)
+        self.booking = GeneralVendorBooking.objects.get(pk=response.json()['booking_id'])
+
+    def deliver(self, stripe_event):
+        payload = json.dumps(stripe_event)
+        timestamp = int(time.time())
+        signature = hmac.new(
+            WEBHOOK_SECRET.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256
+        ).hexdigest()
+        return self.client.post(
+            '/api/stripe/webhook/', payload, content_type='application/json',
+            headers={'Stripe-Signature': f't={timestamp},v1={signature}'},
+        )
+
+    def test_redelivered_event_is_a_no_op(self):
+        stripe_event = payment_succeeded(self.booking)
+        self.assertEqual(self.deliver(stripe_event).status_code, 200)
+        self.assertEqual(self.deliver(stripe_event).status_code, 200)
+
+        self.assertEqual(drain_inbox(), (2, 0))
+
+        statuses = StripeEventInbox.objects.order_by('id').values_list('status', flat=True)
+        self.assertEqual(list(statuses), ['processed', 'duplicate'])
+        self.assertEqual(ProcessedStripeEvent.objects.filter(stripe_event_id='evt_test_1').count(), 1)
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'approved')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.regular_spots_available, 1)
+
+    def test_event_seen_before_is_skipped(self):
+        stripe_event = payment_succeeded(self.booking)
+        self.assertTrue(process_stripe_event(stripe_event))
+        # A booking changed since must not be touched by the repeat
+        GeneralVendorBooking.objects.filter(pk=self.booking.pk).update(payment_status='authorized')
+
+        self.assertFalse(process_stripe_event(stripe_event))
+
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, 'authorized')
+
+    def test_bad_signature_is_rejected(self):
+        response = self.client.post(
+            '/api/stripe/webhook/', json.dumps(payment_succeeded(self.booking)),
+            content_type='application/json', headers={'Stripe-Signature': 't=1,v1=bad'},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEventInbox.objects.exists())
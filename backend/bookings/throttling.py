@@ -0,0 +1,199 @@
+"""
+Token-bucket throttling for the API
+
+Each client gets a bucket per scope: reads and writes per IP address, and
+writes per vendor email, so one vendor cannot get round the limit by
+switching networks and one network cannot book on behalf of many vendors.
+A rate of "N/period" allows a burst of N requests that refills evenly over
+the period. The client IP is the X-Forwarded-For entry added by our own
+edge proxy (REST_FRAMEWORK['NUM_PROXIES']), never one the client supplied.
+
+Buckets are kept as a single theoretical-arrival time per key (GCRA), so a
+decision is one O(1) operation and never touches the database. With
+REDIS_URL set they live in Redis and are shared by every worker; otherwise
+each process keeps its own in memory.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Atomically advance the bucket; returns seconds to wait, or 0 if allowed
+TAKE_TOKEN_LUA = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+local next_tat = math.max(tat, now) + interval
+if next_tat - now > limit then
+    return tostring(next_tat - now - limit)
+end
+redis.call('SET', KEYS[1], tostring(next_tat), 'PX', math.ceil((next_tat - now) * 1000))
+return '0'
+"""
+
+
+def parse_rate(rate):
+    """'30/min' -> (30, 60.0): burst size and the period it refills over"""
+    num, period = rate.split('/')
+    return int(num), float(PERIODS[period[0]])
+
+
+class LocalBucketStore:
+    """In-process buckets, for single-process runs and development"""
+    max_keys = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tat = {}
+
+    def take(self, key, interval, limit, now):
+        with self._lock:
+            next_tat = max(self._tat.get(key, now), now) + interval
+            if next_tat - now > limit:
+                return next_tat - now - limit
+            self._tat[key] = next_tat
+            if len(self._tat) > self.max_keys:
+                # Buckets in the past are full again; forget them
+                self._tat = {k: tat for k, tat in self._tat.items() if tat > now}
+            return 0
+
+
+class RedisBucketStore:
+    """Buckets shared by every process through Redis"""
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(TAKE_TOKEN_LUA)
+
+    def take(self, key, interval, limit, now):
+        try:
+            return float(self._take(keys=[key], args=[now, interval, limit]))
+        except redis.RedisError as e:
+            # Fail open: an unavailable limiter should not take bookings down
+            logger.error(f"Throttle store unavailable: {e}")
+            return 0
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            if settings.REDIS_URL and REDIS_AVAILABLE:
+                _store = RedisBucketStore(settings.REDIS_URL)
+            else:
+                if settings.REDIS_URL:
+                    logger.warning("redis not installed. Throttle buckets are per process.")
+                _store = LocalBucketStore()
+        return _store
+
+
+def take_token(scope, ident, now=None):
+    """Spend one token from `ident`'s bucket; returns seconds to wait, 0 if allowed"""
+    rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+    if not rate:
+        return 0
+    burst, period = parse_rate(rate)
+    interval = period / burst
+    return get_store().take(
+        f'throttle:{scope}:{ident}', interval, interval * burst, now or time.time()
+    )
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class: subclasses choose the scope and the keys to charge"""
+
+    def get_scope(self, request):
+        raise NotImplementedError
+
+    def get_idents(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self._wait = 0
+        scope = self.get_scope(request)
+        if scope is None:
+            return True
+        for ident in self.get_idents(request):
+            self._wait = max(self._wait, take_token(scope, ident))
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+class ClientIPThrottle(TokenBucketThrottle):
+    """Separate read and write budgets per client IP"""
+
+    def get_scope(self, request):
+        return 'ip_read' if request.method in ('GET', 'HEAD', 'OPTIONS') else 'ip_write'
+
+    def get_idents(self, request):
+        return [self.get_ident(request)]
+
+
+class VendorEmailThrottle(TokenBucketThrottle):
+    """Write budget per vendor email on reservation requests"""
+
+    def get_scope(self, request):
+        return None if request.method in ('GET', 'HEAD', 'OPTIONS') else 'email_write'
+
+    def get_idents(self, request):
+        return [
+            hashlib.sha256(email.encode()).hexdigest()[:32]
+            for email in sorted(vendor_emails(request))
+        ]
+
+
+def vendor_emails(request):
+    """Vendor emails in a single or multi-date reservation body"""
+    # Parse the raw body rather than request.data so the body stays readable
+    # for the view (and the Idempotency-Key hash)
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return set()
+    if not isinstance(body, dict):
+        return set()
+
+    entries = [body] + [
+        reservation.get('reservationData') or {}
+        for reservation in body.get('reservations') or []
+        if isinstance(reservation, dict)
+    ]
+    return {
+        entry['vendor_email'].strip().lower()
+        for entry in entries
+        if isinstance(entry, dict) and isinstance(entry.get('vendor_email'), str)
+    }
+
+
+def throttle_wait(request):
+    """
+    Run the default throttles outside DRF (the async views); returns the
+    seconds to wait, or None when the request may proceed
+    """
+    waits = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not throttle.allow_request(request, None):
+            waits.append(throttle.wait())
+    return max(waits) if waits else None
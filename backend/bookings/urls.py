@@ -1,11 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, async_views
 
 router = DefaultRouter()
 router.register(r'events', views.EventViewSet, basename='event')
 
 urlpatterns = [
+    # Live availability (Server-Sent Events); ahead of the router, which
+    # would otherwise read "stream" as an event id
+    path('events/stream/', async_views.availability_stream, name='availability-stream'),
+    
     path('', include(router.urls)),
     
     # Booth slot endpoints
@@ -17,11 +21,19 @@ urlpatterns = [
     # Multi-date booking
     path('events/multi/reserve/', views.reserve_multi_event_spots, name='reserve-multi-event-spots'),
     
+    # Async booking endpoints (use when serving vendor_booking.asgi)
+    path('events/<int:event_id>/reserve/async/', async_views.reserve_event_spot_async, name='reserve-event-spot-async'),
+    path('events/multi/reserve/async/', async_views.reserve_multi_event_spots_async, name='reserve-multi-event-spots-async'),
+    
+    # Waiting room (events with an admission rate)
+    path('waiting-room/join/', views.waiting_room_join, name='waiting-room-join'),
+    path('waiting-room/status/', views.waiting_room_status, name='waiting-room-status'),
+    
     # Availability endpoints
     path('events/availability/<str:date>/', views.event_availability, name='event-availability'),
     
     # Booking status
-    path('bookings/status/<str:session_id>/', views.booking_status, name='booking-status'),
+    path('bookings/status/<str:session_id>/', async_views.booking_status, name='booking-status'),
     
     # Stripe webhook (accept both with and without trailing slash)
     path('stripe/webhook/', views.stripe_webhook, name='stripe-webhook'),
@@ -1,177 +1,175 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view, action
+from rest_framework.decorators import api_view, action, throttle_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.db import transaction
-from django.db.models import F
+from django.db.models import Prefetch
 from datetime import datetime
 import stripe
-import json
 import uuid
-from .models import Event, BoothSlot, GeneralVendorBooking, FoodTruckBooking
+from .models import Event, BoothSlot
+from .inventory import SpotsUnavailable
+from .holds import hold_expiry
+from .stripe_inbox import receive_event
+from .availability_cache import calendar_payload, calendar_etag, conditional_read, event_etag, in_window
+from .pagination import EventCursorPagination
+from .idempotency import idempotent
+from .waiting_room import (
+    AdmissionDenied,
+    check_admission,
+    join as join_waiting_room,
+    queue_status,
+    read_token,
+    release_admission,
+    sold_out_events,
+)
+from .checkout import (
+    get_frontend_url,
+    get_price_for_vendor_type,
+    multi_checkout_params,
+    single_checkout_params,
+)
+from .reservations import (
+    ReservationError,
+    booking_model,
+    create_booking_from_data,
+    create_bookings_in_bulk,
+    match_events,
+    release_bookings,
+    validate_multi_reservations,
+)
 from .serializers import (
     EventSerializer,
+    CompactEventSerializer,
     EventListSerializer,
-    CalendarEventSerializer,
     BoothSlotSerializer,
-    GeneralVendorBookingSerializer,
-    FoodTruckBookingSerializer,
     ReserveBoothSlotSerializer,
     MultiDateReservationSerializer,
-    PaymentStatusSerializer
+    PaymentStatusSerializer,
+    WaitingRoomJoinSerializer,
+    AvailabilityRangeSerializer,
+    date_window,
 )
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
-
-
-def get_price_for_vendor_type(vendor_type, event=None):
-    """Get price based on vendor type"""
-    if vendor_type == 'food':
-        return 75.00  # Food truck price
-    return 35.00  # Regular vendor price
+# Columns an availability answer needs, so reads skip the rest of the row
+AVAILABILITY_FIELDS = (
+    'date',
+    'regular_spots_available', 'regular_spots_total', 'regular_price',
+    'food_spots_available', 'food_spots_total', 'food_price',
+)
 
 
-def check_availability(event, vendor_type, quantity=1):
-    """Check if spots are available for the given vendor type"""
-    if vendor_type == 'food':
-        return event.food_spots_available >= quantity
-    return event.regular_spots_available >= quantity
+def availability_data(row):
+    """Availability response body for one event (a values() row)"""
+    return {
+        'date': row['date'],
+        'regular': {
+            'available': row['regular_spots_available'],
+            'total': row['regular_spots_total'],
+            'price': float(row['regular_price'])
+        },
+        'food': {
+            'available': row['food_spots_available'],
+            'total': row['food_spots_total'],
+            'price': float(row['food_price'])
+        }
+    }
 
 
-def create_booking_from_data(event, data, multi_date_group_id=None):
-    """Helper function to create the appropriate booking model"""
-    vendor_type = data.get('vendor_type', 'regular')
-    
-    common_fields = {
-        'event': event,
-        'first_name': data['first_name'],
-        'last_name': data['last_name'],
-        'vendor_email': data['vendor_email'],
-        'business_name': data.get('business_name', ''),
-        'phone': data['phone'],
-        'preferred_name': data.get('preferred_name', ''),
-        'pronouns': data.get('pronouns', ''),
-        'instagram': data.get('instagram', ''),
-        'social_media_consent': data.get('social_media_consent', ''),
-        'photo_consent': data.get('photo_consent', ''),
-        'noise_sensitive': data.get('noise_sensitive', ''),
-        'sharing_booth': data.get('sharing_booth', ''),
-        'booth_partner_instagram': data.get('booth_partner_instagram', ''),
-        'price_range': data.get('price_range', ''),
-        'additional_notes': data.get('additional_notes', ''),
-        'payment_status': 'pending',
-        'is_paid': False,
-        'amount_paid': 0,
-        'is_multi_date': multi_date_group_id is not None,
-        'multi_date_group_id': multi_date_group_id,
-    }
-    
-    # Try to find an available booth slot of the correct type
-    booth_slot = BoothSlot.objects.filter(
-        event=event,
-        slot_type=vendor_type,
-        is_available=True
-    ).first()
-    
-    if not booth_slot:
-        # Find the next available spot number across ALL slots for this event
-        # (since spot_number must be unique per event, not per slot_type)
-        existing_slots = BoothSlot.objects.filter(event=event).order_by('-spot_number')
-        
-        if existing_slots.exists():
-            # Get the highest spot number and increment
-            last_spot = existing_slots.first().spot_number
-            try:
-                last_number = int(last_spot)
-                next_number = last_number + 1
-            except ValueError:
-                # Fallback if spot_number isn't a simple integer string
-                next_number = existing_slots.count() + 1
-        else:
-            next_number = 1
-        
-        # Create a new booth slot with the next available number
-        booth_slot = BoothSlot.objects.create(
-            event=event,
-            spot_number=f"{next_number:03d}",
-            slot_type=vendor_type,
-            is_available=True
-        )
-    
-    common_fields['booth_slot'] = booth_slot
-    
-    if vendor_type == 'food':
-        return FoodTruckBooking.objects.create(
-            **common_fields,
-            cuisine_type=data.get('cuisine_type', ''),
-            food_items=data.get('food_items', ''),
-            setup_size=data.get('setup_size', ''),
-            generator=data.get('generator', ''),
-            health_permit=data.get('health_permit', ''),
-        )
-    else:
-        return GeneralVendorBooking.objects.create(
-            **common_fields,
-            products_selling=data.get('products_selling', ''),
-            electricity_cord=data.get('electricity_cord', ''),
-        )
+def stream_json_array(rows, render):
+    """Encode `rows` as a JSON array one element at a time"""
+    renderer = JSONRenderer()
+    yield b'['
+    for i, row in enumerate(rows):
+        yield (b',' if i else b'') + renderer.render(render(row))
+    yield b']'
 
 
 class EventViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet for viewing events"""
+    """
+    ViewSet for viewing events. The list and the calendar only cover
+    ?from=&to= (inclusive), upcoming events by default; the list is
+    paged by a cursor on date.
+    """
     queryset = Event.objects.all().order_by('date')
     serializer_class = EventSerializer
+    pagination_class = EventCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = in_window(queryset, date_window(self.request))
+        elif self.action == 'retrieve':
+            # Every slot of the event in one query, only the columns serialized
+            queryset = queryset.prefetch_related(Prefetch(
+                'booth_slots',
+                queryset=BoothSlot.objects.only('id', 'event_id', 'spot_number', 'slot_type', 'is_available'),
+            ))
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'list':
             return EventListSerializer
+        if self.request.query_params.get('slots') == 'compact':
+            return CompactEventSerializer
         return EventSerializer
 
+    @method_decorator(conditional_read(event_etag))
+    def retrieve(self, request, *args, **kwargs):
+        """Event with its booth slots; ?slots=compact sends them as a slot_map"""
+        return super().retrieve(request, *args, **kwargs)
+
+    @method_decorator(conditional_read(calendar_etag))
     @action(detail=False, methods=['get'])
     def calendar(self, request):
         """Returns events with availability for calendar view"""
-        events = Event.objects.all().order_by('date')
-        
-        # Get market status from query params (optional)
-        market_status = request.query_params.get('status', {})
-        
-        calendar_data = []
-        for event in events:
-            status = market_status.get(str(event.date), 'available')
-            calendar_data.append({
-                'id': event.id,
-                'name': event.name,
-                'date': event.date,
-                'regular_spots_available': event.regular_spots_available,
-                'food_spots_available': event.food_spots_available,
-                'regular_spots_total': event.regular_spots_total,
-                'food_spots_total': event.food_spots_total,
-                'status': status,
-            })
-        
-        serializer = CalendarEventSerializer(calendar_data, many=True)
-        return Response(serializer.data)
+        # Served from the cache until availability next changes
+        return HttpResponse(calendar_payload(date_window(request)), content_type='application/json')
 
+    @method_decorator(conditional_read(event_etag))
     @action(detail=True, methods=['get'])
     def availability(self, request, pk=None):
         """Get detailed availability for an event"""
         event = self.get_object()
-        return Response({
-            'date': event.date,
-            'regular': {
-                'available': event.regular_spots_available,
-                'total': event.regular_spots_total,
-                'price': float(event.regular_price)
-            },
-            'food': {
-                'available': event.food_spots_available,
-                'total': event.food_spots_total,
-                'price': float(event.food_price)
-            }
-        })
+        return Response(availability_data(
+            {field: getattr(event, field) for field in AVAILABILITY_FIELDS}
+        ))
+
+    @action(detail=False, methods=['get'], url_path='availability', url_name='availability-range')
+    def availability_range(self, request):
+        """
+        Availability for every event in a date window (?start=&end=,
+        inclusive) or on a list of dates (?dates=2026-04-10,2026-04-11),
+        in date order. Answered from one query on the date index and
+        streamed, so long windows are never built up in memory.
+        """
+        params = {
+            key: request.query_params[key]
+            for key in ('start', 'end') if key in request.query_params
+        }
+        dates = [
+            date for value in request.query_params.getlist('dates')
+            for date in value.split(',') if date
+        ]
+        if dates:
+            params['dates'] = dates
+        serializer = AvailabilityRangeSerializer(data=params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        if data.get('dates'):
+            events = Event.objects.filter(date__in=data['dates'])
+        else:
+            events = Event.objects.filter(date__range=(data['start'], data['end']))
+        rows = events.order_by('date').values(*AVAILABILITY_FIELDS).iterator(chunk_size=500)
+        return StreamingHttpResponse(
+            stream_json_array(rows, availability_data), content_type='application/json'
+        )
 
 
 @api_view(['GET'])
@@ -183,6 +181,7 @@ def booth_slot_detail(request, pk):
 
 
 @api_view(['POST'])
+@idempotent
 def reserve_event_spot(request, event_id):
     """Reserve a spot for a single event"""
     event = get_object_or_404(Event, pk=event_id)
@@ -193,8 +192,14 @@ def reserve_event_spot(request, event_id):
     
     vendor_type = serializer.validated_data.get('vendor_type')
     
-    # Check availability
-    if not check_availability(event, vendor_type):
+    try:
+        admission = check_admission(request, [event])
+    except AdmissionDenied as e:
+        return admission_denied_response(e)
+    
+    # Sold out already: answer without touching inventory
+    if sold_out_events([event], vendor_type):
+        release_admission(admission)
         return Response(
             {'error': f'No {vendor_type} spots available for this event'},
             status=status.HTTP_400_BAD_REQUEST
@@ -203,55 +208,27 @@ def reserve_event_spot(request, event_id):
     # Get price
     price_amount = get_price_for_vendor_type(vendor_type)
     
-    # Create booking (unpaid)
-    booking = create_booking_from_data(event, serializer.validated_data)
-    
-    # Get frontend URL
-    origin = request.headers.get('Origin')
-    if origin and ('vercel.app' in origin or 'localhost' in origin or '127.0.0.1' in origin):
-        frontend_url = origin.rstrip('/')
-    else:
-        frontend_url = settings.FRONTEND_BASE_URL.rstrip('/')
+    # Claim the spot and create the booking (unpaid) together, so the
+    # spot is held for this vendor while they are in checkout
+    expires_at = hold_expiry()
+    try:
+        booking = create_booking_from_data(
+            event, serializer.validated_data, hold_expires_at=expires_at
+        )
+    except SpotsUnavailable:
+        release_admission(admission)
+        return Response(
+            {'error': f'No {vendor_type} spots available for this event'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     # Create Stripe Checkout Session
     try:
-        vendor_type_label = 'Food Truck' if vendor_type == 'food' else 'Vendor'
-        
         checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=[{
-                'price_data': {
-                    'currency': 'usd',
-                    'product_data': {
-                        'name': f'{event.name} - {vendor_type_label} Spot',
-                        'description': (
-                            f'Event: {event.name}\n'
-                            f'Date: {event.date}\n'
-                            f'Vendor Type: {vendor_type_label}\n'
-                            f'Booking ID: {booking.id}'
-                        ),
-                    },
-                    'unit_amount': int(price_amount * 100),  # Convert to cents
-                },
-                'quantity': 1,
-            }],
-            mode='payment',
-            payment_intent_data={
-                'capture_method': 'manual',  # Requires manual approval
-                'metadata': {
-                    'booking_id': str(booking.id),
-                    'vendor_type': vendor_type,
-                }
-            },
-            allow_promotion_codes=True,
-            success_url=f"{frontend_url}/checkout/success?session_id={{CHECKOUT_SESSION_ID}}",
-            cancel_url=f"{frontend_url}/checkout/cancel",
-            metadata={
-                'booking_id': str(booking.id),
-                'vendor_type': vendor_type,
-                'event_date': str(event.date),
-                'is_multi_date': 'false',
-            },
+            idempotency_key=request.stripe_idempotency_key,
+            **single_checkout_params(
+                event, booking, vendor_type, price_amount, get_frontend_url(request), expires_at
+            )
         )
 
         # Update booking with Stripe session ID
@@ -267,8 +244,9 @@ def reserve_event_spot(request, event_id):
         })
 
     except stripe.error.StripeError as e:
-        # Clean up booking if Stripe fails
-        booking.delete()
+        # Clean up booking and return the spot (and the admission) if Stripe fails
+        release_bookings([booking], vendor_type)
+        release_admission(admission)
         return Response(
             {'error': f'Stripe error: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -276,6 +254,7 @@ def reserve_event_spot(request, event_id):
 
 
 @api_view(['POST'])
+@idempotent
 def reserve_multi_event_spots(request):
     """Reserve multiple dates at once"""
     serializer = MultiDateReservationSerializer(data=request.data)
@@ -293,138 +272,72 @@ def reserve_multi_event_spots(request):
     # Generate a group ID for this multi-date booking
     multi_date_group_id = str(uuid.uuid4())
     
-    bookings = []
-    total_price = 0
-    vendor_type = None
-    events_to_update = []
+    # Validate everything first, then resolve every date with one query
+    try:
+        validated, vendor_type, total_price = validate_multi_reservations(reservations)
+        events_by_date = Event.objects.in_bulk(
+            [event_date for _, event_date, _ in validated if event_date],
+            field_name='date'
+        )
+        items = match_events(validated, events_by_date)
+    except ReservationError as e:
+        return Response(e.payload, status=status.HTTP_400_BAD_REQUEST)
     
-    # Validate all dates first
-    for reservation in reservations:
-        date_str = reservation.get('eventDate')
-        if not date_str:
-            return Response(
-                {'error': 'Missing eventDate in reservation'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Find event for this date
-        try:
-            event = Event.objects.get(date=date_str)
-        except Event.DoesNotExist:
-            return Response(
-                {'error': f'No event found for date {date_str}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Validate reservation data
-        data = reservation.get('reservationData', {})
-        data_serializer = ReserveBoothSlotSerializer(data=data)
-        if not data_serializer.is_valid():
-            return Response(
-                {'errors': {date_str: data_serializer.errors}},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Set vendor type from first reservation
-        if vendor_type is None:
-            vendor_type = data_serializer.validated_data.get('vendor_type')
-        
-        # Check availability
-        if not check_availability(event, vendor_type):
-            return Response(
-                {'error': f'No {vendor_type} spots available for {date_str}'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Calculate price
-        price = get_price_for_vendor_type(vendor_type)
-        total_price += price
-        
-        # Store for later
-        events_to_update.append({
-            'event': event,
-            'data': data_serializer.validated_data,
-            'price': price,
-        })
+    events = [event for event, _ in items]
+    try:
+        admission = check_admission(request, events)
+    except AdmissionDenied as e:
+        return admission_denied_response(e)
+    
+    sold_out = sold_out_events(events, vendor_type)
+    if sold_out:
+        release_admission(admission)
+        return Response(
+            {'error': f'No {vendor_type} spots available for {sold_out[0].date}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    # Create all bookings
+    # Claim spots on every date and create all bookings, all or nothing
+    expires_at = hold_expiry()
     try:
-        with transaction.atomic():
-            for item in events_to_update:
-                booking = create_booking_from_data(
-                    item['event'], 
-                    item['data'],
-                    multi_date_group_id=multi_date_group_id
-                )
-                bookings.append(booking)
-                
-                # Don't decrease spots yet - wait for payment
+        bookings = create_bookings_in_bulk(
+            items,
+            vendor_type,
+            multi_date_group_id=multi_date_group_id,
+            hold_expires_at=expires_at
+        )
+    except SpotsUnavailable as e:
+        release_admission(admission)
+        sold_out = next(event for event, _ in items if event.id == e.event_id)
+        return Response(
+            {'error': f'No {vendor_type} spots available for {sold_out.date}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
+        release_admission(admission)
         return Response(
             {'error': f'Failed to create bookings: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
     
-    # Get frontend URL
-    origin = request.headers.get('Origin')
-    if origin and ('vercel.app' in origin or 'localhost' in origin or '127.0.0.1' in origin):
-        frontend_url = origin.rstrip('/')
-    else:
-        frontend_url = settings.FRONTEND_BASE_URL.rstrip('/')
-    
     # Create Stripe Checkout Session
     try:
-        vendor_type_label = 'Food Truck' if vendor_type == 'food' else 'Vendor'
-        dates = [b.event.date.strftime('%Y-%m-%d') for b in bookings]
-        dates_str = ', '.join(dates)
-        
-        line_items = [{
-            'price_data': {
-                'currency': 'usd',
-                'product_data': {
-                    'name': f'Multi-Day Market Package - {len(bookings)} Days',
-                    'description': (
-                        f'{vendor_type_label} Package\n'
-                        f'Dates: {dates_str}\n'
-                        f'Booking IDs: {",".join([str(b.id) for b in bookings])}'
-                    ),
-                },
-                'unit_amount': int(total_price * 100),
-            },
-            'quantity': 1,
-        }]
-        
         checkout_session = stripe.checkout.Session.create(
-            payment_method_types=['card'],
-            line_items=line_items,
-            mode='payment',
-            payment_intent_data={
-                'capture_method': 'manual',
-                'metadata': {
-                    'multi_date_group_id': multi_date_group_id,
-                    'num_bookings': str(len(bookings)),
-                    'vendor_type': vendor_type,
-                }
-            },
-            allow_promotion_codes=True,
-            success_url=f"{frontend_url}/checkout/success?session_id={{CHECKOUT_SESSION_ID}}",
-            cancel_url=f"{frontend_url}/checkout/cancel",
-            metadata={
-                'booking_ids': ','.join([str(b.id) for b in bookings]),
-                'multi_date_group_id': multi_date_group_id,
-                'num_dates': str(len(bookings)),
-                'vendor_type': vendor_type,
-                'total_price': str(total_price),
-                'is_multi_date': 'true',
-            },
+            idempotency_key=request.stripe_idempotency_key,
+            **multi_checkout_params(
+                bookings, multi_date_group_id, vendor_type, total_price,
+                get_frontend_url(request), expires_at
+            )
         )
         
-        # Update all bookings with Stripe session ID
-        for booking in bookings:
-            booking.stripe_payment_id = checkout_session.id
-            booking.payment_status = 'authorized'
-            booking.amount_paid = get_price_for_vendor_type(vendor_type)
-            booking.save(update_fields=['stripe_payment_id', 'payment_status', 'amount_paid'])
+        # Update all bookings with Stripe session ID in one statement
+        booking_model(vendor_type).objects.filter(
+            multi_date_group_id=multi_date_group_id
+        ).update(
+            stripe_payment_id=checkout_session.id,
+            payment_status='authorized',
+            amount_paid=get_price_for_vendor_type(vendor_type),
+        )
         
         return Response({
             'checkout_url': checkout_session.url,
@@ -435,9 +348,9 @@ def reserve_multi_event_spots(request):
         })
         
     except stripe.error.StripeError as e:
-        # Clean up bookings if Stripe fails
-        for booking in bookings:
-            booking.delete()
+        # Clean up bookings and return the spots (and the admission) if Stripe fails
+        release_bookings(bookings, vendor_type)
+        release_admission(admission)
         return Response(
             {'error': f'Stripe error: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -446,8 +359,9 @@ def reserve_multi_event_spots(request):
 
 @csrf_exempt
 @api_view(['POST'])
+@throttle_classes([])  # Stripe retries on its own schedule; never turn it away
 def stripe_webhook(request):
-    """Handle Stripe webhook events"""
+    """Verify a Stripe webhook event and queue it for processing"""
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
     endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
@@ -467,180 +381,67 @@ def stripe_webhook(request):
         print(f"ERROR: Invalid signature: {e}")
         return Response({'error': 'Invalid signature'}, status=400)
 
-    if event['type'] == 'payment_intent.succeeded':
-        payment_intent = event['data']['object']
-        payment_intent_id = payment_intent['id']
-        
-        print(f"WEBHOOK: payment_intent.succeeded - id={payment_intent_id}")
-        
-        # Try to get metadata from the payment intent
-        metadata = payment_intent.get('metadata', {})
-        multi_date_group_id = metadata.get('multi_date_group_id')
-        
-        with transaction.atomic():
-            if multi_date_group_id:
-                # Multi-date booking
-                general_bookings = GeneralVendorBooking.objects.filter(
-                    multi_date_group_id=multi_date_group_id,
-                    payment_status='authorized'
-                )
-                food_bookings = FoodTruckBooking.objects.filter(
-                    multi_date_group_id=multi_date_group_id,
-                    payment_status='authorized'
-                )
-                
-                # Update all bookings
-                for booking in list(general_bookings) + list(food_bookings):
-                    booking.payment_status = 'approved'
-                    booking.is_paid = True
-                    booking.stripe_payment_intent_id = payment_intent_id
-                    booking.save(update_fields=['payment_status', 'is_paid', 'stripe_payment_intent_id'])
-                    
-                    # Decrease available spots
-                    event = booking.event
-                    if booking.__class__.__name__ == 'FoodTruckBooking':
-                        if event.food_spots_available > 0:
-                            event.food_spots_available = F('food_spots_available') - 1
-                            event.save(update_fields=['food_spots_available'])
-                            # Refresh from DB to get the new value
-                            event.refresh_from_db()
-                            print(f"WEBHOOK: Decreased food spots for {event.date} to {event.food_spots_available}")
-                    else:
-                        if event.regular_spots_available > 0:
-                            event.regular_spots_available = F('regular_spots_available') - 1
-                            event.save(update_fields=['regular_spots_available'])
-                            # Refresh from DB to get the new value
-                            event.refresh_from_db()
-                            print(f"WEBHOOK: Decreased regular spots for {event.date} to {event.regular_spots_available}")
-                    
-                    # Mark booth slot as unavailable
-                    if booking.booth_slot:
-                        booking.booth_slot.is_available = False
-                        booking.booth_slot.save(update_fields=['is_available'])
-                    
-                    print(f"WEBHOOK: Approved booking {booking.id} for {event.date}")
-            else:
-                # Single booking - find by payment intent ID in bookings
-                booking = GeneralVendorBooking.objects.filter(
-                    stripe_payment_intent_id=payment_intent_id,
-                    payment_status='authorized'
-                ).first()
-                if not booking:
-                    booking = FoodTruckBooking.objects.filter(
-                        stripe_payment_intent_id=payment_intent_id,
-                        payment_status='authorized'
-                    ).first()
-                
-                if booking:
-                    booking.payment_status = 'approved'
-                    booking.is_paid = True
-                    booking.stripe_payment_intent_id = payment_intent_id
-                    booking.save(update_fields=['payment_status', 'is_paid', 'stripe_payment_intent_id'])
-                    
-                    # Decrease available spots
-                    event = booking.event
-                    if booking.__class__.__name__ == 'FoodTruckBooking':
-                        if event.food_spots_available > 0:
-                            event.food_spots_available = F('food_spots_available') - 1
-                            event.save(update_fields=['food_spots_available'])
-                            event.refresh_from_db()
-                            print(f"WEBHOOK: Decreased food spots for {event.date} to {event.food_spots_available}")
-                    else:
-                        if event.regular_spots_available > 0:
-                            event.regular_spots_available = F('regular_spots_available') - 1
-                            event.save(update_fields=['regular_spots_available'])
-                            event.refresh_from_db()
-                            print(f"WEBHOOK: Decreased regular spots for {event.date} to {event.regular_spots_available}")
-                    
-                    # Mark booth slot as unavailable
-                    if booking.booth_slot:
-                        booking.booth_slot.is_available = False
-                        booking.booth_slot.save(update_fields=['is_available'])
-                    
-                    print(f"WEBHOOK: Approved single booking {booking.id} for {event.date}")
-
-    # Handle payment_intent.payment_failed
-    if event['type'] == 'payment_intent.payment_failed':
-        payment_intent = event['data']['object']
-        print(f"WEBHOOK: payment_intent.payment_failed - id={payment_intent['id']}")
-        # Could mark bookings as failed, but we'll let them expire
+    # Processing happens off the request (bookings/stripe_inbox.py), so
+    # Stripe gets its answer before any booking is touched
+    receive_event(event.to_dict_recursive())
 
     return Response({'status': 'success'})
 
 
-@api_view(['GET'])
-def booking_status(request, session_id):
-    """Get booking status by Stripe session ID"""
-    # Find all bookings with this session ID
-    general_bookings = GeneralVendorBooking.objects.filter(stripe_payment_id=session_id)
-    food_bookings = FoodTruckBooking.objects.filter(stripe_payment_id=session_id)
-    
-    bookings = list(general_bookings) + list(food_bookings)
-    
-    if not bookings:
-        return Response(
-            {'error': 'No bookings found for this session'},
-            status=status.HTTP_404_NOT_FOUND
-        )
-    
-    first_booking = bookings[0]
-    
-    # Parse additional_notes to get selected dates if stored
-    selected_dates = []
-    try:
-        if first_booking.additional_notes:
-            notes_data = json.loads(first_booking.additional_notes)
-            selected_dates = notes_data.get('selectedDates', [])
-    except (json.JSONDecodeError, TypeError):
-        pass
+def admission_denied_response(error):
+    """Response for a reservation turned away by the waiting room"""
+    response = Response(error.payload, status=error.status_code)
+    if error.retry_after is not None:
+        response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+@api_view(['POST'])
+def waiting_room_join(request):
+    """Join the waiting room for one or more events"""
+    serializer = WaitingRoomJoinSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    # Calculate total price
-    total_price = sum([float(b.amount_paid) for b in bookings])
+    data = serializer.validated_data
+    if data.get('event_ids'):
+        events = list(Event.objects.filter(pk__in=data['event_ids']).order_by('date'))
+    else:
+        events = list(Event.objects.filter(date__in=data['dates']).order_by('date'))
+    if not events:
+        return Response({'error': 'No matching events'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Serialize bookings
-    bookings_data = []
-    for booking in bookings:
-        if isinstance(booking, GeneralVendorBooking):
-            serializer = GeneralVendorBookingSerializer(booking)
-        else:
-            serializer = FoodTruckBookingSerializer(booking)
-        bookings_data.append(serializer.data)
+    # Nobody queues for spots that are gone
+    sold_out = sold_out_events(events, data['vendor_type'])
+    if sold_out:
+        return Response({
+            'error': f"No {data['vendor_type']} spots available for {sold_out[0].date}",
+            'sold_out': True,
+            'sold_out_dates': [str(event.date) for event in sold_out],
+        }, status=status.HTTP_409_CONFLICT)
     
-    return Response({
-        'status': 'success',
-        'payment_status': first_booking.payment_status,
-        'is_paid': first_booking.is_paid,
-        'num_dates': len(bookings),
-        'total_price': total_price,
-        'first_name': first_booking.first_name,
-        'last_name': first_booking.last_name,
-        'business_name': first_booking.business_name,
-        'selected_dates': selected_dates or [b.event.date.strftime('%Y-%m-%d') for b in bookings],
-        'bookings': bookings_data,
-    })
+    token, queue = join_waiting_room(events, request)
+    return Response({'token': token, **queue})
+
+
+@api_view(['GET'])
+def waiting_room_status(request):
+    """Queue position for an admission token"""
+    payload = read_token(request.query_params.get('token'))
+    if payload is None:
+        return Response({'error': 'Invalid admission token'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(queue_status(payload))
 
 
 @api_view(['GET'])
+@conditional_read(event_etag)
 def event_availability(request, date):
     """Get availability for a specific date"""
-    try:
-        event = Event.objects.get(date=date)
-    except Event.DoesNotExist:
+    event = Event.objects.filter(date=date).values(*AVAILABILITY_FIELDS).first()
+    if event is None:
         return Response(
             {'error': f'No event found for date {date}'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    return Response({
-        'date': event.date,
-        'regular': {
-            'available': event.regular_spots_available,
-            'total': event.regular_spots_total,
-            'price': float(event.regular_price)
-        },
-        'food': {
-            'available': event.food_spots_available,
-            'total': event.food_spots_total,
-            'price': float(event.food_price)
-        }
-    })
\ No newline at end of file
+    return Response(availability_data(event))
\ No newline at end of file
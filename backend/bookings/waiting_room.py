@@ -0,0 +1,193 @@
+"""
+Virtual waiting room in front of the reserve endpoints
+
+Events with an admission rate set are gated: a vendor first joins the
+event's waiting room and is handed a signed admission token carrying the
+time they may reserve. Admission times are spaced 60 / rate seconds apart
+per event, so however many people join, reservations reach the database
+and Stripe at no more than the configured rate.
+
+A token is good for one reservation from the client it was issued to: it
+carries an id that the reserve endpoints spend with one insert, and a hash
+of the client's IP address. Otherwise a single admission could be shared
+or scripted to reserve over and over without queueing again.
+
+Joining takes one locked row per event and spending a token one insert;
+status polls just verify the token's signature. Once an event is sold out,
+joining is refused straight away.
+"""
+import hashlib
+import math
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+from .inventory import available_field
+from .models import UsedAdmission, WaitingRoom
+
+ADMISSION_HEADER = 'X-Admission-Token'
+TOKEN_SALT = 'bookings.waiting_room'
+
+
+class AdmissionDenied(Exception):
+    """A reservation without a usable admission token; `payload` is the error body"""
+
+    def __init__(self, status_code, payload, retry_after=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.retry_after = retry_after
+        super().__init__(payload.get('error'))
+
+
+def gated_events(events):
+    """Events that have a waiting room"""
+    return [event for event in events if event.admission_rate_per_minute]
+
+
+def sold_out_events(events, vendor_type):
+    """Events with no spots left for `vendor_type`"""
+    field = available_field(vendor_type)
+    return [event for event in events if getattr(event, field) <= 0]
+
+
+def client_key(request):
+    """Short hash of the client's IP address, as the throttles identify it"""
+    ident = BaseThrottle().get_ident(request) or ''
+    return hashlib.sha256(ident.encode()).hexdigest()[:16]
+
+
+def join(events, request):
+    """
+    Queue for every gated event in `events` and return the admission
+    token, bound to `request`'s client. A multi-date vendor takes a place
+    in each event's queue and is admitted once the last of them comes up.
+    """
+    gated = sorted(gated_events(events), key=lambda event: event.pk)
+    now = timezone.now()
+    admit_at = now
+
+    with transaction.atomic():
+        WaitingRoom.objects.bulk_create(
+            [WaitingRoom(event=event) for event in gated], ignore_conflicts=True
+        )
+        rooms = {
+            room.event_id: room
+            for room in WaitingRoom.objects.select_for_update().filter(
+                event__in=gated
+            ).order_by('event_id')
+        }
+        for event in gated:
+            room = rooms[event.pk]
+            slot = max(now, room.next_admission_at or now)
+            room.next_admission_at = slot + timedelta(seconds=60 / event.admission_rate_per_minute)
+            room.tickets_issued += 1
+            admit_at = max(admit_at, slot)
+        WaitingRoom.objects.bulk_update(rooms.values(), ['next_admission_at', 'tickets_issued'])
+
+    rate = min((event.admission_rate_per_minute for event in gated), default=None)
+    token = signing.dumps(
+        {
+            'e': [event.pk for event in gated],
+            'a': admit_at.timestamp(),
+            'r': rate,
+            'j': uuid.uuid4().hex,
+            'c': client_key(request),
+        },
+        salt=TOKEN_SALT,
+        compress=True,
+    )
+    return token, queue_status(read_token(token), now)
+
+
+def read_token(token):
+    """Decoded admission token, or None if it is missing or was tampered with"""
+    if not token:
+        return None
+    try:
+        return signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def queue_status(payload, now=None):
+    """Where the holder of a token stands: admitted yet, or how far back"""
+    now = (now or timezone.now()).timestamp()
+    wait_seconds = max(payload['a'] - now, 0)
+    expired = now > payload['a'] + settings.WAITING_ROOM_ADMISSION_WINDOW_SECONDS
+    position = math.ceil(wait_seconds * payload['r'] / 60) if payload['r'] else 0
+
+    return {
+        'admitted': wait_seconds == 0 and not expired,
+        'expired': expired,
+        'position': position,
+        'wait_seconds': math.ceil(wait_seconds),
+        # Poll more often as the admission time gets closer
+        'poll_after': min(max(math.ceil(wait_seconds / 4), 2), 30),
+    }
+
+
+def check_admission(request, events):
+    """
+    Let a reservation for `events` through, or raise AdmissionDenied.
+    Events without a waiting room need no token.
+
+    Spends the token: returns its id so release_admission() can hand it
+    back if the reservation falls through, or None if there was none.
+    """
+    gated = gated_events(events)
+    if not gated:
+        return None
+
+    payload = read_token(request.headers.get(ADMISSION_HEADER))
+    if (
+        payload is None
+        or not {event.pk for event in gated} <= set(payload['e'])
+        or payload.get('c') != client_key(request)
+    ):
+        raise AdmissionDenied(403, {
+            'error': 'Join the waiting room before reserving',
+            'waiting_room': True,
+        })
+
+    status = queue_status(payload)
+    if status['expired']:
+        raise AdmissionDenied(403, {
+            'error': 'Your admission has expired, please join the waiting room again',
+            'waiting_room': True,
+        })
+    if not status['admitted']:
+        raise AdmissionDenied(
+            429,
+            {'error': 'Not your turn yet', 'waiting_room': True, **status},
+            retry_after=status['wait_seconds'],
+        )
+
+    try:
+        with transaction.atomic():
+            UsedAdmission.objects.create(token_id=payload['j'])
+    except IntegrityError:
+        raise AdmissionDenied(403, {
+            'error': 'This admission has already been used, please join the waiting room again',
+            'waiting_room': True,
+        })
+    return payload['j']
+
+
+def release_admission(token_id):
+    """Make a token spent by check_admission() usable again"""
+    if token_id:
+        UsedAdmission.objects.filter(token_id=token_id).delete()
+
+
+def purge_used_admissions(now=None):
+    """
+    Forget spent tokens once they would have expired anyway: a token is
+    spent no earlier than its admission time, so past the admission window
+    it is refused as expired.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.WAITING_ROOM_ADMISSION_WINDOW_SECONDS)
+    deleted, _ = UsedAdmission.objects.filter(used_at__lte=cutoff).delete()
+    return deleted
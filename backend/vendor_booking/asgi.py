@@ -9,9 +9,20 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vendor_booking.settings')
 
 application = get_asgi_application()
 
+# Only server processes load this module, so management commands such as
+# migrate never start the background workers
+from bookings.apps import start_background_jobs  # noqa: E402
+start_background_jobs()
+
+if settings.DEBUG:
+    # What runserver does for the admin's static files in development
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    application = ASGIStaticFilesHandler(application)
+
@@ -5,6 +5,7 @@ Django settings for vendor_booking project.
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -151,9 +152,68 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 100
+    'PAGE_SIZE': 100,
+    # Token buckets (bookings/throttling.py): "N/period" allows a burst of N
+    # that refills evenly over the period
+    'DEFAULT_THROTTLE_CLASSES': [
+        'bookings.throttling.ClientIPThrottle',
+        'bookings.throttling.VendorEmailThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'ip_read': os.getenv('THROTTLE_IP_READ_RATE', '300/min'),
+        'ip_write': os.getenv('THROTTLE_IP_WRITE_RATE', '30/min'),
+        'email_write': os.getenv('THROTTLE_EMAIL_WRITE_RATE', '20/hour'),
+    },
+    # Proxies in front of the app that append to X-Forwarded-For (1 for
+    # Railway's edge). The client IP is read that many entries from the
+    # right, so a client cannot pick its own IP (and throttle bucket, and
+    # waiting room binding) by sending the header itself. Set to 0 when
+    # nothing sits in front of the app.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '1')),
 }
 
+# Cache
+# Shared across workers when REDIS_URL is set (through the redis package);
+# otherwise each process keeps its own in-memory cache
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# How long a cached availability payload is kept. Writes invalidate it
+# right away through the shared cache; the short default bounds staleness
+# across workers when each has its own memory cache.
+CALENDAR_CACHE_SECONDS = int(os.getenv('CALENDAR_CACHE_SECONDS', '3600' if REDIS_URL else '15'))
+
+# How long the checkout success page's booking status is cached. Status
+# changes drop it right away; the short default without Redis bounds how
+# long other workers can serve a stale copy.
+BOOKING_STATUS_CACHE_SECONDS = int(os.getenv('BOOKING_STATUS_CACHE_SECONDS', '3600' if REDIS_URL else '5'))
+# Longest a ?wait= booking status request is held open for the webhook
+BOOKING_STATUS_MAX_WAIT_SECONDS = int(os.getenv('BOOKING_STATUS_MAX_WAIT_SECONDS', '30'))
+
+# Event, availability and calendar reads carry ETags. Browsers revalidate
+# every time; a CDN may serve a response for this many seconds, then keep
+# serving it while it revalidates in the background.
+AVAILABILITY_CDN_MAX_AGE = int(os.getenv('AVAILABILITY_CDN_MAX_AGE', '5'))
+AVAILABILITY_STALE_WHILE_REVALIDATE = int(os.getenv('AVAILABILITY_STALE_WHILE_REVALIDATE', '15'))
+
+# Live availability stream (bookings/availability_stream.py, ASGI only).
+# Idle streams get a comment this often so proxies keep them open; browsers
+# wait this long before reconnecting a dropped stream.
+AVAILABILITY_STREAM_HEARTBEAT_SECONDS = int(os.getenv('AVAILABILITY_STREAM_HEARTBEAT_SECONDS', '15'))
+AVAILABILITY_STREAM_RETRY_MS = int(os.getenv('AVAILABILITY_STREAM_RETRY_MS', '3000'))
+
 # CORS
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -191,10 +251,60 @@ CSRF_TRUSTED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'x-admission-token')
+CORS_EXPOSE_HEADERS = ['Retry-After']
+
 # Stripe
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY', '')
 STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', '')
+# Override to point at a local fake Stripe server for benchmarks
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', 'https://api.stripe.com')
+# Outbound Stripe client (bookings/stripe_client.py). Connections are pooled
+# per process; a POST that is retried reuses its idempotency key.
+STRIPE_CONNECT_TIMEOUT_SECONDS = float(os.getenv('STRIPE_CONNECT_TIMEOUT_SECONDS', '5'))
+STRIPE_READ_TIMEOUT_SECONDS = float(os.getenv('STRIPE_READ_TIMEOUT_SECONDS', '30'))
+STRIPE_MAX_NETWORK_RETRIES = int(os.getenv('STRIPE_MAX_NETWORK_RETRIES', '2'))
+STRIPE_POOL_SIZE = int(os.getenv('STRIPE_POOL_SIZE', '10'))
+STRIPE_ASYNC_MAX_CONNECTIONS = int(os.getenv('STRIPE_ASYNC_MAX_CONNECTIONS', '100'))
+# Calls slower than this are logged as warnings
+STRIPE_SLOW_CALL_MS = int(os.getenv('STRIPE_SLOW_CALL_MS', '2000'))
+
+# Stripe webhook inbox (bookings/stripe_inbox.py). The webhook only stores
+# events; a thread in each web server process (started from asgi.py /
+# wsgi.py, never by management commands) drains them as they arrive and
+# polls this often for retries. Set to 0 when `manage.py
+# process_stripe_events --loop` runs as a separate worker instead.
+STRIPE_INBOX_POLL_SECONDS = int(os.getenv('STRIPE_INBOX_POLL_SECONDS', '10'))
+STRIPE_INBOX_BATCH_SIZE = int(os.getenv('STRIPE_INBOX_BATCH_SIZE', '50'))
+# Failed events are retried with exponential backoff, then dead-lettered
+STRIPE_INBOX_MAX_ATTEMPTS = int(os.getenv('STRIPE_INBOX_MAX_ATTEMPTS', '10'))
+# Processed events, and the ids that reject their redeliveries, are kept this long
+STRIPE_INBOX_RETENTION_DAYS = int(os.getenv('STRIPE_INBOX_RETENTION_DAYS', '30'))
+
+# Spot holds
+# How long an unpaid reservation keeps its spot. Stripe Checkout Sessions
+# expire at the same time, so this is clamped to Stripe's 30 min - 24 h range,
+# plus two minutes at the short end for the time the reservation takes
+# before Stripe sees the expiry.
+BOOKING_HOLD_TTL_SECONDS = int(os.getenv('BOOKING_HOLD_TTL_SECONDS', '1920'))
+# Set above 0 to sweep expired holds from a thread inside the web process
+# instead of (or as well as) running `manage.py expire_holds` on a schedule
+BOOKING_HOLD_SWEEP_INTERVAL_SECONDS = int(os.getenv('BOOKING_HOLD_SWEEP_INTERVAL_SECONDS', '0'))
+
+# Set above 0 to reset drifted spot counters from the bookings this often
+# from a thread inside the web process, instead of (or as well as) running
+# `manage.py reconcile_inventory` on a schedule
+INVENTORY_RECONCILE_INTERVAL_SECONDS = int(os.getenv('INVENTORY_RECONCILE_INTERVAL_SECONDS', '0'))
+
+# Idempotency-Key support on the reserve endpoints
+# How long a finished response is kept for replay (Stripe keeps its keys 24 h)
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_KEY_TTL_SECONDS', '86400'))
+# After this long an unfinished request is presumed dead and its key reusable
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '120'))
+
+# Waiting room: how long an admission token stays usable once its turn comes
+WAITING_ROOM_ADMISSION_WINDOW_SECONDS = int(os.getenv('WAITING_ROOM_ADMISSION_WINDOW_SECONDS', '600'))
 
 # Google Sheets Integration via Apps Script Web App
 # Get the webhook URL from your deployed Apps Script:
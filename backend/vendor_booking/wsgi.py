@@ -15,3 +15,8 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vendor_booking.settings')
 
 application = get_wsgi_application()
 
+# Only server processes (runserver included) load this module, so
+# management commands such as migrate never start the background workers
+from bookings.apps import start_background_jobs  # noqa: E402
+start_background_jobs()
+
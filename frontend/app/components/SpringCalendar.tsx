@@ -5,7 +5,7 @@ import { useState, useEffect } from 'react';
 import { motion, AnimatePresence } from 'framer-motion';
 import Image from 'next/image';
 import { SPRING_MARKET_DATES, getShortDate, VENDOR_CONFIG } from '@/lib/marketData';
-import { getCalendarEvents, CalendarEvent } from '@/lib/api';
+import { getCalendarEvents, subscribeToAvailability, CalendarEvent } from '@/lib/api';
 
 import big from '@/app/assets/big.webp';
 import bigTwo from '@/app/assets/bigTwo.png';
@@ -32,6 +32,33 @@ export default function SpringCalendar({ vendorType, onDatesSelected, selectedDa
     loadEvents();
   }, [refreshTrigger]);
 
+  // Keep spot counts live while the calendar is open
+  useEffect(() => {
+    return subscribeToAvailability(
+      (snapshot) => {
+        setEvents(snapshot);
+        setLoading(false);
+      },
+      (updates) => {
+        setEvents((current) => {
+          const byId = new Map(updates.map((u) => [u.id, u]));
+          return current
+            .filter((event) => !byId.get(event.id)?.deleted)
+            .map((event) => {
+              const update = byId.get(event.id);
+              return update
+                ? {
+                    ...event,
+                    regular_spots_available: update.regular_spots_available,
+                    food_spots_available: update.food_spots_available,
+                  }
+                : event;
+            });
+        });
+      }
+    );
+  }, []);
+
   const loadEvents = async () => {
     try {
       setLoading(true);
@@ -1,7 +1,7 @@
 // components/VendorBookingForm.tsx
 'use client';
 
-import { useState } from 'react';
+import { useRef, useState } from 'react';
 import { motion } from 'framer-motion';
 import { useRouter } from 'next/navigation';
 import { VENDOR_CONFIG, getShortDate, getFullFormattedDate } from '@/lib/marketData';
@@ -28,6 +28,10 @@ export default function VendorBookingForm({ selectedDates, vendorType, onBack }:
     hearAboutUs: '',
   });
   const [submitting, setSubmitting] = useState(false);
+  // Set while waiting in an on-sale waiting room
+  const [queuePosition, setQueuePosition] = useState<number | null>(null);
+  // Retries of an unchanged submission share an idempotency key
+  const submission = useRef<{ body: string; key: string } | null>(null);
 
   const totalPrice = config.price * selectedDates.length;
 
@@ -54,11 +58,21 @@ export default function VendorBookingForm({ selectedDates, vendorType, onBack }:
         } as ReserveBoothSlotData,
       }));
 
-      const result = await reserveMultiEventSpots(reservations);
+      const body = JSON.stringify(reservations);
+      if (submission.current?.body !== body) {
+        submission.current = { body, key: crypto.randomUUID() };
+      }
+
+      const result = await reserveMultiEventSpots(
+        reservations,
+        submission.current?.key,
+        status => setQueuePosition(status.position)
+      );
       window.location.href = result.checkout_url;
     } catch (error) {
       console.error('Booking error:', error);
       alert('Something went wrong. Please try again.');
+      setQueuePosition(null);
       setSubmitting(false);
     }
   };
@@ -266,7 +280,7 @@ export default function VendorBookingForm({ selectedDates, vendorType, onBack }:
             {submitting ? (
               <span className="flex items-center justify-center gap-2">
                 <div className="w-5 h-5 border-2 border-white border-t-transparent rounded-full animate-spin" />
-                Processing...
+                {queuePosition ? `In line - ${queuePosition} ahead of you` : 'Processing...'}
               </span>
             ) : (
               `Pay $${totalPrice} & Complete Booking`
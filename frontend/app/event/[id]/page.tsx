@@ -1,7 +1,7 @@
 // app/event/[id]/page.tsx
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useParams, useRouter } from 'next/navigation';
 import { motion } from 'framer-motion';
 import { getEvent, Event, reserveEventSpot } from '@/lib/api';
@@ -27,6 +27,8 @@ export default function SpringEventPage() {
     productsSelling: '',
   });
   const [submitting, setSubmitting] = useState(false);
+  // Retries of an unchanged submission share an idempotency key
+  const submission = useRef<{ body: string; key: string } | null>(null);
 
   useEffect(() => {
     loadEvent();
@@ -233,7 +235,7 @@ export default function SpringEventPage() {
               e.preventDefault();
               setSubmitting(true);
               try {
-                await reserveEventSpot(eventId, {
+                const reservation = {
                   vendor_type: vendorType,
                   first_name: formData.firstName,
                   last_name: formData.lastName,
@@ -242,7 +244,12 @@ export default function SpringEventPage() {
                   phone: formData.phone,
                   instagram: formData.instagram,
                   products_selling: formData.productsSelling,
-                });
+                };
+                const body = JSON.stringify(reservation);
+                if (submission.current?.body !== body) {
+                  submission.current = { body, key: crypto.randomUUID() };
+                }
+                await reserveEventSpot(eventId, reservation, submission.current?.key);
                 alert('Application submitted! You will receive an email with next steps.');
                 setShowVendorModal(false);
               } catch (error) {
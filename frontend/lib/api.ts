@@ -17,11 +17,13 @@ export interface Event {
   has_food_spots: boolean;
   total_spots_available: number;
   booth_slots?: BoothSlot[];
+  // Run-length availability per slot type, e.g. '5o2x3o' (o = open, x = taken)
+  slot_map?: { regular: string; food: string };
 }
 
 export interface BoothSlot {
   id: number;
-  event: number;
+  event?: number;
   spot_number: string;
   slot_type: 'regular' | 'food';
   is_available: boolean;
@@ -113,6 +115,14 @@ export interface BookingStatusResponse {
   bookings: any[];
 }
 
+export interface WaitingRoomStatus {
+  admitted: boolean;
+  expired: boolean;
+  position: number;
+  wait_seconds: number;
+  poll_after: number;
+}
+
 export interface AvailabilityResponse {
   date: string;
   regular: {
@@ -145,9 +155,34 @@ export async function getCalendarEvents(): Promise<CalendarEvent[]> {
   return response.json();
 }
 
-// Get single event by ID
+export interface AvailabilityUpdate {
+  id: number;
+  date?: string;
+  regular_spots_available?: number;
+  food_spots_available?: number;
+  deleted?: boolean;
+}
+
+// Follow spot counts live over Server-Sent Events instead of polling.
+// onSnapshot gets the full calendar when the stream (re)starts, onUpdate
+// only the events that changed. Returns a function that closes the stream.
+export function subscribeToAvailability(
+  onSnapshot: (events: CalendarEvent[]) => void,
+  onUpdate: (events: AvailabilityUpdate[]) => void
+): () => void {
+  const source = new EventSource(`${API_BASE_URL}/events/stream/`);
+  source.addEventListener('snapshot', (e) => {
+    onSnapshot(JSON.parse((e as MessageEvent).data));
+  });
+  source.addEventListener('availability', (e) => {
+    onUpdate(JSON.parse((e as MessageEvent).data).events);
+  });
+  return () => source.close();
+}
+
+// Get single event by ID (booth slots as a compact slot_map)
 export async function getEvent(id: number): Promise<Event> {
-  const response = await fetch(`${API_BASE_URL}/events/${id}/`);
+  const response = await fetch(`${API_BASE_URL}/events/${id}/?slots=compact`);
   if (!response.ok) {
     throw new Error('Failed to fetch event');
   }
@@ -163,6 +198,17 @@ export async function getEventAvailability(date: string): Promise<AvailabilityRe
   return response.json();
 }
 
+// Get availability for many dates in one request
+export async function getAvailabilityForDates(dates: string[]): Promise<AvailabilityResponse[]> {
+  const response = await fetch(
+    `${API_BASE_URL}/events/availability/?dates=${encodeURIComponent(dates.join(','))}`
+  );
+  if (!response.ok) {
+    throw new Error('Failed to fetch availability');
+  }
+  return response.json();
+}
+
 // Get booth slot by ID
 export async function getBoothSlot(id: number): Promise<BoothSlot> {
   const response = await fetch(`${API_BASE_URL}/booth-slots/${id}/`);
@@ -172,18 +218,90 @@ export async function getBoothSlot(id: number): Promise<BoothSlot> {
   return response.json();
 }
 
-// Reserve a single event spot
-export async function reserveEventSpot(
-  eventId: number,
-  data: ReserveBoothSlotData
-): Promise<ReservationResponse> {
-  const response = await fetch(`${API_BASE_URL}/events/${eventId}/reserve/`, {
+// Headers for a reserve request. Reusing one idempotency key for retries of
+// the same submission makes the backend return the original reservation
+// instead of booking a second spot.
+function reserveHeaders(idempotencyKey?: string, admissionToken?: string): HeadersInit {
+  const headers: Record<string, string> = {
+    'Content-Type': 'application/json',
+  };
+  if (idempotencyKey) {
+    headers['Idempotency-Key'] = idempotencyKey;
+  }
+  if (admissionToken) {
+    headers['X-Admission-Token'] = admissionToken;
+  }
+  return headers;
+}
+
+// Join the waiting room for the given events and wait until admitted.
+// Resolves to the admission token to send with the reservation.
+export async function waitForAdmission(
+  target: { event_ids?: number[]; dates?: string[] },
+  vendorType: 'regular' | 'food',
+  onUpdate?: (status: WaitingRoomStatus) => void
+): Promise<string> {
+  const response = await fetch(`${API_BASE_URL}/waiting-room/join/`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
     },
-    body: JSON.stringify(data),
+    body: JSON.stringify({ ...target, vendor_type: vendorType }),
   });
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error || 'Failed to join the waiting room');
+  }
+
+  let status: WaitingRoomStatus = data;
+  while (!status.admitted) {
+    if (status.expired) {
+      throw new Error('Your place in the waiting room has expired. Please try again.');
+    }
+    onUpdate?.(status);
+    await new Promise(resolve => setTimeout(resolve, status.poll_after * 1000));
+
+    const poll = await fetch(
+      `${API_BASE_URL}/waiting-room/status/?token=${encodeURIComponent(data.token)}`
+    );
+    if (!poll.ok) {
+      throw new Error('Failed to check the waiting room');
+    }
+    status = await poll.json();
+  }
+  return data.token;
+}
+
+// True when the backend turned a reservation away until the vendor has
+// been through the event's waiting room
+async function needsAdmission(response: Response): Promise<boolean> {
+  if (response.status !== 403 && response.status !== 429) {
+    return false;
+  }
+  const body = await response.clone().json().catch(() => null);
+  return Boolean(body?.waiting_room);
+}
+
+// Reserve a single event spot
+export async function reserveEventSpot(
+  eventId: number,
+  data: ReserveBoothSlotData,
+  idempotencyKey?: string,
+  onWaiting?: (status: WaitingRoomStatus) => void
+): Promise<ReservationResponse> {
+  const reserve = (admissionToken?: string) =>
+    fetch(`${API_BASE_URL}/events/${eventId}/reserve/`, {
+      method: 'POST',
+      headers: reserveHeaders(idempotencyKey, admissionToken),
+      body: JSON.stringify(data),
+    });
+
+  let response = await reserve();
+  if (await needsAdmission(response)) {
+    response = await reserve(
+      await waitForAdmission({ event_ids: [eventId] }, data.vendor_type, onWaiting)
+    );
+  }
 
   if (!response.ok) {
     let errorMessage = 'Failed to reserve spot';
@@ -208,18 +326,30 @@ export async function reserveEventSpot(
 
 // Reserve multiple event spots (for multi-date booking)
 export async function reserveMultiEventSpots(
-  reservations: MultiDateReservation[]
+  reservations: MultiDateReservation[],
+  idempotencyKey?: string,
+  onWaiting?: (status: WaitingRoomStatus) => void
 ): Promise<ReservationResponse> {
-  const response = await fetch(`${API_BASE_URL}/events/multi/reserve/`, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-    },
-    body: JSON.stringify({ 
-      reservations,
-      booking_type: 'multi_date',
-    }),
-  });
+  const reserve = (admissionToken?: string) =>
+    fetch(`${API_BASE_URL}/events/multi/reserve/`, {
+      method: 'POST',
+      headers: reserveHeaders(idempotencyKey, admissionToken),
+      body: JSON.stringify({ 
+        reservations,
+        booking_type: 'multi_date',
+      }),
+    });
+
+  let response = await reserve();
+  if (await needsAdmission(response)) {
+    response = await reserve(
+      await waitForAdmission(
+        { dates: reservations.map(r => r.eventDate) },
+        reservations[0].reservationData.vendor_type,
+        onWaiting
+      )
+    );
+  }
 
   if (!response.ok) {
     let errorMessage = 'Failed to reserve spots';
@@ -242,9 +372,15 @@ export async function reserveMultiEventSpots(
   return response.json();
 }
 
-// Check booking status by session ID
-export async function checkBookingStatus(sessionId: string): Promise<BookingStatusResponse> {
-  const response = await fetch(`${API_BASE_URL}/bookings/status/${sessionId}/`);
+// Check booking status by session ID. With waitSeconds the backend holds
+// the request until the payment is approved (or the wait runs out), so
+// call it in a loop instead of polling on a timer.
+export async function checkBookingStatus(
+  sessionId: string,
+  waitSeconds = 0
+): Promise<BookingStatusResponse> {
+  const query = waitSeconds > 0 ? `?wait=${waitSeconds}` : '';
+  const response = await fetch(`${API_BASE_URL}/bookings/status/${sessionId}/${query}`);
   
   if (!response.ok) {
     throw new Error('Failed to check booking status');